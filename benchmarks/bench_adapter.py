@@ -0,0 +1,65 @@
+# bench_adapter.py
+
+"""
+Throughput benchmark of the LLM adapter against the local stub server.
+
+Compares serial call_llm, threaded call_llm over the pooled session and
+acall_llm, reporting calls per second and the number of TCP connections
+the stub server accepted:
+
+    python3 benchmarks/bench_adapter.py --calls 200 --latency 0.05 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+import llm_adapter
+from stub_openai_server import StubServer
+from utils.concurrency import map_bounded
+
+
+def run_serial(calls: int):
+    for i in range(calls):
+        llm_adapter.call_llm(f"serial prompt {i}")
+
+
+def run_threaded(calls: int, concurrency: int):
+    map_bounded(lambda i: llm_adapter.call_llm(f"threaded prompt {i}"), range(calls), concurrency)
+
+
+def run_async(calls: int):
+    async def main():
+        await asyncio.gather(*(llm_adapter.acall_llm(f"async prompt {i}") for i in range(calls)))
+        await llm_adapter.aclose_llm()
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    llm_adapter.configure_cache(None)
+    runs = [
+        ("serial", lambda: run_serial(args.calls)),
+        ("threaded", lambda: run_threaded(args.calls, args.concurrency)),
+        ("async", lambda: run_async(args.calls)),
+    ]
+
+    for name, run in runs:
+        with StubServer(latency=args.latency) as stub:
+            llm_adapter.configure_http(max_connections=args.concurrency, base_url=stub.base_url)
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            print(f"{name:>8}: {args.calls / elapsed:8.1f} calls/s  "
+                  f"({elapsed:.2f}s, {stub.connections} connections)")
@@ -0,0 +1,107 @@
+# bench_pipeline.py
+
+"""
+Offline benchmark of every pipeline stage using the scripted LLM backend.
+
+For each cause count a random ground truth (minimal sufficient and necessary
+sets) is scripted, and each stage of run_pipeline is timed separately. The
+table reports wall time, LLM calls and peak Python memory per stage, so the
+pipeline's own overhead and the effect of search strategies or concurrency
+can be measured without network access:
+
+    python3 benchmarks/bench_pipeline.py --sizes 4 8 12 16 --latency 0.001 --max-workers 8
+
+--batch-size K evaluates K subsets of a level per request (batched verdict
+prompts); compare calls and time against --batch-size 1.
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import llm_adapter
+import pipeline
+from llm_backends import ScriptedBackend
+from utils.laws import format_physics_laws_for_prompt, format_traffic_laws_for_prompt
+
+EFFECT = "Maintain a constant speed on a highway segment"
+
+
+def make_script(n: int, seed: int) -> dict:
+    """Random ground truth over n causes."""
+    rng = random.Random(seed)
+    causes = [f"Scripted cause {i}: condition {i} holds for the ego vehicle" for i in range(n)]
+
+    def sample_sets(count, low, high):
+        return [rng.sample(causes, rng.randint(low, min(high, n))) for _ in range(count)]
+
+    return {
+        "causes": causes,
+        "sufficient_sets": sample_sets(3, 2, 4),
+        "necessary_sets": [[rng.choice(causes)]] + sample_sets(2, 2, 3),
+    }
+
+
+def timed(stage_times, name, backend, fn, *args, **kwargs):
+    """Run one stage and record wall time, LLM calls and peak memory."""
+    calls_before = sum(backend.calls.values())
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    stage_times.append((name, elapsed, sum(backend.calls.values()) - calls_before, peak))
+    return result
+
+
+def run(n: int, args) -> list:
+    backend = ScriptedBackend(**make_script(n, args.seed), latency=args.latency)
+    llm_adapter.set_backend(backend)
+
+    legal_laws = format_traffic_laws_for_prompt()
+    safety_laws = format_physics_laws_for_prompt()
+    stages = []
+
+    causes = timed(stages, "decompose_effect", backend, pipeline.decompose_effect, EFFECT, legal_laws, safety_laws)
+    unique = timed(stages, "merge_duplicates", backend, pipeline.merge_duplicate_causes, causes)
+    uc = pipeline.extract_unique_causes(unique)
+    timed(stages, "convert_to_symbolic_rule", backend, pipeline.convert_causes_to_rules, uc,
+          max_workers=args.max_workers)
+    timed(stages, "check_necessity", backend, pipeline.check_necessity, EFFECT, uc, legal_laws, safety_laws)
+    timed(stages, "prune_necessary_causes", backend, pipeline.prune_necessary_causes, EFFECT, uc,
+          legal_laws, safety_laws, max_workers=args.max_workers, strategy=args.strategy, batch_size=args.batch_size)
+    timed(stages, "prune_sufficient_causes", backend, pipeline.prune_sufficient_causes, EFFECT, uc,
+          legal_laws, safety_laws, max_workers=args.max_workers, strategy=args.strategy, batch_size=args.batch_size)
+    return stages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 8, 12, 16])
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per scripted LLM call")
+    parser.add_argument("--max-workers", type=int, default=1)
+    parser.add_argument("--strategy", default="levelwise", choices=["levelwise", "boundary"])
+    parser.add_argument("--batch-size", type=int, default=1, help="subsets per verdict request (levelwise)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="keep INFO logging enabled")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    llm_adapter.configure_cache(None)
+    tracemalloc.start()
+
+    print(f"{'n':>3}  {'stage':<26} {'time [s]':>9} {'calls':>7} {'peak mem [KiB]':>15}")
+    for n in args.sizes:
+        stages = run(n, args)
+        for name, elapsed, calls, peak in stages:
+            print(f"{n:>3}  {name:<26} {elapsed:>9.3f} {calls:>7} {peak / 1024:>15.1f}")
+        total_time = sum(s[1] for s in stages)
+        total_calls = sum(s[2] for s in stages)
+        print(f"{n:>3}  {'total':<26} {total_time:>9.3f} {total_calls:>7}")
@@ -0,0 +1,101 @@
+# stub_openai_server.py
+
+"""
+Minimal local stand-in for the OpenAI chat completions endpoint.
+
+Every request is answered with a fixed JSON verdict after a configurable
+delay, so the LLM adapter can be benchmarked without network access:
+
+    python3 benchmarks/stub_openai_server.py --port 8765 --latency 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python3 src/pipeline.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_CONTENT = json.dumps({"result": "no", "reason": "stub"})
+
+
+def make_handler(latency: float, content: str):
+    class StubHandler(BaseHTTPRequestHandler):
+        # HTTP/1.1 so clients can keep connections alive
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            time.sleep(latency)
+
+            body = json.dumps({
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+class StubServer:
+    """
+    Stub server running in a background thread.
+
+    Args:
+        port: Port to listen on, 0 picks a free one.
+        latency: Seconds to wait before answering each request.
+        content: Assistant message returned for every request.
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0, content: str = DEFAULT_CONTENT):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, content))
+        self.server.daemon_threads = True
+        self.connections = 0
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+        # Count accepted TCP connections to show keep-alive reuse
+        original_get_request = self.server.get_request
+
+        def get_request():
+            self.connections += 1
+            return original_get_request()
+
+        self.server.get_request = get_request
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with StubServer(args.port, args.latency) as stub:
+        print(f"Stub OpenAI server listening on {stub.base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,195 @@
+"""
+Batch runner synthesizing rules for many effects.
+
+Effects are streamed from a JSON Lines file, one object per line:
+
+    {"effect_id": "highway-001", "effect": "Maintain a constant speed on a highway segment"}
+
+("effect_id" is optional and defaults to the line number). Every effect runs
+through run_pipeline on a worker pool; all workers share the process-wide LLM
+backend, connection pool, response cache and one formatting of the laws. Each
+result is appended to the output file as its own JSON line as soon as it is
+done, so an interrupted batch can be resumed: effects that already have an
+"ok" line in the output are skipped. Without resume the output file is
+started over. At most two effects per worker are read ahead of the pool, so
+large input files are streamed rather than loaded.
+
+Result lines are PipelineResult records (see results.py) plus "status" and
+"elapsed"; load them with results.read_jsonl, or convert them to Parquet with
+--parquet-dir.
+
+Usage:
+    python3 src/batch.py effects.jsonl results.jsonl --workers 4 --max-workers 4
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, Set
+
+from pipeline import run_pipeline
+from results import read_jsonl, write_parquet
+from utils.laws import format_physics_laws_for_prompt, format_traffic_laws_for_prompt
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+def iter_effects(path: str) -> Iterator[Dict[str, str]]:
+    """
+    Stream effects from a JSON Lines file.
+
+    Raises:
+        ValueError: If a line is not valid JSON or has no "effect".
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                raise ValueError(f"{path}:{line_no} is not valid JSON")
+            if "effect" not in record:
+                raise ValueError(f"{path}:{line_no} has no 'effect' field")
+            yield {"effect_id": str(record.get("effect_id", line_no)), "effect": record["effect"]}
+
+
+def completed_effect_ids(path: str) -> Set[str]:
+    """Return the ids of effects with a successful result line in an existing output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Partially written line of an interrupted run
+                continue
+            if record.get("status") == "ok":
+                done.add(record["effect_id"])
+    return done
+
+
+def run_batch(input_path: str, output_path: str, workers: int = 1, resume: bool = True,
+              **pipeline_kwargs) -> Dict[str, int]:
+    """
+    Run the pipeline for every effect of input_path and append results to output_path.
+
+    Args:
+        input_path: JSON Lines file with effects.
+        output_path: JSON Lines file receiving one result line per effect.
+        workers: Number of effects processed at the same time.
+        resume: Skip effects that already have an "ok" result in output_path;
+            otherwise output_path is truncated first.
+        **pipeline_kwargs: Passed to run_pipeline (max_workers, strategy, ...).
+
+    Returns:
+        Counts of "ok", "error" and "skipped" effects.
+    """
+    done = completed_effect_ids(output_path) if resume else set()
+    if done:
+        logger.info(f"Resuming batch: {len(done)} effects already completed")
+
+    legal_laws = format_traffic_laws_for_prompt()
+    safety_laws = format_physics_laws_for_prompt()
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    lock = threading.Lock()
+
+    def process(item: Dict[str, str], out):
+        start = time.time()
+        try:
+            result = run_pipeline(item["effect"], legal_laws=legal_laws, safety_laws=safety_laws, **pipeline_kwargs)
+            result.effect_id = item["effect_id"]
+            record: Dict[str, Any] = {"status": "ok", **result.to_dict()}
+        except Exception as e:
+            logger.exception(f"Effect {item['effect_id']} failed")
+            record = {"effect_id": item["effect_id"], "status": "error", "effect": item["effect"],
+                      "error": f"{type(e).__name__}: {e}"}
+        record["elapsed"] = time.time() - start
+
+        with lock:
+            out.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            out.flush()
+            counts[record["status"]] += 1
+
+    if not resume and os.path.exists(output_path):
+        logger.warning(f"Overwriting existing results in {output_path}")
+    window = 2 * max(1, workers)
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = set()
+        for item in iter_effects(input_path):
+            if item["effect_id"] in done:
+                counts["skipped"] += 1
+                continue
+            if len(pending) >= window:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()
+            pending.add(pool.submit(process, item, out))
+        for future in pending:
+            future.result()
+
+    logger.info(f"Batch finished: {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthesize rules for every effect of a JSON Lines file.")
+    parser.add_argument("input", help="JSON Lines file with one {\"effect_id\", \"effect\"} object per line")
+    parser.add_argument("output", help="JSON Lines file receiving one result per effect")
+    parser.add_argument("--workers", type=int, default=1, help="effects processed concurrently")
+    parser.add_argument("--max-workers", type=int, default=1, help="concurrent LLM calls per search level")
+    parser.add_argument("--stage-workers", type=int, default=1, help="concurrent stages per effect")
+    parser.add_argument("--strategy", default="levelwise", choices=["levelwise", "boundary"])
+    parser.add_argument("--checkpoint-dir", help="folder for subset search checkpoints")
+    parser.add_argument("--verdict-store-dir", help="folder for the verdict stores of incremental re-runs")
+    parser.add_argument("--verdict-batch-size", type=int, default=1,
+                        help="subsets evaluated per LLM request in the levelwise searches")
+    parser.add_argument("--symbolic-screen", action="store_true",
+                        help="answer subset questions decided by the symbolic rules locally with z3")
+    parser.add_argument("--premerge", action="store_true",
+                        help="collapse lexical duplicate causes locally before the LLM merge")
+    parser.add_argument("--seed-necessity", action="store_true",
+                        help="seed the necessity search with the individually necessary causes")
+    parser.add_argument("--search-budget", type=int, help="maximum subset queries per effect")
+    parser.add_argument("--search-time-limit", type=float, help="seconds per effect after which the searches stop")
+    parser.add_argument("--max-set-size", type=int, help="largest minimal set size searched for")
+    parser.add_argument("--verdict-only", action="store_true",
+                        help="search without reasons and fetch the reasons of the minimal sets afterwards")
+    parser.add_argument("--law-selection", default="full", choices=["full", "relevant", "compare"],
+                        help="send all laws or only the relevant ones with each prompt")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="re-run all effects, overwriting the output file")
+    parser.add_argument("--parquet-dir", help="also write the results as Parquet tables to this folder")
+    args = parser.parse_args()
+
+    run_batch(
+        args.input,
+        args.output,
+        workers=args.workers,
+        resume=not args.no_resume,
+        max_workers=args.max_workers,
+        stage_workers=args.stage_workers,
+        strategy=args.strategy,
+        checkpoint_dir=args.checkpoint_dir,
+        law_selection=args.law_selection,
+        verdict_batch_size=args.verdict_batch_size,
+        symbolic_screen=args.symbolic_screen,
+        premerge=args.premerge,
+        seed_necessity=args.seed_necessity,
+        verdict_store_dir=args.verdict_store_dir,
+        search_budget=args.search_budget,
+        search_time_limit=args.search_time_limit,
+        max_set_size=args.max_set_size,
+        verdict_only=args.verdict_only,
+    )
+    if args.parquet_dir:
+        paths = write_parquet(read_jsonl(args.output), args.parquet_dir)
+        logger.info(f"Wrote Parquet tables: {paths}")
@@ -0,0 +1,450 @@
+"""
+Search strategies for minimal sets in the subset lattice of causes.
+
+Subsets are int bitmasks over cause indices (bit i set = cause i in the subset).
+Both subset searches of the pipeline look for the minimal elements of an
+upward-closed family: if a set of present causes is sufficient, so is every
+superset, and if removing a set of causes makes the effect impossible, so
+does removing any superset.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+def mask_to_indices(mask: int) -> Tuple[int, ...]:
+    """Return the sorted cause indices contained in mask."""
+    indices = []
+    while mask:
+        low_bit = mask & -mask
+        indices.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return tuple(indices)
+
+
+def indices_to_mask(indices) -> int:
+    """Return the bitmask of the given cause indices."""
+    mask = 0
+    for i in indices:
+        mask |= 1 << i
+    return mask
+
+
+def lattice_order(mask: int) -> Tuple[int, Tuple[int, ...]]:
+    """Sort key matching the order itertools.combinations visits subsets level by level."""
+    indices = mask_to_indices(mask)
+    return len(indices), indices
+
+
+def minimal_masks(masks: List[int]) -> List[int]:
+    """Return the masks that contain no other of the masks, without duplicates, in lattice order."""
+    minimal: List[int] = []
+    for mask in sorted(set(masks), key=lattice_order):
+        if not any(m & mask == m for m in minimal):
+            minimal.append(mask)
+    return minimal
+
+
+class SupersetIndex:
+    """
+    Index over found minimal sets answering "does mask contain any of them?".
+
+    Sets are bucketed by their lowest element; a set can only be contained in
+    mask if its lowest element is in mask, so a lookup only scans the buckets
+    of the elements of mask instead of every found set.
+    """
+
+    def __init__(self, n: int):
+        self.buckets: List[List[int]] = [[] for _ in range(n)]
+        self.masks: List[int] = []
+
+    def add(self, mask: int):
+        low = (mask & -mask).bit_length() - 1
+        self.buckets[low].append(mask)
+        self.masks.append(mask)
+
+    def contains_subset_of(self, mask: int) -> bool:
+        rest = mask
+        while rest:
+            low_bit = rest & -rest
+            for found in self.buckets[low_bit.bit_length() - 1]:
+                if found & mask == found:
+                    return True
+            rest ^= low_bit
+        return False
+
+
+class SearchLimits:
+    """
+    Call budget, wall-clock deadline and maximum set size of anytime searches.
+
+    One instance may be shared by several searches (e.g. both searches of an
+    effect); the call budget is then drawn from by all of them. The budget is
+    charged by the caller's oracle for the queries that actually reach the LLM
+    (see reserve), so answers from a checkpoint or cache are free; the walkers
+    only check the deadline and max_size.
+
+    Args:
+        max_calls: Maximum number of subset queries sent to the LLM.
+        deadline: time.time() from which no new queries are issued.
+        max_size: Largest size of the minimal sets searched for.
+    """
+
+    def __init__(self, max_calls: Optional[int] = None, deadline: Optional[float] = None,
+                 max_size: Optional[int] = None):
+        self.max_calls = max_calls
+        self.deadline = deadline
+        self.max_size = max_size
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def expired(self) -> bool:
+        """Return True once the deadline has passed."""
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def reserve(self, count: int) -> int:
+        """Take up to count queries from the budget; returns the number granted."""
+        with self._lock:
+            if self.expired():
+                return 0
+            if self.max_calls is not None:
+                count = max(0, min(count, self.max_calls - self.calls))
+            self.calls += count
+            return count
+
+    def stop_reason(self) -> str:
+        """Name the limit that stopped a search: "deadline" or "budget"."""
+        return "deadline" if self.expired() else "budget"
+
+
+class AnytimeSearch:
+    """
+    Minimal sets of one search, yielded as soon as they are confirmed.
+
+    Iterating drives the search; leaving the iteration early ends it. After
+    the iteration, found holds the sets yielded so far, complete tells whether
+    every minimal set (of at most max_size elements) was found, and stop_reason
+    names what ended the search early ("budget", "deadline" or "stopped").
+
+    Args:
+        sets: Iterator of minimal masks, e.g. iter_levelwise_minimal_sets.
+        stats: The stats dict filled by that iterator.
+        decode: Maps a mask to the yielded value (default: the mask itself).
+        on_finish: Called with the search when the iteration ends.
+    """
+
+    def __init__(self, sets: Iterator[int], stats: Dict[str, Any], decode: Optional[Callable[[int], Any]] = None,
+                 on_finish: Optional[Callable[["AnytimeSearch"], None]] = None):
+        self.stats = stats
+        self.masks: List[int] = []
+        self._sets = sets
+        self._decode = decode or (lambda mask: mask)
+        self._on_finish = on_finish
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            for mask in self._sets:
+                self.masks.append(mask)
+                yield self._decode(mask)
+        except GeneratorExit:
+            self._sets.close()
+            if self.stats.get("complete", True):
+                self.stats.update(complete=False, stop_reason="stopped")
+            raise
+        finally:
+            if self._on_finish is not None:
+                self._on_finish(self)
+
+    @property
+    def found(self) -> List[Any]:
+        """Sets yielded so far, in lattice order."""
+        return [self._decode(mask) for mask in sorted(self.masks, key=lattice_order)]
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.stats.get("complete", False))
+
+    @property
+    def stop_reason(self) -> Optional[str]:
+        return self.stats.get("stop_reason")
+
+    def run(self) -> List[Any]:
+        """Drive the search to its end and return the sets found, in lattice order."""
+        for _ in self:
+            pass
+        return self.found
+
+
+def iter_levelwise_minimal_sets(n: int, evaluate: Callable[[List[int]], List[bool]],
+                                on_level: Optional[Callable[[int, List[int]], None]] = None,
+                                seeds: Optional[List[int]] = None, limits: Optional[SearchLimits] = None,
+                                chunk_size: Optional[int] = None,
+                                stats: Optional[Dict[str, Any]] = None) -> Iterator[int]:
+    """
+    Yield the minimal positive sets by enumerating the lattice level by level.
+
+    All candidates of one size that do not contain an already-found set are
+    passed to evaluate as one batch, so the caller may evaluate them
+    concurrently; positives of a level prune the levels above it. A positive
+    candidate is minimal as soon as it is answered (all of its subsets lie on
+    completed levels), so it is yielded right away.
+
+    Candidates of size r+1 are generated from the negative sets of size r
+    (a set contains no positive set iff all of its r-subsets are negative),
+    so pruned regions of the lattice are never enumerated and the search ends
+    as soon as no candidate is left. Candidates are produced in the order of
+    itertools.combinations.
+
+    Seeds are minimal positive sets known in advance. Candidates containing a
+    seed are positive without a query and never extended, so k seeded
+    singletons remove their 2^k share of the lattice from the search. Seeds
+    are yielded first.
+
+    With limits, levels above max_size are not searched and the search stops
+    when the deadline has passed (checked before every chunk of chunk_size
+    candidates, default: whole levels) or when evaluate leaves a candidate
+    undecided (verdict None, e.g. because the call budget is exhausted).
+
+    Args:
+        n: Number of causes.
+        evaluate: Oracle mapping a batch of candidate masks to verdicts (True,
+            False, or None for a candidate it could not decide).
+        on_level: Called with the completed level and the sets found so far.
+        seeds: Known minimal positive sets.
+        limits: Optional budget, deadline and maximum set size.
+        chunk_size: Candidates evaluated between two checks of the limits.
+        stats: Dict receiving the number of "issued" queries, of lattice nodes
+            "inferred" from closure (0 unless the whole lattice was decided),
+            "complete" (False if a budget or deadline stopped the search; sets
+            above max_size are not required), "truncated" (levels above max_size
+            were skipped) and the "stop_reason".
+    """
+    stats = {} if stats is None else stats
+    seeds = list(dict.fromkeys(seeds or []))
+    seed_index = SupersetIndex(n)
+    for seed in seeds:
+        seed_index.add(seed)
+    found: List[int] = list(seeds)
+    level = 0
+    stats.update(issued=0, inferred=0, lattice=(1 << n) - 1, seeded=len(seeds), complete=True, stop_reason=None,
+                 truncated=False)
+    yield from seeds
+
+    # (mask, highest element) pairs, in combinations order
+    candidates = [(1 << i, i) for i in range(n)]
+    while candidates:
+        if limits is not None and limits.max_size is not None and level >= limits.max_size:
+            # Larger sets are not required, but the lattice above is not decided either
+            stats["truncated"] = True
+            break
+        if seeds:
+            candidates = [(mask, top) for mask, top in candidates if not seed_index.contains_subset_of(mask)]
+
+        negatives = []
+        step = chunk_size or max(1, len(candidates))
+        for start in range(0, len(candidates), step):
+            if limits is not None and limits.expired():
+                stats.update(complete=False, stop_reason="deadline")
+                break
+            chunk = candidates[start:start + step]
+            verdicts = evaluate([mask for mask, _ in chunk])
+
+            for (mask, top), verdict in zip(chunk, verdicts):
+                if verdict is None:
+                    stats.update(complete=False, stop_reason=limits.stop_reason() if limits else "budget")
+                    continue
+                stats["issued"] += 1
+                if verdict:
+                    found.append(mask)
+                    yield mask
+                else:
+                    negatives.append((mask, top))
+            if not stats["complete"]:
+                break
+
+        level += 1
+        if on_level is not None:
+            on_level(level, found)
+        if not stats["complete"]:
+            break
+
+        negative_masks = {mask for mask, _ in negatives}
+        candidates = []
+        for mask, top in negatives:
+            for e in range(top + 1, n):
+                extended = mask | 1 << e
+                if all(extended & ~(1 << i) in negative_masks for i in mask_to_indices(mask)):
+                    candidates.append((extended, e))
+
+    if stats["complete"] and not stats["truncated"]:
+        stats["inferred"] = stats["lattice"] - stats["issued"]
+
+
+def levelwise_minimal_sets(n: int, evaluate: Callable[[List[int]], List[bool]],
+                           on_level: Optional[Callable[[int, List[int]], None]] = None,
+                           seeds: Optional[List[int]] = None) -> Tuple[List[int], Dict[str, int]]:
+    """
+    Find all minimal positive sets level by level (see iter_levelwise_minimal_sets).
+
+    Returns:
+        Minimal positive sets in level-wise order, and statistics with the number
+        of "issued" queries and of lattice nodes "inferred" from closure.
+    """
+    stats: Dict[str, Any] = {}
+    found = list(iter_levelwise_minimal_sets(n, evaluate, on_level=on_level, seeds=seeds, stats=stats))
+    return sorted(found, key=lattice_order), stats
+
+
+def minimal_transversals(family: List[int], n: int) -> List[int]:
+    """
+    Compute all minimal hitting sets of a family of sets (Berge's algorithm).
+
+    Args:
+        family: Sets as bitmasks.
+        n: Number of elements.
+
+    Returns:
+        Minimal sets intersecting every member of family. For an empty family
+        this is the empty set.
+    """
+    transversals = [0]
+    for member in family:
+        extended = set()
+        for t in transversals:
+            if t & member:
+                extended.add(t)
+                continue
+            for i in range(n):
+                if member >> i & 1:
+                    extended.add(t | 1 << i)
+
+        # Keep only the minimal ones
+        candidates = sorted(extended, key=lambda m: bin(m).count("1"))
+        transversals = []
+        for t in candidates:
+            if not any(m & t == m for m in transversals):
+                transversals.append(t)
+    return transversals
+
+
+class _LimitReached(Exception):
+    """Raised inside the boundary walk when a query may not be issued."""
+
+
+def iter_boundary_minimal_sets(n: int, query: Callable[[int], bool], seeds: Optional[List[int]] = None,
+                               limits: Optional[SearchLimits] = None,
+                               stats: Optional[Dict[str, Any]] = None) -> Iterator[int]:
+    """
+    Yield the minimal positive sets of a monotone predicate by walking the positive/negative border.
+
+    Every answer is used in both directions: a positive set makes all of its
+    supersets positive, a negative set makes all of its subsets negative. New
+    queries are only issued for sets that are maximal among the sets not yet
+    known to be positive (complements of minimal transversals of the minimal
+    positive sets found so far); a positive answer is shrunk element by element
+    to a minimal set, a negative answer is a maximal negative set. The number
+    of queries grows with the size of the border, not with the 2^n lattice.
+    Each set is yielded once it is shrunk to a minimal one; seeds are yielded first.
+
+    The result equals the level-wise search as long as the verdicts are
+    monotone; the empty set is treated as negative without a query.
+
+    With limits, the walk stops when the deadline has passed or query leaves a
+    subset undecided (e.g. because the call budget is exhausted). The walk does
+    not proceed by size, so max_size only filters the sets yielded.
+
+    Args:
+        n: Number of causes.
+        query: Oracle deciding whether a (non-empty) subset is positive; None
+            if it could not decide it.
+        seeds: Known minimal positive sets; the border walk starts from them.
+        limits: Optional budget, deadline and maximum set size.
+        stats: Dict receiving the number of "issued" queries, of lattice nodes
+            "inferred" from closure (0 unless the whole lattice was decided),
+            "complete" and the "stop_reason".
+    """
+    stats = {} if stats is None else stats
+    positives: List[int] = list(dict.fromkeys(seeds or []))
+    negatives: List[int] = []
+    index = SupersetIndex(n)
+    for seed in positives:
+        index.add(seed)
+    full = (1 << n) - 1
+    stats.update(issued=0, inferred=0, lattice=full, seeded=len(positives), complete=True, stop_reason=None)
+    max_size = limits.max_size if limits is not None else None
+
+    def known(mask):
+        if mask == 0:
+            return False
+        if index.contains_subset_of(mask):
+            return True
+        if any(mask & q == mask for q in negatives):
+            return False
+        return None
+
+    def ask(mask):
+        verdict = known(mask)
+        if verdict is not None:
+            return verdict
+        if limits is not None and limits.expired():
+            raise _LimitReached()
+        verdict = query(mask)
+        if verdict is None:
+            raise _LimitReached()
+        stats["issued"] += 1
+        if not verdict:
+            negatives[:] = [q for q in negatives if q & mask != q]
+            negatives.append(mask)
+        return verdict
+
+    def shrink(mask):
+        for i in range(n):
+            if mask >> i & 1 and ask(mask & ~(1 << i)):
+                mask &= ~(1 << i)
+        return mask
+
+    def small(mask):
+        return max_size is None or bin(mask).count("1") <= max_size
+
+    yield from (seed for seed in positives if small(seed))
+    try:
+        while n:
+            unexplained = None
+            for t in minimal_transversals(positives, n):
+                candidate = full & ~t
+                if known(candidate) is None:
+                    unexplained = candidate
+                    break
+            if unexplained is None:
+                break
+            if ask(unexplained):
+                minimal = shrink(unexplained)
+                logger.info(f"Minimal set found by boundary search: {mask_to_indices(minimal)}")
+                positives.append(minimal)
+                index.add(minimal)
+                if small(minimal):
+                    yield minimal
+    except _LimitReached:
+        stats.update(complete=False, stop_reason=limits.stop_reason() if limits else "budget")
+
+    if stats["complete"]:
+        stats["inferred"] = stats["lattice"] - stats["issued"]
+
+
+def boundary_minimal_sets(n: int, query: Callable[[int], bool],
+                          seeds: Optional[List[int]] = None) -> Tuple[List[int], Dict[str, int]]:
+    """
+    Find all minimal positive sets by walking the border (see iter_boundary_minimal_sets).
+
+    Returns:
+        Minimal positive sets in level-wise order, and statistics with the number
+        of "issued" queries and of lattice nodes "inferred" from closure.
+    """
+    stats: Dict[str, Any] = {}
+    found = list(iter_boundary_minimal_sets(n, query, seeds=seeds, stats=stats))
+    return sorted(found, key=lattice_order), stats
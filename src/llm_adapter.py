@@ -1,8 +1,15 @@
+import json
 import os
 import time
-import requests
 from pathlib import Path
+from typing import Any, Dict, Optional
 from utils.logger import get_logger
+from utils.cache import ResponseCache, make_cache_key
+from utils.rate_limit import RequestScheduler
+from utils.metrics import get_metrics
+from utils.parsing import SCHEMAS, VERDICT_TEMPLATES, ResponseParseError, parse_response, verdict_prefix
+from prompts.repair_json import REPAIR_JSON_PROMPT
+from llm_backends import OpenAIBackend, RoutedBackend, ScriptedBackend
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -11,42 +18,401 @@ load_dotenv()
 # Setup logger
 logger = get_logger()
 
+# Backend selection: "openai" (default) or "scripted" (offline, see llm_backends.ScriptedBackend)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_SCRIPT_PATH = os.getenv("LLM_SCRIPT_PATH")
+
 # OpenAI settings
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+# HTTP client settings
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "16"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+# Rate limit settings (unlimited unless set)
+LLM_REQUESTS_PER_MINUTE = os.getenv("LLM_REQUESTS_PER_MINUTE")
+LLM_TOKENS_PER_MINUTE = os.getenv("LLM_TOKENS_PER_MINUTE")
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+
+# Response cache settings (disabled unless LLM_CACHE_PATH is set)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "readwrite")
+LLM_CACHE_MAX_ENTRIES = os.getenv("LLM_CACHE_MAX_ENTRIES")
+LLM_CACHE_MAX_AGE = os.getenv("LLM_CACHE_MAX_AGE")
+
+# Response parsing: repair requests per unparsable answer, and early exit of streamed verdicts
+LLM_PARSE_REPAIRS = int(os.getenv("LLM_PARSE_REPAIRS", "1"))
+LLM_STREAM_VERDICTS = os.getenv("LLM_STREAM_VERDICTS", "0") == "1"
+
+# Per-template backend routing: inline JSON or path to a JSON file (see configure_routes)
+LLM_ROUTES = os.getenv("LLM_ROUTES")
+
+# Completion token budgets (see max_tokens_for): LLM_TOKEN_BUDGETS=0 falls back to the fixed
+# limits of the call sites, LLM_MAX_TOKENS='{"necessity_set": 256}' overrides single templates
+LLM_TOKEN_BUDGETS = os.getenv("LLM_TOKEN_BUDGETS", "1") == "1"
+LLM_MAX_TOKENS = os.getenv("LLM_MAX_TOKENS")
+# Ask for response_format {"type": "json_object"} when the answer is a JSON object
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "0") == "1"
+
+# (base, per item) completion tokens per template; items are causes for check_necessity
+# and scenarios for the batched templates. Answers cut off by a budget are retried
+# with twice the tokens by call_llm_json.
+TOKEN_BUDGETS = {
+    "check_necessity": (128, 160),
+    "convert_to_symbolic_rule": (768, 0),
+    "necessity_set": (512, 0),
+    "sufficiency_set": (512, 0),
+    "necessity_set_batch": (64, 384),
+    "sufficiency_set_batch": (64, 384),
+    "necessity_set_verdict": (16, 0),
+    "sufficiency_set_verdict": (16, 0),
+    "necessity_set_verdict_batch": (16, 16),
+    "sufficiency_set_verdict_batch": (16, 16),
+}
+if LLM_MAX_TOKENS:
+    TOKEN_BUDGETS.update({template: (int(tokens), 0) for template, tokens in json.loads(LLM_MAX_TOKENS).items()})
+
+_cache: Optional[ResponseCache] = None
+_backend = None
+
+def configure_cache(path: Optional[str], mode: str = "readwrite", max_entries: Optional[int] = None,
+                    max_age: Optional[float] = None) -> Optional[ResponseCache]:
+    """
+    Enable (or disable with path=None) the on-disk response cache used by call_llm.
+
+    Args:
+        path: SQLite file to store responses in.
+        mode: "readwrite", "readonly" or "replay".
+        max_entries: Maximum number of cached responses.
+        max_age: Maximum age of a cached response in seconds.
+
+    Returns:
+        The active cache, or None if caching is disabled.
+    """
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = ResponseCache(path, mode=mode, max_entries=max_entries, max_age=max_age) if path else None
+    if _cache is not None:
+        logger.info(f"Using LLM response cache {path} (mode={mode})")
+    return _cache
+
+def get_cache() -> Optional[ResponseCache]:
+    """Return the active response cache, if any."""
+    return _cache
+
+def set_backend(backend):
+    """
+    Replace the backend that serves call_llm / acall_llm.
+
+    Args:
+        backend: Object implementing complete/acomplete and a model attribute
+            (see llm_backends).
+
+    Returns:
+        The previously active backend.
+    """
+    global _backend
+    previous, _backend = _backend, backend
+    logger.info(f"Using LLM backend {type(backend).__name__} (model={backend.model})")
+    return previous
+
+def get_backend():
+    """Return the active backend."""
+    return _backend
+
+def configure_scheduler(requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                        max_attempts: int = 3, backoff_base: float = 1.0, backoff_max: float = 60.0) -> RequestScheduler:
+    """Replace the request scheduler (RPM/TPM budgets and retry policy) of the active backend."""
+    scheduler = RequestScheduler(requests_per_minute, tokens_per_minute, max_attempts, backoff_base, backoff_max)
+    _backend.scheduler = scheduler
+    return scheduler
+
+def get_scheduler() -> Optional[RequestScheduler]:
+    """Return the request scheduler of the active backend, if it has one."""
+    return getattr(_backend, "scheduler", None)
+
+def configure_http(max_connections: Optional[int] = None, timeout: Optional[float] = None,
+                   base_url: Optional[str] = None):
+    """
+    Change connection pool size, default per-call timeout or API base URL of the active backend.
+
+    Existing pooled clients are closed and recreated on next use. With routing
+    the settings apply to the default backend.
+    """
+    backend = getattr(_backend, "default", _backend)
+    if max_connections is not None:
+        backend.max_connections = max_connections
+    if timeout is not None:
+        backend.timeout = timeout
+    if base_url is not None:
+        backend.base_url = base_url
+    if hasattr(backend, "close"):
+        backend.close()
+
+async def aclose_llm():
+    """Close the pooled async client of the running event loop."""
+    if hasattr(_backend, "aclose"):
+        await _backend.aclose()
+
+def max_tokens_for(template: str, default: int, items: int = 1) -> int:
+    """
+    Return the completion token budget of a request.
+
+    Args:
+        template: Prompt template name (see TOKEN_BUDGETS).
+        default: Limit used without a budget (template unknown or LLM_TOKEN_BUDGETS=0).
+        items: Number of causes or scenarios the answer covers.
+
+    The difference to default is counted as "max_tokens_limit_reduction" in the run metrics.
+    """
+    if not LLM_TOKEN_BUDGETS or template not in TOKEN_BUDGETS:
+        return default
+    base, per_item = TOKEN_BUDGETS[template]
+    budget = base + per_item * items
+    if budget < default:
+        get_metrics().increment("max_tokens_limit_reduction", default - budget)
+    return budget
+
+def _endpoint_backend(name: str, spec: Dict[str, Any]):
+    """Create the backend of one endpoint of a routing config."""
+    kind = spec.get("backend", "openai")
+    if kind == "scripted":
+        return ScriptedBackend.from_file(spec["script_path"])
+    if kind != "openai":
+        raise ValueError(f"Unknown backend '{kind}' for endpoint '{name}'")
+    if "model" not in spec:
+        raise ValueError(f"Endpoint '{name}' needs a model")
+    api_key = os.getenv(spec["api_key_env"]) if "api_key_env" in spec else spec.get("api_key")
+    scheduler = RequestScheduler(
+        requests_per_minute=spec.get("requests_per_minute"),
+        tokens_per_minute=spec.get("tokens_per_minute"),
+        max_attempts=spec.get("max_attempts", LLM_MAX_ATTEMPTS),
+    )
+    return OpenAIBackend(api_key, spec["model"], base_url=spec.get("base_url", OPENAI_BASE_URL),
+                         max_connections=spec.get("max_connections", LLM_MAX_CONNECTIONS),
+                         timeout=spec.get("timeout", LLM_TIMEOUT), scheduler=scheduler,
+                         require_api_key="api_key_env" in spec or "api_key" in spec)
+
+def configure_routes(config: Optional[Dict[str, Any]]):
+    """
+    Route prompt templates to their own backends and models.
+
+    Example config, sending the verdict calls to a local OpenAI-compatible
+    server (llama.cpp, vLLM) and everything else to the default backend:
+
+        {"endpoints": {"local": {"base_url": "http://localhost:8080/v1", "model": "qwen2.5-7b-instruct"}},
+         "routes": {"necessity_set": "local", "sufficiency_set": "local",
+                    "necessity_set_batch": "local", "sufficiency_set_batch": "local"}}
+
+    Endpoints are OpenAI-compatible ("backend": "openai", the default) with a
+    model and optionally base_url, api_key_env (name of the variable holding
+    the key; endpoints without key send no Authorization header), timeout,
+    max_connections, requests_per_minute, tokens_per_minute and max_attempts,
+    or scripted ("backend": "scripted" with a script_path). A route to
+    "default" keeps the default backend.
+
+    Args:
+        config: Routing config; None removes the routing.
+
+    Returns:
+        The active backend.
+
+    Raises:
+        ValueError: If a route names an unknown endpoint or an endpoint is invalid.
+    """
+    default = getattr(_backend, "default", _backend)
+    if not config:
+        if default is not _backend:
+            set_backend(default)
+        return _backend
+
+    endpoints = {name: _endpoint_backend(name, spec) for name, spec in config.get("endpoints", {}).items()}
+    endpoints.setdefault("default", default)
+    routes = {}
+    for template, endpoint in config.get("routes", {}).items():
+        if endpoint not in endpoints:
+            raise ValueError(f"Route for '{template}' names unknown endpoint '{endpoint}'")
+        routes[template] = endpoints[endpoint]
+        logger.info(f"Routing {template} to {endpoint} (model={endpoints[endpoint].model})")
+    set_backend(RoutedBackend(default, routes))
+    return _backend
+
+def load_routes(spec: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Parse LLM_ROUTES: inline JSON or the path of a JSON file."""
+    if not spec:
+        return None
+    if spec.lstrip().startswith("{"):
+        return json.loads(spec)
+    with open(spec, encoding="utf-8") as f:
+        return json.load(f)
+
+def _create_backend():
+    if LLM_BACKEND == "scripted":
+        if not LLM_SCRIPT_PATH:
+            raise RuntimeError("LLM_SCRIPT_PATH must point to a JSON script when LLM_BACKEND=scripted")
+        return ScriptedBackend.from_file(LLM_SCRIPT_PATH)
+    if LLM_BACKEND == "openai":
+        scheduler = RequestScheduler(
+            requests_per_minute=float(LLM_REQUESTS_PER_MINUTE) if LLM_REQUESTS_PER_MINUTE else None,
+            tokens_per_minute=float(LLM_TOKENS_PER_MINUTE) if LLM_TOKENS_PER_MINUTE else None,
+            max_attempts=LLM_MAX_ATTEMPTS,
+        )
+        return OpenAIBackend(OPENAI_API_KEY, OPENAI_MODEL, base_url=OPENAI_BASE_URL,
+                             max_connections=LLM_MAX_CONNECTIONS, timeout=LLM_TIMEOUT, scheduler=scheduler)
+    raise RuntimeError(f"Unknown LLM_BACKEND '{LLM_BACKEND}'")
+
+configure_cache(
+    LLM_CACHE_PATH,
+    mode=LLM_CACHE_MODE,
+    max_entries=int(LLM_CACHE_MAX_ENTRIES) if LLM_CACHE_MAX_ENTRIES else None,
+    max_age=float(LLM_CACHE_MAX_AGE) if LLM_CACHE_MAX_AGE else None,
+)
+set_backend(_create_backend())
+configure_routes(load_routes(LLM_ROUTES))
+
+def _cached(prompt: str, max_tokens: int, temperature: float, system: Optional[str] = None,
+            template: Optional[str] = None, streamed: bool = False):
+    """
+    Return (cache_key, early_exit_key, cached_text) for a request; all None without a cache.
+
+    A full answer is stored under cache_key. A streamed request also has an
+    early_exit_key for its cut-short verdict and is served either entry; other
+    requests are only served full answers.
+    """
+    if _cache is None:
+        return None, None, None
+    model = _backend.model_for(template) if hasattr(_backend, "model_for") else _backend.model
+    cache_key = make_cache_key(model, prompt, max_tokens, temperature, system)
+    early_exit_key = None
+    if streamed:
+        early_exit_key = make_cache_key(model, prompt, max_tokens, temperature, system, early_exit=True)
+    cached = _cache.get(cache_key, fallback=early_exit_key)
+    if cached is not None:
+        logger.info(f"Cache hit for prompt: {prompt[:100]}...")
+    return cache_key, early_exit_key, cached
+
+def call_llm(prompt: str, max_tokens: int = 512, temperature: float = 0.0, timeout: Optional[float] = None,
+             template: Optional[str] = None, system: Optional[str] = None, stream_until=None,
+             response_format: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Call the active LLM backend with retries and return the generated text.
+
+    Responses are served from / stored in the response cache when one is configured.
+    Every call is recorded in the active metrics (utils.metrics.get_metrics).
+
+    Args:
+        prompt: Fully formatted prompt.
+        max_tokens: Completion token limit.
+        temperature: Sampling temperature.
+        timeout: Per-call timeout in seconds, defaults to LLM_TIMEOUT.
+        template: Name of the prompt template (e.g. "sufficiency_set"), used for
+            per-template metrics and by backends that answer per template.
+        system: Optional static prefix sent as system message before the prompt.
+            Keeping it identical across calls lets the provider serve it from its
+            prompt cache; cached prompt tokens are reported in the metrics.
+        stream_until: Optional predicate on the text generated so far; the response is
+            streamed and cut short once it holds. A cut-short verdict response is
+            cached as its normalized verdict, {"result": ...}, under a key of its
+            own: it is served to streamed requests only, never in place of a full answer.
+        response_format: Optional structured-output mode, e.g. {"type": "json_object"}.
+    """
+    start = time.perf_counter()
+    cache_key, early_exit_key, cached = _cached(prompt, max_tokens, temperature, system, template,
+                                                streamed=stream_until is not None)
+    if cached is not None:
+        get_metrics().record_call(template, time.perf_counter() - start, cached=True)
+        return cached
 
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY not set in .env file")
+    kwargs = {"stream_until": stream_until} if stream_until is not None else {}
+    if response_format is not None:
+        kwargs["response_format"] = response_format
+    response = _backend.complete(prompt, max_tokens, temperature, timeout=timeout, template=template, system=system,
+                                 **kwargs)
+    get_metrics().record_call(template, time.perf_counter() - start, response.get("usage"),
+                              attempts=response.get("attempts", 1))
+    text = response["text"]
+    if response.get("early_exit"):
+        get_metrics().increment("stream_early_exits")
+        result = verdict_prefix(text)
+        if early_exit_key is not None and result is not None:
+            _cache.put(early_exit_key, json.dumps({"result": result}))
+    elif cache_key is not None:
+        _cache.put(cache_key, text)
+    return text
 
-def call_llm(prompt: str, max_tokens: int = 512, temperature: float = 0.0) -> str:
+def call_llm_json(prompt: str, max_tokens: int = 512, temperature: float = 0.0, timeout: Optional[float] = None,
+                  template: Optional[str] = None, system: Optional[str] = None,
+                  stream: Optional[bool] = None) -> Any:
     """
-    Call OpenAI API with retries and return the generated text.
+    Call the LLM and return its parsed and validated JSON answer.
+
+    Code fences and surrounding text are ignored (see utils.parsing). If the
+    answer cannot be used, only this request is repeated with a repair prompt
+    quoting the parse error, up to LLM_PARSE_REPAIRS times; a truncated answer
+    is repeated with twice the token budget. A verdict cut off after its
+    "result" is only accepted without repair from a stream that was closed on
+    purpose, or once the repairs are used up (its "reason" is then None).
+
+    Args:
+        prompt: Fully formatted prompt.
+        max_tokens: Completion token limit.
+        temperature: Sampling temperature.
+        timeout: Per-call timeout in seconds.
+        template: Prompt template name, selects the schema (utils.parsing.SCHEMAS).
+        system: Optional system message.
+        stream: Stream verdict answers and stop once "result" is complete;
+            defaults to LLM_STREAM_VERDICTS. Only applies to verdict templates.
+
+    With LLM_JSON_MODE, templates answering with a JSON object are requested
+    with response_format {"type": "json_object"}.
+
+    Raises:
+        ResponseParseError: If no valid answer was obtained.
     """
-    headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
-    payload = {
-        "model": OPENAI_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": max_tokens,
-        "temperature": temperature,
-    }
+    stream = LLM_STREAM_VERDICTS if stream is None else stream
+    stream_until = (lambda text: verdict_prefix(text) is not None) if stream and template in VERDICT_TEMPLATES else None
+    json_mode = LLM_JSON_MODE and SCHEMAS.get(template, {}).get("type") is dict
+    response_format = {"type": "json_object"} if json_mode else None
+    text = call_llm(prompt, max_tokens, temperature, timeout, template=template, system=system,
+                    stream_until=stream_until, response_format=response_format)
 
-    for attempt in range(3):
+    for attempt in range(LLM_PARSE_REPAIRS + 1):
         try:
-            logger.info(f"Calling OpenAI (attempt {attempt+1}) with prompt: {prompt[100]}...")
-            resp = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-            resp.raise_for_status()
-            text = resp.json()["choices"][0]["message"]["content"]
-            logger.info(f"Received response: {text}...")
-            return text
-
-        except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout) as e:
-            logger.warning(f"Timeout on attempt {attempt+1}, retrying... Error: {e}")
-            time.sleep(2)
-
-    raise RuntimeError("OpenAI API failed after 3 retries")
+            streamed = stream_until is not None and attempt == 0
+            return parse_response(text, template, partial=streamed or attempt == LLM_PARSE_REPAIRS)
+        except ResponseParseError as e:
+            if attempt == LLM_PARSE_REPAIRS:
+                raise
+            logger.warning(f"Unusable {template} response ({e}), requesting a repair")
+            get_metrics().increment("response_repairs")
+            if e.truncated:
+                max_tokens *= 2
+            repair = REPAIR_JSON_PROMPT.format(prompt=prompt, error=e, response=text[:2000])
+            text = call_llm(repair, max_tokens, temperature, timeout, template=template, system=system,
+                            response_format=response_format)
+
+async def acall_llm(prompt: str, max_tokens: int = 512, temperature: float = 0.0, timeout: Optional[float] = None,
+                    template: Optional[str] = None, system: Optional[str] = None) -> str:
+    """
+    Async counterpart of call_llm.
+
+    With the OpenAI backend requests go through a pooled keep-alive httpx
+    client; at most LLM_MAX_CONNECTIONS requests are in flight at once.
+    """
+    start = time.perf_counter()
+    cache_key, _, cached = _cached(prompt, max_tokens, temperature, system, template)
+    if cached is not None:
+        get_metrics().record_call(template, time.perf_counter() - start, cached=True)
+        return cached
 
+    response = await _backend.acomplete(prompt, max_tokens, temperature, timeout=timeout, template=template,
+                                        system=system)
+    get_metrics().record_call(template, time.perf_counter() - start, response.get("usage"),
+                              attempts=response.get("attempts", 1))
+    text = response["text"]
+    if cache_key is not None:
+        _cache.put(cache_key, text)
+    return text
@@ -0,0 +1,452 @@
+"""
+Pluggable backends behind llm_adapter.call_llm.
+
+A backend turns a prompt into a completion. It exposes:
+
+- complete(prompt, max_tokens, temperature, timeout, template, system, stream_until, response_format)
+  -> {"text": str, "usage": dict, "attempts": int, "early_exit": bool}
+- acomplete(...): async variant
+- model: model name, part of the response cache key
+
+OpenAIBackend talks to any OpenAI-compatible chat completions endpoint,
+including local llama.cpp or vLLM servers.
+ScriptedBackend answers offline from a scripted ground truth, so the pipeline
+can be run and benchmarked without network access or an API key.
+RoutedBackend dispatches each call to a backend chosen by its prompt template.
+"""
+
+import ast
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from prompts.verdict_only import VERDICT_ONLY_PROMPT
+from utils.logger import get_logger
+from utils.rate_limit import RequestScheduler, RETRYABLE_STATUS_CODES, estimate_tokens, parse_retry_after
+
+logger = get_logger()
+
+
+class OpenAIBackend:
+    """
+    OpenAI chat completions backend with pooled keep-alive clients and a request scheduler.
+
+    Args:
+        api_key: Bearer token; checked when the first request is made.
+        model: Model name sent with every request.
+        base_url: API root, e.g. https://api.openai.com/v1.
+        max_connections: Size of the connection pools.
+        timeout: Default per-call timeout in seconds.
+        scheduler: Rate limit and retry policy.
+        require_api_key: Fail without api_key; local servers are called without
+            an Authorization header when this is False.
+    """
+
+    def __init__(self, api_key: Optional[str], model: str, base_url: str = "https://api.openai.com/v1",
+                 max_connections: int = 16, timeout: float = 60.0, scheduler: Optional[RequestScheduler] = None,
+                 require_api_key: bool = True):
+        self.api_key = api_key
+        self.require_api_key = require_api_key
+        self.model = model
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.scheduler = scheduler or RequestScheduler()
+
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop = None
+
+    def _headers(self) -> dict:
+        if not self.api_key:
+            if self.require_api_key:
+                raise RuntimeError("OPENAI_API_KEY not set in .env file")
+            return {"Content-Type": "application/json"}
+        return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+
+    def _payload(self, prompt: str, max_tokens: int, temperature: float, system: Optional[str] = None,
+                 response_format: Optional[dict] = None) -> dict:
+        messages = [{"role": "user", "content": prompt}]
+        if system is not None:
+            messages.insert(0, {"role": "system", "content": system})
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if response_format is not None:
+            payload["response_format"] = response_format
+        return payload
+
+    def get_session(self) -> requests.Session:
+        """Return the keep-alive session shared by all synchronous calls."""
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(self._headers())
+                self._session = session
+            return self._session
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        """Return the keep-alive async client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                headers=self._headers(),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=self.timeout,
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    def close(self):
+        """Close the pooled synchronous session; the async client is dropped."""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+        self._async_client = None
+
+    async def aclose(self):
+        """Close the pooled async client of the running event loop."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def _read_stream(self, resp: requests.Response, stream_until: Callable[[str], bool]) -> Dict[str, Any]:
+        """Accumulate a server-sent-events response until it ends or stream_until(text) holds."""
+        text, usage = "", {}
+        # chunk_size=None yields data as it arrives instead of waiting for full 512 byte blocks
+        for line in resp.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            usage = chunk.get("usage") or usage
+            if chunk.get("choices"):
+                text += chunk["choices"][0].get("delta", {}).get("content") or ""
+                if stream_until(text):
+                    resp.close()
+                    return {"text": text, "usage": usage, "early_exit": True}
+        return {"text": text, "usage": usage, "early_exit": False}
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float, timeout: Optional[float] = None,
+                 template: Optional[str] = None, system: Optional[str] = None,
+                 stream_until: Optional[Callable[[str], bool]] = None,
+                 response_format: Optional[dict] = None) -> Dict[str, Any]:
+        """
+        Call the chat completions endpoint with retries.
+
+        The optional system message is sent before the prompt; a stable system
+        message lets the provider serve it from its prompt-prefix cache.
+        With stream_until the response is streamed and the request is closed
+        as soon as stream_until(text so far) returns True. response_format is
+        passed on as is, e.g. {"type": "json_object"} for JSON mode.
+
+        Returns:
+            Dict with the generated "text", the provider "usage" record, the
+            number of "attempts" it took and whether the stream was cut short
+            ("early_exit").
+
+        Raises:
+            RuntimeError: If every attempt failed.
+        """
+        payload = self._payload(prompt, max_tokens, temperature, system, response_format)
+        if stream_until is not None:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+        session = self.get_session()
+        tokens = estimate_tokens((system or "") + prompt, max_tokens)
+        scheduler = self.scheduler
+
+        for attempt in range(scheduler.max_attempts):
+            scheduler.acquire(tokens)
+            try:
+                logger.info(f"Calling OpenAI (attempt {attempt+1}) with prompt: {prompt[:100]}...")
+                resp = session.post(
+                    f"{self.base_url}/chat/completions",
+                    json=payload,
+                    timeout=timeout or self.timeout,
+                    stream=stream_until is not None,
+                )
+                if resp.status_code in RETRYABLE_STATUS_CODES:
+                    delay = scheduler.backoff(attempt, parse_retry_after(resp.headers.get("Retry-After")))
+                    logger.warning(f"HTTP {resp.status_code} on attempt {attempt+1}, retrying in {delay:.1f}s")
+                    # Release the pooled connection of an unread (streamed) response before retrying
+                    resp.close()
+                    time.sleep(delay)
+                    continue
+                if stream_until is not None:
+                    with resp:
+                        resp.raise_for_status()
+                        result = self._read_stream(resp, stream_until)
+                    logger.info(f"Received streamed response: {result['text']}...")
+                    return {**result, "attempts": attempt + 1}
+                resp.raise_for_status()
+                body = resp.json()
+                text = body["choices"][0]["message"]["content"]
+                logger.info(f"Received response: {text}...")
+                return {"text": text, "usage": body.get("usage", {}), "attempts": attempt + 1}
+
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                delay = scheduler.backoff(attempt)
+                logger.warning(f"Request failed on attempt {attempt+1}, retrying in {delay:.1f}s... Error: {e}")
+                time.sleep(delay)
+
+        raise RuntimeError(f"OpenAI API failed after {scheduler.max_attempts} retries")
+
+    async def acomplete(self, prompt: str, max_tokens: int, temperature: float, timeout: Optional[float] = None,
+                        template: Optional[str] = None, system: Optional[str] = None) -> Dict[str, Any]:
+        """Async variant of complete."""
+        payload = self._payload(prompt, max_tokens, temperature, system)
+        client = self.get_async_client()
+        tokens = estimate_tokens((system or "") + prompt, max_tokens)
+        scheduler = self.scheduler
+
+        for attempt in range(scheduler.max_attempts):
+            await scheduler.aacquire(tokens)
+            try:
+                logger.info(f"Calling OpenAI async (attempt {attempt+1}) with prompt: {prompt[:100]}...")
+                resp = await client.post(
+                    f"{self.base_url}/chat/completions",
+                    json=payload,
+                    timeout=timeout or self.timeout
+                )
+                if resp.status_code in RETRYABLE_STATUS_CODES:
+                    delay = scheduler.backoff(attempt, parse_retry_after(resp.headers.get("Retry-After")))
+                    logger.warning(f"HTTP {resp.status_code} on attempt {attempt+1}, retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                resp.raise_for_status()
+                body = resp.json()
+                text = body["choices"][0]["message"]["content"]
+                logger.info(f"Received response: {text}...")
+                return {"text": text, "usage": body.get("usage", {}), "attempts": attempt + 1}
+
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                delay = scheduler.backoff(attempt)
+                logger.warning(f"Request failed on attempt {attempt+1}, retrying in {delay:.1f}s... Error: {e}")
+                await asyncio.sleep(delay)
+
+        raise RuntimeError(f"OpenAI API failed after {scheduler.max_attempts} retries")
+
+
+def _section(prompt: str, start: str, end: Optional[str] = None) -> str:
+    """Return the prompt text between two markers (or after start if end is None)."""
+    end_pattern = re.escape(end) if end is not None else r"\Z"
+    match = re.search(re.escape(start) + r"\s*(.*?)\s*" + end_pattern, prompt, re.S)
+    if match is None:
+        raise ValueError(f"Prompt does not contain section '{start.strip()}'")
+    return match.group(1)
+
+
+def _parse_list(text: str) -> List[str]:
+    """Parse a cause list rendered into a prompt with Python list formatting."""
+    value = ast.literal_eval(text)
+    if isinstance(value, dict):
+        value = next(iter(value.values()))
+    return list(value)
+
+
+class ScriptedBackend:
+    """
+    Offline backend answering every prompt template from a scripted ground truth.
+
+    Verdicts are rule-based: a set of present causes is sufficient iff it
+    contains one of sufficient_sets, and a set of absent causes makes the
+    effect impossible iff it contains one of necessary_sets.
+
+    Args:
+        causes: Causes returned by decompose_effect (and kept by merge_duplicates).
+        sufficient_sets: Minimal sufficient sets of causes.
+        necessary_sets: Minimal necessary sets of causes.
+        rules: Symbolic rule per cause (or effect) for convert_to_symbolic_rule.
+            Causes default to a shared rule, any other condition (the effect) to
+            a distinct one, so the defaults never make a cause entail the effect.
+        latency: Seconds each call sleeps, to emulate network round trips.
+        model: Model name reported for cache keys.
+    """
+
+    def __init__(self, causes: List[str], sufficient_sets: Optional[List[List[str]]] = None,
+                 necessary_sets: Optional[List[List[str]]] = None, rules: Optional[Dict[str, str]] = None,
+                 latency: float = 0.0, model: str = "scripted"):
+        self.causes = list(causes)
+        self.sufficient_sets = [set(s) for s in sufficient_sets or []]
+        self.necessary_sets = [set(s) for s in necessary_sets or []]
+        self.rules = rules or {}
+        self.latency = latency
+        self.model = model
+        self.calls: Dict[str, int] = {}
+        self._seen_systems = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str) -> "ScriptedBackend":
+        """
+        Load a script from a JSON file with the keys "causes", "sufficient_sets",
+        "necessary_sets" and optionally "rules" and "latency".
+        """
+        with open(path, encoding="utf-8") as f:
+            script = json.load(f)
+        return cls(**script)
+
+    def _answer(self, prompt: str, template: Optional[str]) -> Any:
+        if template is None:
+            raise ValueError("ScriptedBackend answers by template; the prompt was sent without one")
+
+        if template == "decompose_effect":
+            return {"causes": self.causes}
+
+        if template == "merge_duplicates":
+            return {"unique_causes": list(dict.fromkeys(
+                _parse_list(_section(prompt, "Input:", "Instructions for deduplication:"))))}
+
+        if template == "convert_to_symbolic_rule":
+            condition = _section(prompt, "Input:", "Instructions:")
+            default = "∀x(sd-front(x) ← ¬collide(x))" if condition in self.causes else "∀x(goal(x) ← ¬collide(x))"
+            rule = self.rules.get(condition, default)
+            return {"condition": condition, "rule": rule, "thinking": "scripted"}
+
+        if template == "check_necessity":
+            singletons = {next(iter(s)) for s in self.necessary_sets if len(s) == 1}
+            return {"evaluations": [
+                {"cause": c, "result": "necessary" if c in singletons else "not necessary", "reason": "scripted"}
+                for c in self.causes
+            ]}
+
+        if template == "necessity_set":
+            absent = set(_parse_list(_section(prompt, "Cause that is explicitly NOT present (false):")))
+            impossible = any(s <= absent for s in self.necessary_sets)
+            return {"result": "no" if impossible else "yes", "reason": "scripted"}
+
+        if template == "sufficiency_set":
+            present = set(_parse_list(_section(prompt, "Causes that are present:")))
+            sufficient = any(s <= present for s in self.sufficient_sets)
+            return {"result": "yes" if sufficient else "no", "reason": "scripted"}
+
+        if template.endswith("_batch"):
+            single = template[:-len("_batch")]
+            region = _section(prompt, "applying the instructions above to each one.", "Output strictly a JSON array")
+            blocks = re.split(r"^Scenario (\S+):$", region, flags=re.M)[1:]
+            return [{"id": scenario_id, **self._answer(block, single)}
+                    for scenario_id, block in zip(blocks[::2], blocks[1::2])]
+
+        if template in ("necessity_set_verdict", "sufficiency_set_verdict"):
+            answer = self._answer(prompt.replace(VERDICT_ONLY_PROMPT, ""), template[:-len("_verdict")])
+            return {"result": answer["result"]}
+
+        raise ValueError(f"ScriptedBackend has no script for template '{template}'")
+
+    def _respond(self, prompt: str, template: Optional[str], system: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            self.calls[template] = self.calls.get(template, 0) + 1
+            # Emulates provider prefix caching: a repeated system message counts as cached
+            cached = system is not None and system in self._seen_systems
+            if system is not None:
+                self._seen_systems.add(system)
+        text = json.dumps(self._answer(prompt, template), ensure_ascii=False)
+        usage = {"prompt_tokens": len((system or "") + prompt) // 4, "completion_tokens": len(text) // 4,
+                 "prompt_tokens_details": {"cached_tokens": len(system) // 4 if cached else 0}}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        return {"text": text, "usage": usage, "attempts": 1}
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float, timeout: Optional[float] = None,
+                 template: Optional[str] = None, system: Optional[str] = None,
+                 stream_until: Optional[Callable[[str], bool]] = None,
+                 response_format: Optional[dict] = None) -> Dict[str, Any]:
+        """Return the scripted answer after the configured latency (streaming is not emulated)."""
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(prompt, template, system)
+
+    async def acomplete(self, prompt: str, max_tokens: int, temperature: float, timeout: Optional[float] = None,
+                        template: Optional[str] = None, system: Optional[str] = None) -> Dict[str, Any]:
+        """Async variant of complete."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(prompt, template, system)
+
+
+class RoutedBackend:
+    """
+    Dispatches every call to the backend routed for its prompt template.
+
+    The high-volume verdict templates can so be served by a small local model
+    while the generative stages keep the large one. The default backend
+    provides model, scheduler and the HTTP settings changed by
+    llm_adapter.configure_scheduler/configure_http.
+
+    Args:
+        default: Backend for templates without a route.
+        routes: Backend per template name.
+    """
+
+    def __init__(self, default, routes: Dict[str, Any]):
+        self.default = default
+        self.routes = dict(routes)
+
+    @property
+    def model(self) -> str:
+        return self.default.model
+
+    @property
+    def scheduler(self) -> Optional[RequestScheduler]:
+        return getattr(self.default, "scheduler", None)
+
+    @scheduler.setter
+    def scheduler(self, scheduler: RequestScheduler):
+        self.default.scheduler = scheduler
+
+    def backend_for(self, template: Optional[str]):
+        """Return the backend serving a template."""
+        return self.routes.get(template, self.default)
+
+    def model_for(self, template: Optional[str]) -> str:
+        """Return the model serving a template (part of the response cache key)."""
+        return self.backend_for(template).model
+
+    def _backends(self) -> List[Any]:
+        return list({id(backend): backend for backend in [self.default, *self.routes.values()]}.values())
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float, timeout: Optional[float] = None,
+                 template: Optional[str] = None, system: Optional[str] = None,
+                 stream_until: Optional[Callable[[str], bool]] = None,
+                 response_format: Optional[dict] = None) -> Dict[str, Any]:
+        """Call the backend routed for template."""
+        kwargs = {"response_format": response_format} if response_format is not None else {}
+        return self.backend_for(template).complete(prompt, max_tokens, temperature, timeout=timeout,
+                                                   template=template, system=system, stream_until=stream_until,
+                                                   **kwargs)
+
+    async def acomplete(self, prompt: str, max_tokens: int, temperature: float, timeout: Optional[float] = None,
+                        template: Optional[str] = None, system: Optional[str] = None) -> Dict[str, Any]:
+        """Async variant of complete."""
+        return await self.backend_for(template).acomplete(prompt, max_tokens, temperature, timeout=timeout,
+                                                          template=template, system=system)
+
+    def close(self):
+        """Close the pooled clients of all routed backends."""
+        for backend in self._backends():
+            if hasattr(backend, "close"):
+                backend.close()
+
+    async def aclose(self):
+        """Close the pooled async clients of all routed backends."""
+        for backend in self._backends():
+            if hasattr(backend, "aclose"):
+                await backend.aclose()
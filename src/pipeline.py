@@ -1,19 +1,40 @@
+import os
 import json
-from itertools import combinations
+import time
+import hashlib
 from typing import List, Dict, Any
-from llm_adapter import call_llm
+import httpx
+import requests
+from llm_adapter import call_llm, call_llm_json, get_backend, get_cache, get_scheduler, max_tokens_for
 from utils.logger import get_logger
-from utils.laws import format_physics_laws_for_prompt, format_traffic_laws_for_prompt
+from utils.concurrency import map_bounded
+from utils.parsing import ResponseParseError, extract_json
+from utils.similarity import cluster_causes
+from utils.metrics import Metrics, get_metrics, use_metrics
+from utils.stage_graph import StageGraph
+from utils.checkpoint import SearchCheckpoint, load_checkpoint
+from utils.verdict_store import VerdictStore, law_hash
+from lattice import (AnytimeSearch, SearchLimits, indices_to_mask, iter_boundary_minimal_sets,
+                     iter_levelwise_minimal_sets, lattice_order, mask_to_indices, minimal_masks)
+from symbolic import SymbolicScreen
+from results import PipelineResult, build_result, write_jsonl
+from utils.laws import (format_physics_laws_for_prompt, format_relevant_laws_for_prompt,
+                        format_traffic_laws_for_prompt, select_relevant_laws)
 
 from prompts.decompose_effect import DECOMPOSE_EFFECT_PROMPT
 from prompts.merge_duplicates import MERGE_DUPLICATES_PROMPT
 from prompts.convert_to_symbolic_rule import CONVERT_TO_SYMBOLIC_RULE_PROMPT
 from prompts.check_necessity import CHECK_NECESSITY_PROMPT
-from prompts.necessity_set import  NECESSITY_SET_PROMPT
-from prompts.sufficiency_set import SUFFICIENCY_SET_PROMPT
+from prompts.necessity_set import (NECESSITY_SET_BATCH_USER_PROMPT, NECESSITY_SET_SCENARIO,
+                                   NECESSITY_SET_SYSTEM_PROMPT, NECESSITY_SET_USER_PROMPT)
+from prompts.sufficiency_set import (SUFFICIENCY_SET_BATCH_USER_PROMPT, SUFFICIENCY_SET_SCENARIO,
+                                     SUFFICIENCY_SET_SYSTEM_PROMPT, SUFFICIENCY_SET_USER_PROMPT)
+from prompts.verdict_only import VERDICT_ONLY_PROMPT
 
 logger = get_logger()
 
+LAW_SELECTION_MODES = ("full", "relevant", "compare")
+
 
 def decompose_effect(effect: str, legal_laws: List[dict], safety_laws: List[dict]) -> List[str]:
     """
@@ -32,21 +53,27 @@ def decompose_effect(effect: str, legal_laws: List[dict], safety_laws: List[dict
     """
     logger.info("Starting decomposition of effect into causes")
     prompt = DECOMPOSE_EFFECT_PROMPT.format(effect=effect, legal_laws=legal_laws, safety_laws=safety_laws)
-    response = call_llm(prompt, max_tokens=512)
-
     try:
-        causes = json.loads(response)
+        causes = call_llm_json(prompt, max_tokens=512, template="decompose_effect")
         logger.info("Decomposition of effect completed")
         return causes
-    except json.JSONDecodeError:
-        raise ValueError("Failed to parse causes JSON from LLM output")
+    except ResponseParseError as e:
+        raise ValueError(f"Failed to parse causes JSON from LLM output: {e}")
 
-def merge_duplicate_causes(causes: List[dict]) -> List[dict]:
+def merge_duplicate_causes(causes: List[dict], premerge: bool = False, max_workers: int = 1) -> List[dict]:
     """
     Uses an LLM to semantically merge duplicate or equivalent causes.
     
+    With premerge, causes are first clustered locally by lexical similarity
+    (utils.similarity.cluster_causes): near-verbatim duplicates are collapsed
+    to their first occurrence without an LLM call, causes without a similar
+    cause are kept as they are, and only the ambiguous groups are sent to the
+    LLM, one small prompt per group.
+    
     Args:
         causes: List of candidate causes (possibly redundant).
+        premerge: Cluster locally and only ask the LLM about ambiguous groups.
+        max_workers: Maximum number of concurrent LLM calls for ambiguous groups.
     
     Returns:
         List of unique, merged causes.
@@ -54,16 +81,48 @@ def merge_duplicate_causes(causes: List[dict]) -> List[dict]:
     Raises:
         ValueError: If LLM response is not valid JSON.
     """
+    if premerge:
+        return premerge_duplicate_causes(causes, max_workers)
+
     logger.info("Starting removal of duplicate causes")
     prompt = MERGE_DUPLICATES_PROMPT.format(causes=causes)
-    response = call_llm(prompt, max_tokens=512)
-
     try:
-        unique_causes = json.loads(response)
+        unique_causes = call_llm_json(prompt, max_tokens=512, template="merge_duplicates")
         logger.info("Removal of duplicates completed")
         return unique_causes
-    except json.JSONDecodeError:
-        raise ValueError("Failed to parse unique causes JSON from LLM output")
+    except ResponseParseError as e:
+        raise ValueError(f"Failed to parse unique causes JSON from LLM output: {e}")
+
+def premerge_duplicate_causes(causes: List[dict], max_workers: int = 1) -> Dict[str, List[str]]:
+    """
+    Merges duplicate causes locally and asks the LLM only about ambiguous groups.
+    
+    Args:
+        causes: Candidate causes, as list or as decompose_effect output.
+        max_workers: Maximum number of concurrent LLM calls for ambiguous groups.
+    
+    Returns:
+        {"unique_causes": [...]} in order of first occurrence.
+    """
+    cause_list = extract_causes(causes) if isinstance(causes, (dict, str)) else list(causes)
+    groups = cluster_causes(cause_list)
+    metrics = get_metrics()
+
+    def merge_group(group):
+        representatives = [cause_list[cluster[0]] for cluster in group]
+        if len(representatives) == 1:
+            return representatives
+        return extract_unique_causes(merge_duplicate_causes({"causes": representatives}))
+
+    ambiguous = sum(len(group) > 1 for group in groups)
+    auto_merged = len(cause_list) - sum(len(group) for group in groups)
+    logger.info(f"Pre-merge collapsed {auto_merged} of {len(cause_list)} causes locally, "
+                f"sending {ambiguous} ambiguous groups to the LLM")
+    metrics.increment("premerge_auto_merged", auto_merged)
+    metrics.increment("premerge_llm_groups", ambiguous)
+
+    merged = map_bounded(merge_group, groups, max_workers)
+    return {"unique_causes": [cause for group in merged for cause in group]}
 
 def check_necessity(effect: str, causes: List[dict], legal_laws: List[dict], safety_laws: List[dict]) -> List[dict]:
     """
@@ -83,16 +142,16 @@ def check_necessity(effect: str, causes: List[dict], legal_laws: List[dict], saf
     """
     logger.info("Checking necessary causes")
     prompt = CHECK_NECESSITY_PROMPT.format(effect=effect, causes=causes, legal_laws=legal_laws, safety_laws=safety_laws)
-    response = call_llm(prompt, max_tokens=15000)
-
     try:
-        necessary_causes = json.loads(response)
+        max_tokens = max_tokens_for("check_necessity", 15000, items=len(causes))
+        necessary_causes = call_llm_json(prompt, max_tokens=max_tokens, template="check_necessity")
         logger.info("Evaluation of individual necessary causes completed")
         return necessary_causes
-    except json.JSONDecodeError:
-        raise ValueError("Failed to parse evaluated necessary causes JSON from LLM output")
+    except ResponseParseError as e:
+        raise ValueError(f"Failed to parse evaluated necessary causes JSON from LLM output: {e}")
 
-def necessity_set(effect: str, causes: List[dict], absent_cause: str, legal_laws: List[dict], safety_laws: List[dict]) -> List[dict]:
+def necessity_set(effect: str, causes: List[dict], absent_cause: str, legal_laws: List[dict], safety_laws: List[dict],
+                  verdict_only: bool = False, explain: bool = False) -> List[dict]:
     """
     Extracts necessity set by testing whether removing specific causes prevents the effect.
     
@@ -102,6 +161,10 @@ def necessity_set(effect: str, causes: List[dict], absent_cause: str, legal_laws
         absent_cause: Cause(s) removed in this counterfactual test.
         legal_laws: Legal constraints.
         safety_laws: Safety/physics constraints.
+        verdict_only: Ask for the "result" alone (template "necessity_set_verdict");
+            the "reason" of the answer is then None.
+        explain: The answer is wanted for its reason: it is not streamed and may
+            use the full 15000 tokens instead of the template's budget.
     
     Returns:
         Result indicating whether the absent cause is truly necessary.
@@ -110,17 +173,23 @@ def necessity_set(effect: str, causes: List[dict], absent_cause: str, legal_laws
         ValueError: If LLM response is not valid JSON.
     """
     logger.info("Validation necessary causes")
-    prompt = NECESSITY_SET_PROMPT.format(effect=effect, causes=causes,absent_cause=absent_cause, legal_laws=legal_laws, safety_laws=safety_laws)
-    response = call_llm(prompt, max_tokens=15000)
-
+    system = NECESSITY_SET_SYSTEM_PROMPT.format(effect=effect, legal_laws=legal_laws, safety_laws=safety_laws)
+    prompt = NECESSITY_SET_USER_PROMPT.format(causes=causes, absent_cause=absent_cause)
+    template = "necessity_set"
+    if verdict_only:
+        prompt += VERDICT_ONLY_PROMPT
+        template = "necessity_set_verdict"
+    max_tokens = 15000 if explain else max_tokens_for(template, 15000)
     try:
-        validation = json.loads(response)
+        validation = call_llm_json(prompt, max_tokens=max_tokens, template=template, system=system,
+                                   stream=False if explain else None)
         logger.info("Validation of necessary causes completed")
         return validation
-    except json.JSONDecodeError:
-        raise ValueError("Failed to parse validation JSON from LLM output")
+    except ResponseParseError as e:
+        raise ValueError(f"Failed to parse validation JSON from LLM output: {e}")
 
-def sufficiency_set(effect: str, causes: List[dict], present_causes:  List[dict], legal_laws: List[dict], safety_laws: List[dict]) -> List[dict]:
+def sufficiency_set(effect: str, causes: List[dict], present_causes:  List[dict], legal_laws: List[dict], safety_laws: List[dict],
+                    verdict_only: bool = False, explain: bool = False) -> List[dict]:
     """
     Extracts sufficiency set by testing whether a set of present causes alone guarantees the effect.
     
@@ -130,6 +199,10 @@ def sufficiency_set(effect: str, causes: List[dict], present_causes:  List[dict]
         present_causes: Causes assumed present.
         legal_laws: Legal constraints.
         safety_laws: Safety/physics constraints.
+        verdict_only: Ask for the "result" alone (template "sufficiency_set_verdict");
+            the "reason" of the answer is then None.
+        explain: The answer is wanted for its reason: it is not streamed and may
+            use the full 15000 tokens instead of the template's budget.
     
     Returns:
         Result indicating whether present causes are sufficient.
@@ -138,15 +211,137 @@ def sufficiency_set(effect: str, causes: List[dict], present_causes:  List[dict]
         ValueError: If LLM response is not valid JSON.
     """
     logger.info("Validation of sufficient causes")
-    prompt = SUFFICIENCY_SET_PROMPT.format(effect=effect, causes=causes,present_causes=present_causes, legal_laws=legal_laws, safety_laws=safety_laws)
-    response = call_llm(prompt, max_tokens=15000)
-
+    system = SUFFICIENCY_SET_SYSTEM_PROMPT.format(effect=effect, legal_laws=legal_laws, safety_laws=safety_laws)
+    prompt = SUFFICIENCY_SET_USER_PROMPT.format(causes=causes, present_causes=present_causes)
+    template = "sufficiency_set"
+    if verdict_only:
+        prompt += VERDICT_ONLY_PROMPT
+        template = "sufficiency_set_verdict"
+    max_tokens = 15000 if explain else max_tokens_for(template, 15000)
     try:
-        validation = json.loads(response)
+        validation = call_llm_json(prompt, max_tokens=max_tokens, template=template, system=system,
+                                   stream=False if explain else None)
         logger.info("Validation of sufficient causes completed")
         return validation
-    except json.JSONDecodeError:
-        raise ValueError("Failed to parse validation JSON from LLM output")
+    except ResponseParseError as e:
+        raise ValueError(f"Failed to parse validation JSON from LLM output: {e}")
+
+def _parse_batch_verdicts(response: str, ids: List[str]) -> Dict[str, dict]:
+    """
+    Returns the well-formed verdicts of a batched response keyed by scenario id.
+    
+    Items with an unknown id or without a "yes"/"no" result are dropped, so
+    the caller can re-request them individually.
+    """
+    try:
+        items = extract_json(response)
+    except ResponseParseError:
+        return {}
+    if isinstance(items, dict):
+        items = items.get("results", [])
+    if not isinstance(items, list):
+        return {}
+
+    verdicts = {}
+    for item in items:
+        if isinstance(item, dict) and str(item.get("id")) in ids and item.get("result") in ("yes", "no"):
+            verdicts[str(item["id"])] = item
+    return verdicts
+
+def batched_verdicts(template: str, system: str, batch_prompt: str, scenario_prompt: str,
+                     scenarios: List[Dict[str, Any]], single, verdict_only: bool = False) -> List[dict]:
+    """
+    Requests verdicts for several scenarios in one call and validates the answer.
+    
+    Scenarios are numbered 1..K in the prompt; the response must be a JSON array
+    with one {"id", "result", "reason"} object per scenario. Scenarios without a
+    valid answer are evaluated with one single call each.
+    
+    Args:
+        template: Name of the single-scenario template; the batched call is
+            recorded as "<template>_batch".
+        system: Static system message shared with the single-scenario calls.
+        batch_prompt: User message template with a {scenarios} field.
+        scenario_prompt: Template of one scenario with an {id} field.
+        scenarios: Fields of scenario_prompt per scenario.
+        single: Function evaluating one scenario, used as fallback.
+        verdict_only: Ask for {"id", "result"} objects without reasons; the call is
+            then recorded as "<template>_verdict_batch".
+    
+    Returns:
+        Verdicts aligned with scenarios.
+    """
+    ids = [str(i) for i in range(1, len(scenarios) + 1)]
+    prompt = batch_prompt.format(scenarios="\n".join(
+        scenario_prompt.format(id=scenario_id, **scenario) for scenario_id, scenario in zip(ids, scenarios)))
+    batch_template = f"{template}_batch"
+    if verdict_only:
+        prompt += VERDICT_ONLY_PROMPT
+        batch_template = f"{template}_verdict_batch"
+    response = call_llm(prompt, max_tokens=max_tokens_for(batch_template, 15000, items=len(scenarios)),
+                        template=batch_template, system=system)
+    verdicts = _parse_batch_verdicts(response, ids)
+
+    missing = [scenario_id for scenario_id in ids if scenario_id not in verdicts]
+    metrics = get_metrics()
+    metrics.increment("batched_verdicts", len(ids) - len(missing))
+    if missing:
+        logger.warning(f"Batched {template} call answered {len(ids) - len(missing)} of {len(ids)} scenarios, "
+                       f"evaluating {len(missing)} individually")
+        metrics.increment("batch_fallback_verdicts", len(missing))
+        for scenario_id in missing:
+            verdicts[scenario_id] = single(scenarios[int(scenario_id) - 1])
+    return [verdicts[scenario_id] for scenario_id in ids]
+
+def necessity_set_batch(effect: str, scenarios: List[tuple], legal_laws: List[dict], safety_laws: List[dict],
+                        verdict_only: bool = False) -> List[dict]:
+    """
+    Batched necessity_set: evaluates several (present causes, absent causes) scenarios in one request.
+    
+    Args:
+        effect: Target outcome.
+        scenarios: (causes assumed present, causes removed) per scenario.
+        legal_laws: Legal constraints.
+        safety_laws: Safety/physics constraints.
+        verdict_only: Ask for the verdicts without reasons.
+    
+    Returns:
+        One necessity_set result per scenario.
+    """
+    logger.info(f"Validation of {len(scenarios)} necessity scenarios in one request")
+    system = NECESSITY_SET_SYSTEM_PROMPT.format(effect=effect, legal_laws=legal_laws, safety_laws=safety_laws)
+    return batched_verdicts(
+        "necessity_set", system, NECESSITY_SET_BATCH_USER_PROMPT, NECESSITY_SET_SCENARIO,
+        [{"causes": present, "absent_cause": absent} for present, absent in scenarios],
+        lambda scenario: necessity_set(effect, scenario["causes"], scenario["absent_cause"], legal_laws, safety_laws,
+                                       verdict_only=verdict_only),
+        verdict_only=verdict_only,
+    )
+
+def sufficiency_set_batch(effect: str, scenarios: List[tuple], legal_laws: List[dict], safety_laws: List[dict],
+                          verdict_only: bool = False) -> List[dict]:
+    """
+    Batched sufficiency_set: evaluates several (absent causes, present causes) scenarios in one request.
+    
+    Args:
+        effect: Target outcome.
+        scenarios: (causes assumed absent, causes assumed present) per scenario.
+        legal_laws: Legal constraints.
+        safety_laws: Safety/physics constraints.
+        verdict_only: Ask for the verdicts without reasons.
+    
+    Returns:
+        One sufficiency_set result per scenario.
+    """
+    logger.info(f"Validation of {len(scenarios)} sufficiency scenarios in one request")
+    system = SUFFICIENCY_SET_SYSTEM_PROMPT.format(effect=effect, legal_laws=legal_laws, safety_laws=safety_laws)
+    return batched_verdicts(
+        "sufficiency_set", system, SUFFICIENCY_SET_BATCH_USER_PROMPT, SUFFICIENCY_SET_SCENARIO,
+        [{"causes": absent, "present_causes": present} for absent, present in scenarios],
+        lambda scenario: sufficiency_set(effect, scenario["causes"], scenario["present_causes"], legal_laws,
+                                         safety_laws, verdict_only=verdict_only),
+        verdict_only=verdict_only,
+    )
 
 def convert_to_symbolic_rule(condition: str)-> Dict[str,Any]:
     """
@@ -163,14 +358,173 @@ def convert_to_symbolic_rule(condition: str)-> Dict[str,Any]:
     """
     logger.info("Starting converting condition to symbolic rule")
     prompt = CONVERT_TO_SYMBOLIC_RULE_PROMPT.format(condition=condition)
-    response = call_llm(prompt, max_tokens=15000)
-
     try:
-        rule = json.loads(response)
+        rule = call_llm_json(prompt, max_tokens=max_tokens_for("convert_to_symbolic_rule", 15000),
+                             template="convert_to_symbolic_rule")
         logger.info("Converstion completed")
         return rule
-    except json.JSONDecodeError:
-        raise ValueError("Failed to parse converted rule JSON from LLM output")
+    except ResponseParseError as e:
+        raise ValueError(f"Failed to parse converted rule JSON from LLM output: {e}")
+
+def convert_causes_to_rules(causes: List[str], max_workers: int = 1) -> List[Dict[str, Any]]:
+    """
+    Converts every cause into a symbolic rule, with up to max_workers conversions in flight.
+    
+    Conversions are independent, so they are fanned out concurrently. The
+    output order matches the input order, and a failed conversion (unusable
+    answer, exhausted retries, HTTP error or timeout) does not discard the
+    others: its slot is None and the error is logged.
+    
+    Args:
+        causes: Natural language causes.
+        max_workers: Maximum number of concurrent conversions.
+    
+    Returns:
+        Symbolic rules aligned with causes (None where the conversion failed).
+    """
+    def convert(cause):
+        try:
+            return convert_to_symbolic_rule(cause)
+        except (ValueError, RuntimeError, requests.RequestException, httpx.HTTPError) as e:
+            logger.error(f"Conversion to symbolic rule failed for cause '{cause}': {e}")
+            return None
+
+    rules = map_bounded(convert, causes, max_workers)
+    failed = sum(rule is None for rule in rules)
+    if failed:
+        logger.warning(f"{failed} of {len(causes)} symbolic rule conversions failed")
+        get_metrics().increment("symbolic_rule_failures", failed)
+    return rules
+
+def build_symbolic_screen(effect: str, rules: List[Dict[str, Any]]) -> SymbolicScreen:
+    """
+    Converts the effect into a symbolic rule and builds the local z3 pre-screen
+    from it and the cause rules.
+    
+    Args:
+        effect: Target outcome.
+        rules: Output of convert_causes_to_rules.
+    
+    Returns:
+        SymbolicScreen answering the subset questions decided by the rules.
+    """
+    try:
+        effect_rule = convert_to_symbolic_rule(effect).get("rule")
+    except (ValueError, RuntimeError) as e:
+        logger.error(f"Conversion of the effect to a symbolic rule failed: {e}")
+        effect_rule = None
+    return SymbolicScreen([rule.get("rule") if isinstance(rule, dict) else None for rule in rules], effect_rule)
+
+def budgeted_queries(query, query_batch, limits):
+    """
+    Wraps the LLM queries of a search so that each one is charged to the call
+    budget of limits; subsets beyond the budget or deadline are left undecided
+    (None), which stops the search. Applied innermost, so that subsets answered
+    by a checkpoint, the verdict store or the symbolic screen cost nothing.
+    """
+    if limits is None:
+        return query, query_batch
+
+    def budgeted_query(mask):
+        return query(mask) if limits.reserve(1) else None
+
+    def budgeted_query_batch(masks):
+        granted = limits.reserve(len(masks))
+        verdicts = query_batch(masks[:granted]) if granted else []
+        return list(verdicts) + [None] * (len(masks) - granted)
+
+    return budgeted_query, budgeted_query_batch
+
+def screen_queries(query, query_batch, decide):
+    """
+    Wraps the subset queries of a search so that subsets decided locally
+    (decide returns a verdict instead of None) never reach the LLM.
+    """
+    if decide is None:
+        return query, query_batch
+    metrics = get_metrics()
+
+    def screened_query(mask):
+        verdict = decide(mask)
+        if verdict is None:
+            return query(mask)
+        metrics.increment("symbolic_screen_verdicts")
+        return verdict
+
+    def screened_query_batch(masks):
+        verdicts = [decide(mask) for mask in masks]
+        undecided = [mask for mask, verdict in zip(masks, verdicts) if verdict is None]
+        if len(undecided) < len(masks):
+            metrics.increment("symbolic_screen_verdicts", len(masks) - len(undecided))
+        answered = iter(query_batch(undecided) if undecided else [])
+        return [next(answered) if verdict is None else verdict for verdict in verdicts]
+
+    return screened_query, screened_query_batch
+
+def stored_queries(query, query_batch, store, kind, effect, laws, present_of):
+    """
+    Wraps the subset queries of a search so that verdicts found in the
+    VerdictStore are reused and new LLM verdicts are added to it.
+    present_of maps a subset mask to the (present, absent) causes of its scenario.
+    """
+    if store is None:
+        return query, query_batch
+    metrics = get_metrics()
+
+    def lookup(mask):
+        return store.lookup(kind, effect, laws, present_of(mask)[0])
+
+    def record(mask, verdict):
+        present, absent = present_of(mask)
+        store.record(kind, effect, laws, present, absent, verdict)
+
+    def stored_query(mask):
+        verdict = lookup(mask)
+        if verdict is not None:
+            metrics.increment("verdict_store_reused")
+            return verdict
+        verdict = query(mask)
+        if verdict is not None:
+            record(mask, verdict)
+        return verdict
+
+    def stored_query_batch(masks):
+        verdicts = [lookup(mask) for mask in masks]
+        missing = [mask for mask, verdict in zip(masks, verdicts) if verdict is None]
+        if len(missing) < len(masks):
+            metrics.increment("verdict_store_reused", len(masks) - len(missing))
+        new = dict(zip(missing, query_batch(missing))) if missing else {}
+        for mask, verdict in new.items():
+            if verdict is not None:
+                record(mask, verdict)
+        return [new[mask] if verdict is None else verdict for mask, verdict in zip(masks, verdicts)]
+
+    return stored_query, stored_query_batch
+
+def stored_seeds(store, kind, effect, laws, causes, present_of):
+    """
+    Returns the minimal sets of earlier searches that are still minimal over causes.
+
+    A prior set is used if all of its causes are still there, its own verdict is
+    stored as positive and the verdicts of all subsets with one cause less are
+    stored as negative (which, the verdicts being monotone, proves minimality).
+    """
+    if store is None:
+        return []
+    seeds = []
+    for subset in store.prior_minimal_sets(kind, effect, laws):
+        if not all(cause in causes for cause in subset):
+            continue
+        mask = indices_to_mask(causes.index(cause) for cause in subset)
+        if store.lookup(kind, effect, laws, present_of(mask)[0]) is not True:
+            continue
+        smaller = [mask & ~(1 << i) for i in mask_to_indices(mask)]
+        if all(s == 0 or store.lookup(kind, effect, laws, present_of(s)[0]) is False for s in smaller):
+            seeds.append(mask)
+    if seeds:
+        logger.info(f"Seeding {kind} search with {len(seeds)} minimal sets of earlier runs")
+        get_metrics().increment("verdict_store_seeded_sets", len(seeds))
+    return seeds
 
 def extract_necessary_causes(llm_output):
     # Convert string to dict if needed
@@ -185,6 +539,14 @@ def extract_necessary_causes(llm_output):
         if item["result"] == "necessary"
     ]
 
+def split_necessity(llm_output):
+    """
+    Returns the raw check_necessity output together with the causes classified as necessary.
+    """
+    if isinstance(llm_output, str):
+        llm_output = json.loads(llm_output)
+    return {"necessity": llm_output, "necessary_causes": extract_necessary_causes(llm_output)}
+
 def extract_sufficient_causes(llm_output):
     # Convert string to dict if needed
     if isinstance(llm_output, str):
@@ -216,50 +578,221 @@ def extract_causes(llm_output):
 
     return evaluations
 
-def prune_necessary_causes(effect, necessary_causes, traffic_laws, physics_laws):
+def iter_search_minimal_sets(n, query, max_workers=1, strategy="levelwise", label="Subset", checkpoint=None,
+                             query_batch=None, batch_size=1, seeds=None, limits=None, stats=None):
+    """
+    Runs the selected lattice search over n causes, yielding minimal sets as they
+    are confirmed, and logs how many verdicts were issued vs inferred.
+    
+    Args:
+        n: Number of causes.
+        query: Function deciding a single subset given as a bitmask over cause indices;
+            None leaves the subset undecided and stops the search (see budgeted_queries).
+        max_workers: Maximum number of concurrent queries per level (levelwise only).
+        strategy: "levelwise" or "boundary".
+        label: Name of the search used in log messages.
+        checkpoint: Optional SearchCheckpoint; recorded verdicts are answered
+            from it and new verdicts are written to it.
+        query_batch: Optional function deciding a list of subsets with one LLM call.
+        batch_size: Number of subsets per query_batch call (levelwise only); the
+            batches of a level are evaluated with up to max_workers in flight.
+        seeds: Subsets known to be minimal positive; they are not queried, and
+            are recorded in the checkpoint as positive verdicts.
+        limits: Optional lattice.SearchLimits bounding the wall-clock time and the
+            set size; its call budget is charged by the queries themselves.
+        stats: Dict receiving the search statistics, including "complete".
+    
+    Yields:
+        Minimal positive subsets as bitmasks.
+    """
+    metrics = get_metrics()
+    stats = {} if stats is None else stats
+    on_level = None
+    if checkpoint is not None:
+        raw_query = query
+
+        def query(mask):
+            verdict = checkpoint.lookup(mask)
+            if verdict is not None:
+                metrics.increment("checkpoint_verdicts_reused")
+                return verdict
+            verdict = raw_query(mask)
+            if verdict is not None:
+                checkpoint.record(mask, verdict)
+            return verdict
+
+        if query_batch is not None:
+            raw_query_batch = query_batch
+
+            def query_batch(masks):
+                verdicts = [checkpoint.lookup(mask) for mask in masks]
+                missing = [mask for mask, verdict in zip(masks, verdicts) if verdict is None]
+                if len(missing) < len(masks):
+                    metrics.increment("checkpoint_verdicts_reused", len(masks) - len(missing))
+                new = dict(zip(missing, raw_query_batch(missing))) if missing else {}
+                for mask, verdict in new.items():
+                    if verdict is not None:
+                        checkpoint.record(mask, verdict)
+                return [new[mask] if verdict is None else verdict for mask, verdict in zip(masks, verdicts)]
+
+        on_level = checkpoint.update_progress
+        for seed in seeds or []:
+            if checkpoint.lookup(seed) is None:
+                checkpoint.record(seed, True)
+
+    def evaluate(candidates):
+        if query_batch is None or batch_size <= 1:
+            return map_bounded(query, candidates, max_workers)
+        chunks = [candidates[i:i + batch_size] for i in range(0, len(candidates), batch_size)]
+        return [verdict for chunk in map_bounded(query_batch, chunks, max_workers) for verdict in chunk]
+
+    found = []
+    try:
+        if strategy == "boundary":
+            masks = iter_boundary_minimal_sets(n, query, seeds=seeds, limits=limits, stats=stats)
+        elif strategy == "levelwise":
+            # With limits, check them after every round of concurrent requests instead of every level
+            chunk_size = max(1, max_workers) * max(1, batch_size) if limits is not None else None
+            masks = iter_levelwise_minimal_sets(n, evaluate, on_level=on_level, seeds=seeds, limits=limits,
+                                                chunk_size=chunk_size, stats=stats)
+        else:
+            raise ValueError(f"Unknown search strategy '{strategy}'")
+
+        for mask in masks:
+            found.append(mask)
+            yield mask
+
+        if checkpoint is not None:
+            checkpoint.update_progress(checkpoint.progress["level"], sorted(found, key=lattice_order))
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+    logger.info(f"{label} search queried {stats['issued']} subsets, inferred {stats['inferred']} verdicts")
+    metrics.increment(f"{label.lower()}_search_issued", stats["issued"])
+    metrics.increment(f"{label.lower()}_search_inferred", stats["inferred"])
+    if not stats["complete"]:
+        logger.warning(f"{label} search stopped early ({stats['stop_reason']}) with {len(found)} minimal sets")
+        metrics.increment("incomplete_searches")
+
+def search_minimal_sets(n, query, max_workers=1, strategy="levelwise", label="Subset", checkpoint=None,
+                        query_batch=None, batch_size=1, seeds=None):
+    """
+    Runs the selected lattice search over n causes to its end (see iter_search_minimal_sets).
+    
+    Returns:
+        Minimal positive subsets as bitmasks, in level-wise order.
+    """
+    masks = iter_search_minimal_sets(n, query, max_workers, strategy, label, checkpoint=checkpoint,
+                                     query_batch=query_batch, batch_size=batch_size, seeds=seeds)
+    return sorted(masks, key=lattice_order)
+
+def prune_necessary_causes(effect, necessary_causes, traffic_laws, physics_laws, max_workers=1, strategy="levelwise",
+                           checkpoint_path=None, batch_size=1, seed_causes=None, store=None, limits=None,
+                           verdict_only=False):
     """
     Computes minimal necessary cause subsets using combinatorial search with memoized LLM validation.
     
     A subset is minimal necessary if removing it prevents the effect and
     no proper subset has this property.
+
+    Subsets of equal size are evaluated as one batch (concurrently if
+    max_workers > 1); supersets of the minimal subsets found in a batch are
+    skipped from the next size on, so the output matches the serial search.
+    Causes are identified by their index and subsets are int bitmasks.
     
     Args:
         effect: Target outcome.
         necessary_causes: Candidate necessary causes.
         traffic_laws: Legal constraints.
         physics_laws: Safety/physics constraints.
+        max_workers: Maximum number of concurrent necessity_set calls per subset size.
+        strategy: "levelwise" enumerates the lattice by subset size, "boundary"
+            also infers verdicts from negative results (see lattice.boundary_minimal_sets).
+        checkpoint_path: Optional file to periodically save the search state to;
+            an existing checkpoint of the same search is resumed.
+        batch_size: Subsets of one level evaluated per request (levelwise only);
+            1 sends one request per subset.
+        seed_causes: Causes already judged individually necessary (check_necessity);
+            they are recorded as minimal necessary singletons without a call, and
+            no subset containing one of them is searched, so the search runs over
+            the 2^(n-k) subsets of the remaining causes.
+        store: Optional VerdictStore; stored verdicts of earlier runs are reused,
+            new ones are added, and prior minimal sets that are still minimal seed the search.
+        limits: Optional lattice.SearchLimits; the search stops early when its call
+            budget or deadline is exhausted and skips sets above its max_size. Only
+            subsets sent to the LLM are charged to the budget.
+        verdict_only: Ask for verdicts without reasons (see explain_necessary_sets).
     
     Returns:
         List of minimal necessary cause subsets.
     """
+    return necessity_search(effect, necessary_causes, traffic_laws, physics_laws, max_workers, strategy,
+                            checkpoint_path, batch_size, seed_causes, store, limits, verdict_only).run()
+
+def necessity_search(effect, necessary_causes, traffic_laws, physics_laws, max_workers=1, strategy="levelwise",
+                     checkpoint_path=None, batch_size=1, seed_causes=None, store=None, limits=None,
+                     verdict_only=False):
+    """
+    Anytime version of prune_necessary_causes (same arguments).
+    
+    Returns:
+        AnytimeSearch yielding each minimal necessary cause subset as soon as it is
+        confirmed; its complete flag tells whether the search ran to its end.
+    """
     pruned = necessary_causes.copy()
-    found_minimal_subsets = []
+    full = (1 << len(pruned)) - 1
     memo = {}
 
-    def is_necessary(test_causes, absent_causes):
-        key = (tuple(sorted(test_causes)), tuple(sorted(absent_causes)))
-        if key in memo:
-            return memo[key]
-        result = necessity_set(effect, test_causes, absent_causes, traffic_laws, physics_laws)
-        memo[key] = result.get("result") == "no"
-        return memo[key]
-
-    n = len(pruned)
-    # Start with singletons
-    for r in range(1, n + 1):
-        for subset in combinations(pruned, r):
-            # Skip if any already-found subset is fully contained in this one
-            if any(s <= set(subset) for s in found_minimal_subsets):
-                continue
-            present_causes = [c for c in pruned if c not in subset]
-            absent_causes = list(subset)
-            logger.info(f"\nPresent Causes:\n{present_causes}")
-            logger.info(f"Absent Causes:\n{absent_causes}")
-            if is_necessary(present_causes, absent_causes):
-                found_minimal_subsets.append(set(subset))
-
-    minimal_subsets = [list(s) for s in found_minimal_subsets]
-    return minimal_subsets
+    def is_necessary(absent_mask):
+        if absent_mask in memo:
+            return memo[absent_mask]
+        present_causes = [pruned[i] for i in mask_to_indices(full & ~absent_mask)]
+        absent_causes = [pruned[i] for i in mask_to_indices(absent_mask)]
+        logger.info(f"\nPresent Causes:\n{present_causes}")
+        logger.info(f"Absent Causes:\n{absent_causes}")
+        result = necessity_set(effect, present_causes, absent_causes, traffic_laws, physics_laws,
+                               verdict_only=verdict_only)
+        memo[absent_mask] = result.get("result") == "no"
+        return memo[absent_mask]
+
+    def are_necessary(absent_masks):
+        scenarios = [([pruned[i] for i in mask_to_indices(full & ~mask)], [pruned[i] for i in mask_to_indices(mask)])
+                     for mask in absent_masks]
+        results = necessity_set_batch(effect, scenarios, traffic_laws, physics_laws, verdict_only=verdict_only)
+        for mask, result in zip(absent_masks, results):
+            memo[mask] = result.get("result") == "no"
+        return [memo[mask] for mask in absent_masks]
+
+    checkpoint = None
+    if checkpoint_path:
+        checkpoint = SearchCheckpoint(checkpoint_path, "necessity", effect, pruned, traffic_laws, physics_laws, strategy)
+
+    seeds = [1 << pruned.index(cause) for cause in dict.fromkeys(seed_causes or []) if cause in pruned]
+    if seeds:
+        logger.info(f"Seeding necessity search with {len(seeds)} individually necessary causes, "
+                    f"searching subsets of the remaining {len(pruned) - len(seeds)} causes")
+        get_metrics().increment("necessity_seeded_sets", len(seeds))
+
+    def scenario(absent_mask):
+        return ([pruned[i] for i in mask_to_indices(full & ~absent_mask)],
+                [pruned[i] for i in mask_to_indices(absent_mask)])
+
+    laws = law_hash(traffic_laws, physics_laws)
+    seeds = minimal_masks(seeds + stored_seeds(store, "necessity", effect, laws, pruned, scenario))
+    query, query_batch = budgeted_queries(is_necessary, are_necessary, limits)
+    query, query_batch = stored_queries(query, query_batch, store, "necessity", effect, laws, scenario)
+    stats = {}
+    masks = iter_search_minimal_sets(len(pruned), query, max_workers, strategy, label="Necessity",
+                                     checkpoint=checkpoint, query_batch=query_batch, batch_size=batch_size,
+                                     seeds=seeds, limits=limits, stats=stats)
+
+    def record(search):
+        if store is not None:
+            store.record_minimal_sets("necessity", effect, laws, pruned, search.found)
+
+    return AnytimeSearch(masks, stats, decode=lambda mask: [pruned[i] for i in mask_to_indices(mask)],
+                         on_finish=record)
 
 def log_necessary_sets(necessary_sets):
     """
@@ -274,58 +807,142 @@ def log_necessary_sets(necessary_sets):
         for cause in subset:
             logger.info(f"  - {cause}")
 
-def prune_sufficient_causes(effect,causes,traffic_laws,physics_laws):
+def prune_sufficient_causes(effect,causes,traffic_laws,physics_laws,max_workers=1,strategy="levelwise",
+                            checkpoint_path=None,batch_size=1,screen=None,store=None,limits=None,
+                            verdict_only=False):
     """
     Computes minimal sufficient cause subsets using level-wise combinatorial search.
     
     A subset is minimal sufficient if it guarantees the effect and
     no proper subset is already sufficient.
+
+    The search is level-synchronous: all candidates of size r that survive the
+    superset pruning are evaluated (concurrently if max_workers > 1) before the
+    newly found sets are used to prune level r+1. Candidates of the same size
+    cannot be supersets of each other, so the result is identical to a serial walk.
+    Causes are identified by their index and subsets are int bitmasks.
     
     Args:
         effect: Target outcome.
         causes: Candidate causes.
         traffic_laws: Legal constraints.
         physics_laws: Safety/physics constraints.
+        max_workers: Maximum number of concurrent sufficiency_set calls per level.
+        strategy: "levelwise" enumerates the lattice by subset size, "boundary"
+            also infers verdicts from negative results (see lattice.boundary_minimal_sets).
+        checkpoint_path: Optional file to periodically save the search state to;
+            an existing checkpoint of the same search is resumed.
+        batch_size: Subsets of one level evaluated per request (levelwise only);
+            1 sends one request per subset.
+        screen: Optional SymbolicScreen; subsets it decides are not sent to the LLM.
+        store: Optional VerdictStore; stored verdicts of earlier runs are reused,
+            new ones are added, and prior minimal sets that are still minimal seed the search.
+        limits: Optional lattice.SearchLimits; the search stops early when its call
+            budget or deadline is exhausted and skips sets above its max_size. Only
+            subsets sent to the LLM are charged to the budget.
+        verdict_only: Ask for verdicts without reasons (see explain_sufficient_sets).
     
     Returns:
         List of minimal sufficient cause subsets.
     """
+    return sufficiency_search(effect, causes, traffic_laws, physics_laws, max_workers, strategy,
+                              checkpoint_path, batch_size, screen, store, limits, verdict_only).run()
+
+def sufficiency_search(effect, causes, traffic_laws, physics_laws, max_workers=1, strategy="levelwise",
+                       checkpoint_path=None, batch_size=1, screen=None, store=None, limits=None,
+                       verdict_only=False):
+    """
+    Anytime version of prune_sufficient_causes (same arguments).
+    
+    Returns:
+        AnytimeSearch yielding each minimal sufficient cause subset as soon as it is
+        confirmed; its complete flag tells whether the search ran to its end.
+    """
     pruned = causes.copy()
-    minimal_sufficient_sets = []
-
-    # We grow subset size level by level
-    for r in range(1, len(pruned) + 1):
-        for combo in combinations(pruned, r):
-            present_causes = list(combo)
-
-            # --- PRUNE RULE: skip supersets of already sufficient sets ---
-            skip = False
-            for s in minimal_sufficient_sets:
-                if set(s).issubset(set(present_causes)):
-                    skip = True
-                    break
-            if skip:
-                logger.info(f"Skipping (superset of known sufficient set): {present_causes}")
-                continue
-
-            absent_causes = [c for c in pruned if c not in present_causes]
-
-            logger.info(f"Present Causes:\n{present_causes}")
-            logger.info(f"Absent Causes:\n{absent_causes}")
-
-            response = sufficiency_set(
-                effect,
-                absent_causes,
-                present_causes,
-                traffic_laws,
-                physics_laws
-            )
+    full = (1 << len(pruned)) - 1
+
+    def is_sufficient(present_mask):
+        present_causes = [pruned[i] for i in mask_to_indices(present_mask)]
+        absent_causes = [pruned[i] for i in mask_to_indices(full & ~present_mask)]
+
+        logger.info(f"Present Causes:\n{present_causes}")
+        logger.info(f"Absent Causes:\n{absent_causes}")
+
+        response = sufficiency_set(
+            effect,
+            absent_causes,
+            present_causes,
+            traffic_laws,
+            physics_laws,
+            verdict_only=verdict_only,
+        )
+        if response.get("result") == "yes":
+            logger.info(f"Sufficient set found:\n{present_causes}")
+            return True
+        return False
+
+    def are_sufficient(present_masks):
+        scenarios = [([pruned[i] for i in mask_to_indices(full & ~mask)], [pruned[i] for i in mask_to_indices(mask)])
+                     for mask in present_masks]
+        results = sufficiency_set_batch(effect, scenarios, traffic_laws, physics_laws, verdict_only=verdict_only)
+        return [result.get("result") == "yes" for result in results]
 
-            if response.get("result") == "yes":
-                logger.info(f"Minimal sufficient set found:\n{present_causes}")
-                minimal_sufficient_sets.append(present_causes)
+    checkpoint = None
+    if checkpoint_path:
+        checkpoint = SearchCheckpoint(checkpoint_path, "sufficiency", effect, pruned, traffic_laws, physics_laws, strategy)
 
-    return minimal_sufficient_sets
+    def scenario(present_mask):
+        return ([pruned[i] for i in mask_to_indices(present_mask)],
+                [pruned[i] for i in mask_to_indices(full & ~present_mask)])
+
+    laws = law_hash(traffic_laws, physics_laws)
+    seeds = stored_seeds(store, "sufficiency", effect, laws, pruned, scenario)
+    query, query_batch = budgeted_queries(is_sufficient, are_sufficient, limits)
+    query, query_batch = stored_queries(query, query_batch, store, "sufficiency", effect, laws, scenario)
+    query, query_batch = screen_queries(query, query_batch, screen.decide_sufficiency if screen else None)
+    stats = {}
+    masks = iter_search_minimal_sets(len(pruned), query, max_workers, strategy, label="Sufficiency",
+                                     checkpoint=checkpoint, query_batch=query_batch, batch_size=batch_size,
+                                     seeds=seeds, limits=limits, stats=stats)
+
+    def record(search):
+        if store is not None:
+            store.record_minimal_sets("sufficiency", effect, laws, pruned, search.found)
+
+    return AnytimeSearch(masks, stats, decode=lambda mask: [pruned[i] for i in mask_to_indices(mask)],
+                         on_finish=record)
+
+def resume_search(checkpoint_path, max_workers=1, strategy=None, batch_size=1):
+    """
+    Resumes an interrupted subset search from its checkpoint file.
+    
+    The effect, causes and laws are taken from the checkpoint; verdicts recorded
+    in it are not requested from the LLM again.
+    
+    Args:
+        checkpoint_path: Checkpoint written by prune_necessary_causes or prune_sufficient_causes.
+        max_workers: Maximum number of concurrent LLM calls per level.
+        strategy: Search strategy; defaults to the one of the interrupted run.
+        batch_size: Subsets evaluated per request (levelwise only).
+    
+    Returns:
+        List of minimal necessary or sufficient cause subsets.
+    
+    Raises:
+        ValueError: If the file is not a valid checkpoint.
+    """
+    state = load_checkpoint(checkpoint_path)
+    prune = prune_necessary_causes if state["kind"] == "necessity" else prune_sufficient_causes
+    return prune(
+        state["effect"],
+        state["causes"],
+        state["legal_laws"],
+        state["safety_laws"],
+        max_workers=max_workers,
+        strategy=strategy or state.get("strategy", "levelwise"),
+        checkpoint_path=checkpoint_path,
+        batch_size=batch_size,
+    )
 
 def log_sufficient_sets(sufficient_sets):
     """
@@ -340,7 +957,94 @@ def log_sufficient_sets(sufficient_sets):
         for cause in subset:
             logger.info(f"  - {cause}")
 
-def run_pipeline(effect: str):
+def checked_reason(response, expected, label, subset):
+    """
+    Returns the reason of an explain answer, logging answers that contradict
+    the search verdict or come without a reason.
+    """
+    metrics = get_metrics()
+    if response.get("result") != expected:
+        logger.warning(f"{label} verdict changed when asking for its reason:\n{subset}")
+        metrics.increment("reason_verdict_mismatches")
+    if response.get("reason") is None:
+        logger.warning(f"{label} answer has no reason:\n{subset}")
+        metrics.increment("missing_reasons")
+    return response.get("reason")
+
+def explain_necessary_sets(effect, causes, necessary_sets, traffic_laws, physics_laws, max_workers=1):
+    """
+    Asks for the reasons of the minimal necessary sets found by a verdict-only search.
+    
+    Each set is asked once more with the full necessity_set prompt (the set absent,
+    all other causes present), without streaming and with the full token limit.
+    An answer that no longer confirms the set is logged and counted as
+    "reason_verdict_mismatches"; the set is kept. Sets whose answer still has
+    no reason (repairs used up) are counted as "missing_reasons".
+    
+    Returns:
+        Reasons aligned with necessary_sets.
+    """
+    def explain(subset):
+        present_causes = [cause for cause in causes if cause not in subset]
+        response = necessity_set(effect, present_causes, list(subset), traffic_laws, physics_laws, explain=True)
+        return checked_reason(response, "no", "Necessity", subset)
+
+    return map_bounded(explain, necessary_sets, max_workers)
+
+def explain_sufficient_sets(effect, causes, sufficient_sets, traffic_laws, physics_laws, max_workers=1):
+    """
+    Asks for the reasons of the minimal sufficient sets found by a verdict-only search.
+    
+    Each set is asked once more with the full sufficiency_set prompt (the set
+    present, all other causes absent); see explain_necessary_sets.
+    
+    Returns:
+        Reasons aligned with sufficient_sets.
+    """
+    def explain(subset):
+        absent_causes = [cause for cause in causes if cause not in subset]
+        response = sufficiency_set(effect, absent_causes, list(subset), traffic_laws, physics_laws, explain=True)
+        return checked_reason(response, "yes", "Sufficiency", subset)
+
+    return map_bounded(explain, sufficient_sets, max_workers)
+
+def reason_tokens_saved(summary):
+    """
+    Estimates the completion tokens saved by verdict-only calls of a run summary:
+    each verdict-only call is assumed to have cost as many tokens as the mean full
+    call of the same question in the run (usually the reason calls of the minimal sets).
+    """
+    totals = {}
+    for row in summary.get("llm_calls", []):
+        entry = totals.setdefault(row["template"], [0, 0])
+        entry[0] += row["calls"]
+        entry[1] += row["completion_tokens"]
+
+    saved = 0
+    for template in ("necessity_set", "sufficiency_set"):
+        full_calls, full_tokens = totals.get(template, (0, 0))
+        verdict_calls, verdict_tokens = totals.get(f"{template}_verdict", (0, 0))
+        if full_calls and verdict_calls:
+            saved += max(0, round(verdict_calls * full_tokens / full_calls - verdict_tokens))
+    return saved
+
+def checkpoint_file(checkpoint_dir, effect, kind):
+    """
+    Returns the checkpoint path of one search of an effect, or None without a checkpoint folder.
+    """
+    if not checkpoint_dir:
+        return None
+    digest = hashlib.sha256(effect.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(checkpoint_dir, f"{digest}_{kind}.json")
+
+def run_pipeline(effect: str, max_workers: int = 1, strategy: str = "levelwise", trace_path: str = None,
+                 stage_workers: int = 1, legal_laws: str = None, safety_laws: str = None,
+                 checkpoint_dir: str = None, law_selection: str = "full",
+                 verdict_batch_size: int = 1, symbolic_screen: bool = False,
+                 premerge: bool = False, seed_necessity: bool = False,
+                 verdict_store_dir: str = None, search_budget: int = None,
+                 search_time_limit: float = None, max_set_size: int = None,
+                 verdict_only: bool = False) -> PipelineResult:
     """
     Executes the full causal analysis pipeline:
     
@@ -351,46 +1055,323 @@ def run_pipeline(effect: str):
     5. Identify necessary causes.
     6. Compute minimal necessary subsets.
     7. Compute minimal sufficient subsets.
+
+    The stages are run as a dependency graph: steps 4-7 only depend on the
+    merged causes and run concurrently when stage_workers > 1. Per-stage
+    timings, the critical path and per-template LLM call metrics are logged
+    as a JSON summary at the end of the run.
     
     Args:
         effect: High-level outcome to analyze.
+        max_workers: Maximum number of concurrent LLM calls within one search level
+            and during the symbolic rule conversion.
+        strategy: Subset search strategy, "levelwise" or "boundary".
+        trace_path: Optional JSON Lines file receiving every stage and LLM call event.
+        stage_workers: Maximum number of independent stages running at the same time.
+        legal_laws: Prompt-ready traffic laws; formatted from utils.laws if omitted.
+        safety_laws: Prompt-ready physics laws; formatted from utils.laws if omitted.
+        checkpoint_dir: Optional folder for subset search checkpoints; re-running the
+            same effect with the same folder resumes interrupted searches.
+        law_selection: "full" sends all laws with every prompt; "relevant" only the
+            laws selected by utils.laws.select_relevant_laws for the effect and its
+            causes; "compare" works like "relevant" and additionally runs
+            check_necessity with all laws to report verdict agreement in the metrics.
+        verdict_batch_size: Subsets of one search level evaluated per LLM request
+            (levelwise strategy only); 1 sends one request per subset.
+        symbolic_screen: Also convert the effect into a symbolic rule and answer the
+            sufficiency questions that follow logically from the rules locally with z3
+            (see symbolic.SymbolicScreen); the sufficiency search then waits for the
+            rule conversion.
+        premerge: Collapse lexical duplicates locally before merge_duplicates and only
+            send ambiguous groups of similar causes to the LLM.
+        seed_necessity: Seed the necessity search with the causes check_necessity judged
+            individually necessary instead of asking about these singletons again; the
+            search then waits for check_necessity.
+        verdict_store_dir: Optional folder for the persistent verdict store of the effect
+            (see utils.verdict_store); re-runs with changed causes or laws only ask
+            about the subsets whose scenario or law text changed.
+        search_budget: Maximum number of subset queries of both searches together.
+        search_time_limit: Seconds from the start of the run after which the searches
+            issue no new queries.
+        max_set_size: Largest minimal set size searched for.
+        verdict_only: Ask the subset searches for verdicts without reasons and fetch
+            the reasons of the minimal sets afterwards (one call per set).
+
+    Returns:
+        PipelineResult with the unique causes (symbolic rule and necessity verdict
+        per cause), minimal necessary and sufficient sets as cause-id tuples, and
+        the metrics summary. With search limits, the sets found before a limit was
+        reached are returned and complete is False.
     """
-    logger.info(f"Fetching predefined rules/laws")
-    legal_laws = format_traffic_laws_for_prompt()
-    safety_laws = format_physics_laws_for_prompt()
+    with use_metrics(Metrics()) as metrics:
+        limits = None
+        if search_budget is not None or search_time_limit is not None or max_set_size is not None:
+            deadline = time.time() + search_time_limit if search_time_limit is not None else None
+            limits = SearchLimits(max_calls=search_budget, deadline=deadline, max_size=max_set_size)
+
+        if legal_laws is None or safety_laws is None:
+            logger.info(f"Fetching predefined rules/laws")
+            legal_laws = legal_laws or format_traffic_laws_for_prompt()
+            safety_laws = safety_laws or format_physics_laws_for_prompt()
 
-    logger.info(f"Starting pipeline for effect:\n{effect}")
+        logger.info(f"Starting pipeline for effect:\n{effect}")
 
-    causes = decompose_effect(effect,legal_laws,safety_laws)
-    c = extract_causes(causes)
-    unique_causes = merge_duplicate_causes(causes)
-    uc = extract_unique_causes(unique_causes)
+        if law_selection not in LAW_SELECTION_MODES:
+            raise ValueError(f"Unknown law selection mode '{law_selection}'")
+        initial = {"effect": effect}
+        if law_selection == "full":
+            initial.update(legal_laws=legal_laws, safety_laws=safety_laws,
+                           effect_legal_laws=legal_laws, effect_safety_laws=safety_laws)
+        else:
+            # The causes are not known before decomposition, so it sees the laws relevant to the effect alone
+            effect_legal_laws, effect_safety_laws = format_relevant_laws_for_prompt(effect)
+            initial.update(full_legal_laws=legal_laws, full_safety_laws=safety_laws,
+                           effect_legal_laws=effect_legal_laws, effect_safety_laws=effect_safety_laws)
 
-    all_rules = []
-    for cond in uc:
-        rules = convert_to_symbolic_rule(cond)
-        all_rules.append(rules)
+        if not symbolic_screen:
+            initial["screen"] = None
+        if not seed_necessity:
+            initial["necessity_seeds"] = None
+        if not verdict_only:
+            initial.update(necessary_reasons=None, sufficient_reasons=None)
+        store = None
+        if verdict_store_dir:
+            store = VerdictStore(checkpoint_file(verdict_store_dir, effect, "verdicts"))
+
+        graph = StageGraph()
+        graph.add_stage(
+            "decompose_effect",
+            lambda effect, effect_legal_laws, effect_safety_laws: decompose_effect(
+                effect, effect_legal_laws, effect_safety_laws),
+            inputs=["effect", "effect_legal_laws", "effect_safety_laws"], outputs=["causes"],
+        )
+        graph.add_stage(
+            "merge_duplicates",
+            lambda causes: extract_unique_causes(
+                merge_duplicate_causes(causes, premerge=premerge, max_workers=max_workers)),
+            inputs=["causes"], outputs=["uc"],
+        )
+        if law_selection != "full":
+            graph.add_stage(
+                "select_laws",
+                lambda effect, uc, full_legal_laws, full_safety_laws: select_laws(
+                    effect, uc, full_legal_laws, full_safety_laws),
+                inputs=["effect", "uc", "full_legal_laws", "full_safety_laws"], outputs=["legal_laws", "safety_laws"],
+            )
+        if law_selection == "compare":
+            graph.add_stage(
+                "compare_law_selection",
+                lambda effect, uc, full_legal_laws, full_safety_laws, necessity: compare_law_selection(
+                    effect, uc, full_legal_laws, full_safety_laws, necessity),
+                inputs=["effect", "uc", "full_legal_laws", "full_safety_laws", "necessity"],
+                outputs=["law_comparison"],
+            )
+        graph.add_stage(
+            "convert_to_symbolic_rule",
+            lambda uc: convert_causes_to_rules(uc, max_workers=max_workers),
+            inputs=["uc"], outputs=["all_rules"],
+        )
+        if symbolic_screen:
+            graph.add_stage(
+                "build_symbolic_screen",
+                lambda effect, all_rules: build_symbolic_screen(effect, all_rules),
+                inputs=["effect", "all_rules"], outputs=["screen"],
+            )
+        graph.add_stage(
+            "check_necessity",
+            lambda effect, uc, legal_laws, safety_laws: split_necessity(
+                check_necessity(effect, uc, legal_laws, safety_laws)),
+            inputs=["effect", "uc", "legal_laws", "safety_laws"], outputs=["necessity", "necessary_causes"],
+        )
+        if seed_necessity:
+            graph.add_stage(
+                "seed_necessity",
+                lambda necessary_causes: list(necessary_causes),
+                inputs=["necessary_causes"], outputs=["necessity_seeds"],
+            )
+        graph.add_stage(
+            "prune_necessary_causes",
+            lambda effect, uc, legal_laws, safety_laws, necessity_seeds: run_search(necessity_search(
+                effect, uc, legal_laws, safety_laws, max_workers=max_workers, strategy=strategy,
+                checkpoint_path=checkpoint_file(checkpoint_dir, effect, "necessity"),
+                batch_size=verdict_batch_size, seed_causes=necessity_seeds, store=store,
+                limits=limits, verdict_only=verdict_only), "necessary"),
+            inputs=["effect", "uc", "legal_laws", "safety_laws", "necessity_seeds"],
+            outputs=["necessary_sets", "necessary_complete"],
+        )
+        graph.add_stage(
+            "prune_sufficient_causes",
+            lambda effect, uc, legal_laws, safety_laws, screen: run_search(sufficiency_search(
+                effect, uc, legal_laws, safety_laws, max_workers=max_workers, strategy=strategy,
+                checkpoint_path=checkpoint_file(checkpoint_dir, effect, "sufficiency"),
+                batch_size=verdict_batch_size, screen=screen, store=store, limits=limits,
+                verdict_only=verdict_only), "sufficient"),
+            inputs=["effect", "uc", "legal_laws", "safety_laws", "screen"],
+            outputs=["sufficient_sets", "sufficient_complete"],
+        )
+        if verdict_only:
+            graph.add_stage(
+                "explain_necessary_sets",
+                lambda effect, uc, necessary_sets, legal_laws, safety_laws: explain_necessary_sets(
+                    effect, uc, necessary_sets, legal_laws, safety_laws, max_workers=max_workers),
+                inputs=["effect", "uc", "necessary_sets", "legal_laws", "safety_laws"],
+                outputs=["necessary_reasons"],
+            )
+            graph.add_stage(
+                "explain_sufficient_sets",
+                lambda effect, uc, sufficient_sets, legal_laws, safety_laws: explain_sufficient_sets(
+                    effect, uc, sufficient_sets, legal_laws, safety_laws, max_workers=max_workers),
+                inputs=["effect", "uc", "sufficient_sets", "legal_laws", "safety_laws"],
+                outputs=["sufficient_reasons"],
+            )
 
-    marked_necessary_conditions = check_necessity(effect,uc,legal_laws,safety_laws)
+        try:
+            values = graph.run(initial, max_workers=stage_workers)
+        finally:
+            if store is not None:
+                store.close()
 
-    necessary_causes = extract_necessary_causes(marked_necessary_conditions)
+        logger.info(f"Only necessary causes:\n{values['necessary_causes']}")
+        log_necessary_sets(values["necessary_sets"])
+        log_sufficient_sets(values["sufficient_sets"])
 
-    logger.info(f"Only necessary causes:\n{necessary_causes}")
+        path, duration = graph.critical_path()
+        logger.info(f"Critical path ({duration:.2f}s): {' -> '.join(path)}")
+        metrics.annotate("critical_path", {"stages": path, "duration": duration})
+        if verdict_only:
+            metrics.increment("reason_tokens_saved", reason_tokens_saved(metrics.summary()))
 
-    logger.info(f"Starting validation for necessary conditions------------------")
+    summary = log_run_metrics(metrics, trace_path)
+
+    logger.info("Pipeline finished successfully.")
+    return build_result(
+        effect,
+        values["uc"],
+        values["all_rules"],
+        values["necessity"],
+        values["necessary_sets"],
+        values["sufficient_sets"],
+        metrics=summary,
+        complete=values["necessary_complete"] and values["sufficient_complete"],
+        necessary_reasons=values["necessary_reasons"],
+        sufficient_reasons=values["sufficient_reasons"],
+    )
+
+def run_search(search, name):
+    """
+    Runs an AnytimeSearch to its end and returns the stage outputs
+    "<name>_sets" and "<name>_complete".
+    """
+    sets = search.run()
+    return {f"{name}_sets": sets, f"{name}_complete": search.complete}
+
+def select_laws(effect, causes, legal_laws, safety_laws):
+    """
+    Selects the laws relevant to an effect and its causes for the downstream prompts.
     
-    log_necessary_sets(prune_necessary_causes(effect,uc,legal_laws,safety_laws))
+    The selection is made once per effect, so all prompts of the subset searches
+    share the same law text. Prompt sizes of the full and the selected laws are
+    recorded in the metrics.
     
-    logger.info(f"Starting validation for sufficient conditions------------------")
+    Args:
+        effect: Target outcome.
+        causes: Unique causes.
+        legal_laws: Full legal constraints text.
+        safety_laws: Full safety/physics constraints text.
+    
+    Returns:
+        Dict with the selected "legal_laws" and "safety_laws" texts.
+    """
+    traffic, physics = select_relevant_laws(effect, causes)
+    selected_legal, selected_safety = format_relevant_laws_for_prompt(effect, causes)
+    logger.info(f"Selected {len(traffic)} traffic laws and {len(physics)} physics laws:\n{traffic + physics}")
+    get_metrics().annotate("law_selection", {
+        "traffic_laws": traffic,
+        "physics_laws": physics,
+        "full_chars": len(legal_laws) + len(safety_laws),
+        "selected_chars": len(selected_legal) + len(selected_safety),
+    })
+    return {"legal_laws": selected_legal, "safety_laws": selected_safety}
 
-    log_sufficient_sets(prune_sufficient_causes(effect,uc,legal_laws,safety_laws))
+def compare_law_selection(effect, causes, legal_laws, safety_laws, necessity):
+    """
+    Re-runs check_necessity with all laws and compares the per-cause verdicts
+    with the ones obtained with the selected laws.
+    
+    Args:
+        effect: Target outcome.
+        causes: Unique causes.
+        legal_laws: Full legal constraints text.
+        safety_laws: Full safety/physics constraints text.
+        necessity: check_necessity output obtained with the selected laws.
+    
+    Returns:
+        Dict with the number of "agreements" and the causes with differing verdicts as "disagreements".
+    """
+    baseline = check_necessity(effect, causes, legal_laws, safety_laws)
+    selected = {item["cause"]: item.get("result") for item in necessity.get("evaluations", [])}
+    agreements, disagreements = 0, []
+    for item in baseline.get("evaluations", []):
+        if selected.get(item["cause"]) == item.get("result"):
+            agreements += 1
+        else:
+            disagreements.append({"cause": item["cause"], "full": item.get("result"),
+                                  "selected": selected.get(item["cause"])})
 
-    logger.info("Pipeline finished successfully.")
+    if disagreements:
+        logger.warning(f"Law selection changed {len(disagreements)} necessity verdicts:\n{disagreements}")
+    metrics = get_metrics()
+    metrics.increment("law_selection_agreements", agreements)
+    metrics.increment("law_selection_disagreements", len(disagreements))
+    comparison = {"agreements": agreements, "disagreements": disagreements}
+    metrics.annotate("law_comparison", comparison)
+    return comparison
+
+def log_run_metrics(metrics, trace_path=None):
+    """
+    Logs the JSON metrics summary of a run, including cache and scheduler stats,
+    and optionally writes the event trace.
+    """
+    summary = metrics.summary()
+    cache = get_cache()
+    if cache is not None:
+        summary["cache"] = cache.stats()
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        summary["scheduler"] = scheduler.stats()
+    routes = getattr(get_backend(), "routes", None)
+    if routes:
+        summary["routes"] = {template: backend.model for template, backend in routes.items()}
+
+    logger.info(f"Run metrics:\n{json.dumps(summary, indent=2)}")
+
+    if trace_path:
+        metrics.write_trace(trace_path)
+        logger.info(f"Wrote trace to {trace_path}")
+    return summary
 
 if __name__ == "__main__":
     # You can change the top-level effect here to test the pipeline with a different goal
     top_effect_example = "Maintain a constant speed on a highway segment"
-    run_pipeline(top_effect_example)
-
-    
-    
\ No newline at end of file
+    result = run_pipeline(
+        top_effect_example,
+        max_workers=int(os.getenv("PIPELINE_MAX_WORKERS", "1")),
+        strategy=os.getenv("PIPELINE_SEARCH_STRATEGY", "levelwise"),
+        trace_path=os.getenv("PIPELINE_TRACE_PATH"),
+        stage_workers=int(os.getenv("PIPELINE_STAGE_WORKERS", "1")),
+        checkpoint_dir=os.getenv("PIPELINE_CHECKPOINT_DIR"),
+        law_selection=os.getenv("PIPELINE_LAW_SELECTION", "full"),
+        verdict_batch_size=int(os.getenv("PIPELINE_VERDICT_BATCH_SIZE", "1")),
+        symbolic_screen=os.getenv("PIPELINE_SYMBOLIC_SCREEN", "0") == "1",
+        premerge=os.getenv("PIPELINE_PREMERGE", "0") == "1",
+        seed_necessity=os.getenv("PIPELINE_SEED_NECESSITY", "0") == "1",
+        verdict_store_dir=os.getenv("PIPELINE_VERDICT_STORE_DIR"),
+        search_budget=int(os.environ["PIPELINE_SEARCH_BUDGET"]) if os.getenv("PIPELINE_SEARCH_BUDGET") else None,
+        search_time_limit=float(os.environ["PIPELINE_SEARCH_TIME_LIMIT"]) if os.getenv("PIPELINE_SEARCH_TIME_LIMIT") else None,
+        max_set_size=int(os.environ["PIPELINE_MAX_SET_SIZE"]) if os.getenv("PIPELINE_MAX_SET_SIZE") else None,
+        verdict_only=os.getenv("PIPELINE_VERDICT_ONLY", "0") == "1",
+    )
+    result_path = os.getenv("PIPELINE_RESULT_PATH")
+    if result_path:
+        write_jsonl([result], result_path, append=True)
+        logger.info(f"Appended result to {result_path}")
@@ -2,8 +2,12 @@ from .convert_to_symbolic_rule import CONVERT_TO_SYMBOLIC_RULE_PROMPT
 from .decompose_effect import DECOMPOSE_EFFECT_PROMPT
 from .merge_duplicates import MERGE_DUPLICATES_PROMPT
 from .check_necessity import CHECK_NECESSITY_PROMPT
-from .necessity_set import NECESSITY_SET_PROMPT
-from .sufficiency_set import SUFFICIENCY_SET_PROMPT
+from .repair_json import REPAIR_JSON_PROMPT
+from .verdict_only import VERDICT_ONLY_PROMPT
+from .necessity_set import (NECESSITY_SET_BATCH_USER_PROMPT, NECESSITY_SET_PROMPT, NECESSITY_SET_SCENARIO,
+                            NECESSITY_SET_SYSTEM_PROMPT, NECESSITY_SET_USER_PROMPT)
+from .sufficiency_set import (SUFFICIENCY_SET_BATCH_USER_PROMPT, SUFFICIENCY_SET_PROMPT, SUFFICIENCY_SET_SCENARIO,
+                              SUFFICIENCY_SET_SYSTEM_PROMPT, SUFFICIENCY_SET_USER_PROMPT)
 
 __all__ = [
     "DECOMPOSE_EFFECT_PROMPT",
@@ -11,6 +15,16 @@ __all__ = [
     "CONVERT_TO_SYMBOLIC_RULE_PROMPT",
     "CHECK_NECESSITY_PROMPT",
     "NECESSITY_SET_PROMPT",
-    "SUFFICIENCY_SET_PROMPT"
+    "NECESSITY_SET_SYSTEM_PROMPT",
+    "NECESSITY_SET_USER_PROMPT",
+    "NECESSITY_SET_SCENARIO",
+    "NECESSITY_SET_BATCH_USER_PROMPT",
+    "SUFFICIENCY_SET_PROMPT",
+    "SUFFICIENCY_SET_SYSTEM_PROMPT",
+    "SUFFICIENCY_SET_USER_PROMPT",
+    "SUFFICIENCY_SET_SCENARIO",
+    "SUFFICIENCY_SET_BATCH_USER_PROMPT",
+    "REPAIR_JSON_PROMPT",
+    "VERDICT_ONLY_PROMPT",
 
 ]
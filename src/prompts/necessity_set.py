@@ -1,4 +1,7 @@
-NECESSITY_SET_PROMPT = '''
+# The static part (instructions, output format, laws, effect) is sent as the
+# system message and is identical for every subset of one effect, so providers
+# can serve it from their prompt cache; only the user message varies per subset.
+NECESSITY_SET_SYSTEM_PROMPT = '''
 You are an expert in causal verification for an Autonomous Vehicle (AV) system.
 You must strictly rely on legal laws and safety laws.
 
@@ -52,29 +55,56 @@ Instructions:
     - "not necessary" if the effect can still occur without violating any law.
 - Provide a precise explanation citing legal as well as safety aspect of laws that determine the necessity.
 
+Output strictly in JSON:
+
+{{
+  "result": "yes" or "no",
+  "reason": <reason>
+}}
+
+IMPORTANT: Output must be strictly JSON, without any markdown, backticks, or explanations.
+
 You are given:
 
+Legal laws:
+{legal_laws}
+
+Safety laws:
+{safety_laws}
+
 Effect:
 {effect}
+'''
 
+NECESSITY_SET_USER_PROMPT = '''
 Causes that are present:
 {causes}
 
 Cause that is explicitly NOT present (false):
 {absent_cause}
+'''
 
-Legal laws:
-{legal_laws}
+NECESSITY_SET_PROMPT = NECESSITY_SET_SYSTEM_PROMPT + NECESSITY_SET_USER_PROMPT
 
-Safety laws:
-{safety_laws} 
+# Batched variant: one request holds several scenarios of the same effect and
+# shares the system message above.
+NECESSITY_SET_SCENARIO = '''Scenario {id}:
+Causes that are present:
+{causes}
 
-Output strictly in JSON:
+Cause that is explicitly NOT present (false):
+{absent_cause}
+'''
 
-{{
-  "result": "yes" or "no",
-  "reason": <reason>
-}}
+NECESSITY_SET_BATCH_USER_PROMPT = '''
+Evaluate each of the following scenarios independently, applying the instructions above to each one.
+
+{scenarios}
+Output strictly a JSON array with one object per scenario, instead of the single object described above:
+
+[
+  {{"id": <scenario id>, "result": "yes" or "no", "reason": <reason>}}
+]
 
 IMPORTANT: Output must be strictly JSON, without any markdown, backticks, or explanations.
 '''
@@ -0,0 +1,11 @@
+REPAIR_JSON_PROMPT = '''{prompt}
+
+Your previous answer to this request could not be used:
+{error}
+
+Previous answer:
+{response}
+
+Answer the request again.
+IMPORTANT: Output must be strictly JSON, without any markdown, backticks, or explanations.
+'''
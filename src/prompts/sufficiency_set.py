@@ -1,4 +1,7 @@
-SUFFICIENCY_SET_PROMPT='''
+# The static part (instructions, output format, laws, effect) is sent as the
+# system message and is identical for every subset of one effect, so providers
+# can serve it from their prompt cache; only the user message varies per subset.
+SUFFICIENCY_SET_SYSTEM_PROMPT = '''
 You are an expert in causal verification for an Autonomous Vehicle (AV) system.
 You must strictly rely on legal laws and safety laws.
 
@@ -26,30 +29,56 @@ Instructions:
   - "not sufficient" if they do not logically guarantee the effect.
 - Provide a precise explanation grounded strictly in the provided legal and safety laws that determine the sufficiency.
 
+Output strictly in JSON:
+
+{{
+  "result": "yes" or "no",
+  "reason": <reason>
+}}
+
+IMPORTANT: Output must be strictly JSON, without any markdown, backticks, or explanations.
+
 You are given:
 
+Legal laws:
+{legal_laws}
+
+Safety laws:
+{safety_laws}
+
 Effect:
 {effect}
+'''
 
+SUFFICIENCY_SET_USER_PROMPT = '''
 Causes that are absent that are explicitly NOT present (false):
 {causes}
 
 Causes that are present:
 {present_causes}
+'''
 
-Legal laws:
-{legal_laws}
+SUFFICIENCY_SET_PROMPT = SUFFICIENCY_SET_SYSTEM_PROMPT + SUFFICIENCY_SET_USER_PROMPT
 
-Safety laws:
-{safety_laws} 
+# Batched variant: one request holds several scenarios of the same effect and
+# shares the system message above.
+SUFFICIENCY_SET_SCENARIO = '''Scenario {id}:
+Causes that are absent that are explicitly NOT present (false):
+{causes}
 
+Causes that are present:
+{present_causes}
+'''
 
-Output strictly in JSON:
+SUFFICIENCY_SET_BATCH_USER_PROMPT = '''
+Evaluate each of the following scenarios independently, applying the instructions above to each one.
 
-{{
-  "result": "yes" or "no",
-  "reason": <reason>
-}}
+{scenarios}
+Output strictly a JSON array with one object per scenario, instead of the single object described above:
+
+[
+  {{"id": <scenario id>, "result": "yes" or "no", "reason": <reason>}}
+]
 
 IMPORTANT: Output must be strictly JSON, without any markdown, backticks, or explanations.
 '''
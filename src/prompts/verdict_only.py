@@ -0,0 +1,7 @@
+# Appended to the user message of necessity_set/sufficiency_set (single or batched)
+# when only the verdict is needed; the system message stays the same, so its
+# prompt-prefix cache entry is shared with the calls that ask for a reason.
+VERDICT_ONLY_PROMPT = '''
+Answer with the verdict only: leave out the "reason" field and output nothing but the "result" (and the scenario "id" when several scenarios are given).
+IMPORTANT: Output must be strictly JSON, without any markdown, backticks, or explanations.
+'''
@@ -0,0 +1,262 @@
+"""
+Typed results of a pipeline run and their serializers.
+
+A PipelineResult holds the unique causes of an effect (each with its symbolic
+rule and individual necessity verdict), the minimal necessary and sufficient
+sets as tuples of cause ids, and the run metrics. Cause ids are the positions
+of the causes in PipelineResult.causes.
+
+Results can be written as JSON Lines (one compact object per effect) or as
+columnar tables through pandas (Parquet needs pyarrow or fastparquet):
+
+- effects: one row per effect
+- causes: one row per (effect, cause)
+- sets: one row per (effect, kind, minimal set)
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class Cause:
+    """
+    One unique cause of an effect.
+
+    Attributes:
+        id: Position of the cause in PipelineResult.causes.
+        text: Natural language cause.
+        rule: Symbolic rule, None if the conversion failed.
+        necessary: Individual necessity verdict from check_necessity, None if
+            the LLM returned no verdict for the cause.
+        necessity_reason: Reason given with the verdict.
+    """
+    id: int
+    text: str
+    rule: Optional[str] = None
+    necessary: Optional[bool] = None
+    necessity_reason: Optional[str] = None
+
+
+@dataclass
+class PipelineResult:
+    """
+    Result of run_pipeline for one effect.
+
+    Attributes:
+        effect: Target outcome.
+        causes: Unique causes with rules and necessity verdicts.
+        necessary_sets: Minimal necessary sets as sorted tuples of cause ids.
+        sufficient_sets: Minimal sufficient sets as sorted tuples of cause ids.
+        metrics: Run metrics summary (see utils.metrics.Metrics.summary).
+        effect_id: Identifier of the effect in a batch, if any.
+        complete: False if a search budget or deadline stopped a search early; the
+            sets are then the ones confirmed until then. With a maximum set size,
+            only the sets up to that size are required.
+        necessary_reasons: Reasons aligned with necessary_sets; only fetched in
+            verdict-only mode, empty otherwise.
+        sufficient_reasons: Reasons aligned with sufficient_sets (see necessary_reasons).
+    """
+    effect: str
+    causes: List[Cause]
+    necessary_sets: List[Tuple[int, ...]]
+    sufficient_sets: List[Tuple[int, ...]]
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    effect_id: Optional[str] = None
+    complete: bool = True
+    necessary_reasons: List[Optional[str]] = field(default_factory=list)
+    sufficient_reasons: List[Optional[str]] = field(default_factory=list)
+
+    @property
+    def necessary_causes(self) -> List[str]:
+        """Causes classified as individually necessary."""
+        return [cause.text for cause in self.causes if cause.necessary]
+
+    @property
+    def rules(self) -> List[Optional[str]]:
+        """Symbolic rules aligned with causes."""
+        return [cause.rule for cause in self.causes]
+
+    def cause_texts(self, ids: Iterable[int]) -> List[str]:
+        """Return the cause texts of a set of cause ids."""
+        return [self.causes[i].text for i in ids]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the result as a JSON-serializable dict."""
+        record = asdict(self)
+        record["necessary_sets"] = [list(s) for s in self.necessary_sets]
+        record["sufficient_sets"] = [list(s) for s in self.sufficient_sets]
+        return record
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "PipelineResult":
+        """Build a result from to_dict output; unknown keys (e.g. batch status) are ignored."""
+        return cls(
+            effect=record["effect"],
+            causes=[Cause(**cause) for cause in record["causes"]],
+            necessary_sets=[tuple(s) for s in record["necessary_sets"]],
+            sufficient_sets=[tuple(s) for s in record["sufficient_sets"]],
+            metrics=record.get("metrics", {}),
+            effect_id=record.get("effect_id"),
+            complete=record.get("complete", True),
+            necessary_reasons=record.get("necessary_reasons", []),
+            sufficient_reasons=record.get("sufficient_reasons", []),
+        )
+
+    def to_json(self) -> str:
+        """Return the result as one compact JSON line (without newline)."""
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+
+def build_result(effect: str, causes: List[str], rules: List[Optional[Dict[str, Any]]],
+                 necessity: Optional[Dict[str, Any]], necessary_sets: List[List[str]],
+                 sufficient_sets: List[List[str]], metrics: Optional[Dict[str, Any]] = None,
+                 effect_id: Optional[str] = None, complete: bool = True,
+                 necessary_reasons: Optional[List[Optional[str]]] = None,
+                 sufficient_reasons: Optional[List[Optional[str]]] = None) -> PipelineResult:
+    """
+    Assemble a PipelineResult from the raw stage outputs.
+
+    Args:
+        effect: Target outcome.
+        causes: Unique causes.
+        rules: Output of convert_causes_to_rules, aligned with causes.
+        necessity: Output of check_necessity ({"evaluations": [...]}).
+        necessary_sets: Minimal necessary sets as lists of causes.
+        sufficient_sets: Minimal sufficient sets as lists of causes.
+        metrics: Run metrics summary.
+        effect_id: Identifier of the effect in a batch.
+        complete: Whether both searches ran to their end.
+        necessary_reasons: Reasons aligned with necessary_sets, if fetched.
+        sufficient_reasons: Reasons aligned with sufficient_sets, if fetched.
+    """
+    ids = {}
+    for i, text in enumerate(causes):
+        ids.setdefault(text, i)
+
+    verdicts = {}
+    for item in (necessity or {}).get("evaluations", []):
+        verdicts[item.get("cause")] = item
+
+    result_causes = []
+    for i, text in enumerate(causes):
+        rule = rules[i] if i < len(rules) else None
+        verdict = verdicts.get(text)
+        result_causes.append(Cause(
+            id=i,
+            text=text,
+            rule=rule.get("rule") if isinstance(rule, dict) else None,
+            necessary=verdict["result"] == "necessary" if verdict and "result" in verdict else None,
+            necessity_reason=verdict.get("reason") if verdict else None,
+        ))
+
+    def to_ids(sets):
+        return [tuple(sorted(ids[c] for c in subset)) for subset in sets]
+
+    return PipelineResult(
+        effect=effect,
+        causes=result_causes,
+        necessary_sets=to_ids(necessary_sets),
+        sufficient_sets=to_ids(sufficient_sets),
+        metrics=metrics or {},
+        effect_id=effect_id,
+        complete=complete,
+        necessary_reasons=list(necessary_reasons or []),
+        sufficient_reasons=list(sufficient_reasons or []),
+    )
+
+
+def write_jsonl(results: Iterable[PipelineResult], path: str, append: bool = False) -> int:
+    """
+    Write results as JSON Lines.
+
+    Returns:
+        Number of results written.
+    """
+    count = 0
+    with open(path, "a" if append else "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(result.to_json() + "\n")
+            count += 1
+    return count
+
+
+def read_jsonl(path: str) -> Iterator[PipelineResult]:
+    """
+    Stream results from a JSON Lines file.
+
+    Batch output is accepted as well: lines whose "status" is not "ok" and
+    partially written lines are skipped.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status", "ok") != "ok":
+                continue
+            yield PipelineResult.from_dict(record)
+
+
+def to_dataframes(results: Iterable[PipelineResult]) -> Dict[str, Any]:
+    """
+    Flatten results into the columnar tables "effects", "causes" and "sets".
+
+    Returns:
+        Dict of pandas DataFrames keyed by table name.
+    """
+    import pandas as pd
+
+    effects, causes, sets = [], [], []
+    for index, result in enumerate(results):
+        effect_id = result.effect_id if result.effect_id is not None else str(index)
+        totals = result.metrics.get("totals", {})
+        effects.append({
+            "effect_id": effect_id,
+            "effect": result.effect,
+            "n_causes": len(result.causes),
+            "n_necessary_sets": len(result.necessary_sets),
+            "n_sufficient_sets": len(result.sufficient_sets),
+            "complete": result.complete,
+            "duration": result.metrics.get("duration"),
+            "llm_calls": totals.get("calls"),
+            "prompt_tokens": totals.get("prompt_tokens"),
+            "completion_tokens": totals.get("completion_tokens"),
+        })
+        for cause in result.causes:
+            causes.append({"effect_id": effect_id, **asdict(cause)})
+        for kind, found, reasons in (("necessary", result.necessary_sets, result.necessary_reasons),
+                                     ("sufficient", result.sufficient_sets, result.sufficient_reasons)):
+            for set_index, subset in enumerate(found):
+                sets.append({"effect_id": effect_id, "kind": kind, "set_index": set_index,
+                             "cause_ids": list(subset), "size": len(subset),
+                             "reason": reasons[set_index] if set_index < len(reasons) else None})
+
+    return {
+        "effects": pd.DataFrame(effects, columns=[
+            "effect_id", "effect", "n_causes", "n_necessary_sets", "n_sufficient_sets", "complete",
+            "duration", "llm_calls", "prompt_tokens", "completion_tokens"]),
+        "causes": pd.DataFrame(causes, columns=["effect_id", "id", "text", "rule", "necessary", "necessity_reason"]),
+        "sets": pd.DataFrame(sets, columns=["effect_id", "kind", "set_index", "cause_ids", "size", "reason"]),
+    }
+
+
+def write_parquet(results: Iterable[PipelineResult], folder: str) -> Dict[str, str]:
+    """
+    Write results as the Parquet files effects.parquet, causes.parquet and sets.parquet.
+
+    Returns:
+        Path per table name.
+
+    Raises:
+        ImportError: If no Parquet engine (pyarrow or fastparquet) is installed.
+    """
+    os.makedirs(folder, exist_ok=True)
+    paths = {}
+    for name, frame in to_dataframes(results).items():
+        paths[name] = os.path.join(folder, f"{name}.parquet")
+        frame.to_parquet(paths[name], index=False)
+    return paths
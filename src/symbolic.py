@@ -0,0 +1,320 @@
+"""
+Local symbolic pre-screen of sufficiency questions with z3.
+
+convert_to_symbolic_rule produces rules in the grammar of
+prompts/convert_to_symbolic_rule.py:
+
+1. Universal constraint:  ∀x ¬(condition₁ ∧ condition₂)
+2. Implication:           ∀x(conclusion ← condition)
+3./4. Probabilistic rules: ∀x(ρ(event(x), p%)), ∀x, ∃v(ρ(...) ← ...)
+
+Forms 1 and 2 are parsed into z3 formulas; probabilistic rules carry no
+logical constraint and are skipped. Rules are grounded at the ego vehicle:
+every variable denotes one agent of the scene (x is the same agent in all
+rules), predicates are uninterpreted boolean functions and quantities such as
+∆speed(x) are real-valued functions. This keeps every check quantifier-free.
+
+SymbolicScreen only answers questions that follow from unsatisfiability,
+which is sound as long as the rules formalize their causes; everything else
+is left to the LLM:
+
+- consistent present causes entail the effect rule -> sufficiency "yes"
+
+Contradictory present causes are left to the LLM: the search reads a
+negative verdict as one for all subsets, but a contradictory set can have a
+consistent subset that is sufficient.
+
+Necessity questions are not screened. A rule only states what its cause
+implies, not that the effect needs it, so the rules cannot show that the
+effect is impossible because of the absent causes; a check on the present
+causes alone would also weaken as the absent set grows, while the search
+assumes that every superset of a necessary set is necessary.
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional
+
+import z3
+
+from lattice import mask_to_indices
+from utils.logger import get_logger
+
+logger = get_logger()
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<num>\d+(?:\.\d+)?)
+  | (?P<name>[A-Za-z∆Δ_][\w∆Δ]*(?:-[A-Za-z_]\w*)*)
+  | (?P<op>>=|<=|!=|[≥≤≠><=∀∃¬∧∨←→(),:.%ρ])
+)""", re.X)
+
+_COMPARISONS = {
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+    ">=": lambda a, b: a >= b,
+    "≥": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+    "≤": lambda a, b: a <= b,
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "≠": lambda a, b: a != b,
+}
+
+
+class SymbolicParseError(ValueError):
+    """Raised for rules outside the supported grammar."""
+
+
+def _tokenize(text: str) -> List[str]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise SymbolicParseError(f"Unexpected character {text[pos]!r} in rule {text!r}")
+        tokens.append(match.group("num") or match.group("name") or match.group("op"))
+        pos = match.end()
+    return tokens
+
+
+class Vocabulary:
+    """
+    z3 symbols shared by all rules of one effect.
+
+    A predicate keeps the arity and sort of its first use; a rule using it
+    differently is rejected.
+    """
+
+    def __init__(self):
+        self.agent = z3.DeclareSort("Agent")
+        self.functions: Dict[str, z3.FuncDeclRef] = {}
+        self.constants: Dict[str, z3.ExprRef] = {}
+
+    def function(self, name: str, arity: int, real: bool) -> z3.FuncDeclRef:
+        """Return the uninterpreted function for a predicate (boolean) or quantity (real)."""
+        range_sort = z3.RealSort() if real else z3.BoolSort()
+        fn = self.functions.get(name)
+        if fn is None:
+            fn = z3.Function(name, *([self.agent] * arity), range_sort)
+            self.functions[name] = fn
+        elif fn.arity() != arity or fn.range() != range_sort:
+            raise SymbolicParseError(f"'{name}' is used with a different arity or type")
+        return fn
+
+    def agent_constant(self, name: str) -> z3.ExprRef:
+        """Return the agent a variable is grounded to."""
+        key = f"agent:{name}"
+        if key not in self.constants:
+            self.constants[key] = z3.Const(name, self.agent)
+        return self.constants[key]
+
+    def real_constant(self, name: str) -> z3.ArithRef:
+        """Return a named threshold such as vlim."""
+        key = f"real:{name}"
+        if key not in self.constants:
+            self.constants[key] = z3.Real(name)
+        return self.constants[key]
+
+
+class _Parser:
+    """Recursive-descent parser of one rule."""
+
+    def __init__(self, text: str, vocabulary: Vocabulary):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.vocabulary = vocabulary
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self, expected: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None or (expected is not None and token != expected):
+            raise SymbolicParseError(f"Expected {expected or 'more input'} at position {self.pos} in {self.text!r}")
+        self.pos += 1
+        return token
+
+    def rule(self) -> z3.BoolRef:
+        if "ρ" in self.tokens:
+            raise SymbolicParseError("Probabilistic rules carry no logical constraint")
+        # Quantifier prefix: ∀x, ∀x ∀y, ∀x, ∃v ... optionally followed by ':' or '.'
+        while self.peek() in ("∀", "∃"):
+            self.take()
+            self.take()
+            while self.peek() == ",":
+                self.take()
+                if self.peek() in ("∀", "∃"):
+                    self.take()
+                self.take()
+            if self.peek() in (":", "."):
+                self.take()
+        formula = self.implication()
+        if self.peek() is not None:
+            raise SymbolicParseError(f"Unexpected '{self.peek()}' in {self.text!r}")
+        return formula
+
+    def implication(self) -> z3.BoolRef:
+        left = self.disjunction()
+        if self.peek() == "←":
+            self.take()
+            return z3.Implies(self.disjunction(), left)
+        if self.peek() == "→":
+            self.take()
+            return z3.Implies(left, self.disjunction())
+        return left
+
+    def disjunction(self) -> z3.BoolRef:
+        terms = [self.conjunction()]
+        while self.peek() == "∨":
+            self.take()
+            terms.append(self.conjunction())
+        return terms[0] if len(terms) == 1 else z3.Or(*terms)
+
+    def conjunction(self) -> z3.BoolRef:
+        terms = [self.unary()]
+        while self.peek() == "∧":
+            self.take()
+            terms.append(self.unary())
+        return terms[0] if len(terms) == 1 else z3.And(*terms)
+
+    def unary(self) -> z3.BoolRef:
+        if self.peek() == "¬":
+            self.take()
+            return z3.Not(self.unary())
+        if self.peek() == "(":
+            self.take()
+            formula = self.implication()
+            self.take(")")
+            return formula
+        return self.atom()
+
+    def atom(self) -> z3.BoolRef:
+        if self.peek() is None or not (self.peek()[0].isalpha() or self.peek()[0] in "∆Δ_"):
+            # A comparison starting with a number, e.g. 0 < ∆speed(x)
+            left = self.term()
+            return self.comparison(left)
+
+        name = self.take()
+        if self.peek() != "(":
+            return self.comparison(self.vocabulary.real_constant(name))
+        args = self.arguments()
+        if self.peek() in _COMPARISONS:
+            fn = self.vocabulary.function(name, len(args), real=True)
+            return self.comparison(fn(*args))
+        fn = self.vocabulary.function(name, len(args), real=False)
+        return fn(*args)
+
+    def arguments(self) -> List[z3.ExprRef]:
+        self.take("(")
+        args = [self.vocabulary.agent_constant(self.take())]
+        while self.peek() == ",":
+            self.take()
+            args.append(self.vocabulary.agent_constant(self.take()))
+        self.take(")")
+        return args
+
+    def term(self) -> z3.ArithRef:
+        token = self.take()
+        if re.fullmatch(r"\d+(?:\.\d+)?", token):
+            return z3.RealVal(token)
+        if self.peek() == "(":
+            args = self.arguments()
+            return self.vocabulary.function(token, len(args), real=True)(*args)
+        return self.vocabulary.real_constant(token)
+
+    def comparison(self, left: z3.ArithRef) -> z3.BoolRef:
+        op = self.peek()
+        if op not in _COMPARISONS:
+            raise SymbolicParseError(f"Expected a comparison after quantity in {self.text!r}")
+        self.take()
+        return _COMPARISONS[op](left, self.term())
+
+
+def parse_rule(text: str, vocabulary: Optional[Vocabulary] = None) -> z3.BoolRef:
+    """
+    Parse a universal constraint or implication rule into a ground z3 formula.
+
+    Args:
+        text: Rule such as "∀x(EB(x) ← sd-front(x) ∧ ∆friction(x) > 0)".
+        vocabulary: Symbols shared with other rules of the same effect.
+
+    Returns:
+        The rule grounded at the agents named by its variables.
+
+    Raises:
+        SymbolicParseError: For probabilistic rules and text outside the grammar.
+    """
+    return _Parser(text, vocabulary or Vocabulary()).rule()
+
+
+class SymbolicScreen:
+    """
+    Decides subset questions that follow logically from the symbolic rules.
+
+    Causes whose rule is missing or cannot be parsed are treated as
+    unconstrained, which keeps all decisions sound. Decisions are memoized per
+    subset; the solver is shared and guarded by a lock.
+
+    Args:
+        cause_rules: Symbolic rule per cause (None where the conversion failed).
+        effect_rule: Symbolic rule of the effect, enables the entailment checks.
+    """
+
+    def __init__(self, cause_rules: List[Optional[str]], effect_rule: Optional[str] = None):
+        self.vocabulary = Vocabulary()
+        self.solver = z3.Solver()
+        self.indicators: List[Optional[z3.BoolRef]] = []
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._memo: Dict[tuple, Optional[bool]] = {}
+
+        for i, rule in enumerate(cause_rules):
+            formula = self._parse(rule)
+            if formula is None:
+                self.indicators.append(None)
+                continue
+            indicator = z3.Bool(f"cause_{i}")
+            self.solver.add(z3.Implies(indicator, formula))
+            self.indicators.append(indicator)
+
+        self.not_effect = z3.Bool("not_effect")
+        effect_formula = self._parse(effect_rule)
+        self.has_effect = effect_formula is not None
+        if self.has_effect:
+            self.solver.add(z3.Implies(self.not_effect, z3.Not(effect_formula)))
+
+        logger.info(f"Symbolic screen parsed {sum(i is not None for i in self.indicators)} of {len(cause_rules)} "
+                    f"cause rules (effect rule: {'yes' if self.has_effect else 'no'})")
+
+    def _parse(self, rule: Optional[str]) -> Optional[z3.BoolRef]:
+        if not rule:
+            return None
+        try:
+            return parse_rule(rule, self.vocabulary)
+        except SymbolicParseError as e:
+            self.skipped += 1
+            logger.debug(f"Skipping rule {rule!r}: {e}")
+            return None
+
+    def _unsat(self, present_mask: int, *extra: z3.BoolRef) -> bool:
+        assumptions = [self.indicators[i] for i in mask_to_indices(present_mask) if self.indicators[i] is not None]
+        return self.solver.check(*assumptions, *extra) == z3.unsat
+
+    def _decide(self, key: tuple, decide) -> Optional[bool]:
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = decide()
+            return self._memo[key]
+
+    def decide_sufficiency(self, present_mask: int) -> Optional[bool]:
+        """
+        Return True if the present causes are consistent and entail the effect,
+        None otherwise (contradictory causes are left to the LLM).
+        """
+        def decide():
+            if self.has_effect and not self._unsat(present_mask) and self._unsat(present_mask, self.not_effect):
+                return True
+            return None
+        return self._decide(("sufficiency", present_mask), decide)
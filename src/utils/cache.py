@@ -0,0 +1,198 @@
+# cache.py
+
+"""
+Persistent, content-addressed cache for LLM responses.
+
+Responses are stored in a single SQLite file keyed on a SHA-256 hash of
+(model, prompt, max_tokens, temperature). The cache supports:
+
+- age-based expiry (max_age seconds since the entry was written)
+- size-based eviction (max_entries, least recently used entries go first)
+- hit/miss counters
+- "readwrite", "readonly" and "replay" modes
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+CACHE_MODES = ("readwrite", "readonly", "replay")
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay mode when a prompt has no cached response."""
+
+
+def make_cache_key(model: str, prompt: str, max_tokens: int, temperature: float,
+                   system: Optional[str] = None, early_exit: bool = False) -> str:
+    """
+    Return the content hash identifying one LLM request.
+
+    early_exit keys the answer of a stream cut short after its verdict apart
+    from the full answer to the same request.
+    """
+    request = {"model": model, "prompt": prompt, "max_tokens": max_tokens, "temperature": temperature}
+    if system is not None:
+        # Only part of the key when set, so single-message entries stay valid
+        request["system"] = system
+    if early_exit:
+        request["early_exit"] = True
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache shared by all LLM calls of a process.
+
+    Args:
+        path: Location of the SQLite file (parent folders are created).
+        mode: "readwrite" stores new responses, "readonly" never writes,
+            "replay" never writes and raises CacheMissError on a miss.
+        max_entries: Upper bound on stored entries, None for unbounded.
+        max_age: Seconds after which an entry is considered stale, None to keep forever.
+    """
+
+    def __init__(self, path: str, mode: str = "readwrite", max_entries: Optional[int] = None,
+                 max_age: Optional[float] = None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+
+        self.path = path
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, fallback: Optional[str] = None) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key of the request.
+            fallback: Key looked up when key is not cached.
+
+        Returns:
+            The cached response text, or None on a miss.
+
+        Raises:
+            CacheMissError: In replay mode, if neither key is cached.
+        """
+        now = time.time()
+        with self._lock:
+            for key in (key, fallback):
+                if key is None:
+                    continue
+                row = self._conn.execute(
+                    "SELECT response, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self.max_age is not None and now - row[1] > self.max_age:
+                    row = None
+                if row is not None:
+                    break
+
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                if self.mode == "readwrite":
+                    self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+
+        if row is None:
+            if self.mode == "replay":
+                raise CacheMissError(f"No cached response for key {key} (replay mode)")
+            return None
+        return row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response, unless the cache is read-only."""
+        if self.mode != "readwrite":
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._conn.commit()
+            self.writes += 1
+
+        if self.max_entries is not None and self.writes % 100 == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop stale entries and trim the cache to max_entries.
+
+        Returns:
+            Number of removed entries.
+        """
+        if self.mode != "readwrite":
+            return 0
+
+        removed = 0
+        with self._lock:
+            if self.max_age is not None:
+                cur = self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age,))
+                removed += cur.rowcount
+
+            if self.max_entries is not None:
+                cur = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                removed += cur.rowcount
+
+            self._conn.commit()
+            self.evictions += removed
+
+        if removed:
+            logger.info(f"Evicted {removed} entries from LLM cache {self.path}")
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters of this process."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        """Run a final eviction pass and close the database."""
+        self.evict()
+        with self._lock:
+            self._conn.close()
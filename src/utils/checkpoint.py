@@ -0,0 +1,135 @@
+# checkpoint.py
+
+"""
+Checkpoints of the minimal-set searches.
+
+A checkpoint is an append-only JSON Lines file:
+
+- the first line holds the search inputs (kind, effect, ordered causes, laws, strategy)
+- every verdict is appended as {"mask": ..., "verdict": ...} as soon as it arrives
+- progress lines {"level": ..., "found": [...]} are appended after every search level
+
+Searches are deterministic given their verdicts, so resuming replays the
+search with recorded verdicts answered from the file; no completed LLM call
+is issued again. A partially written last line (e.g. after a crash) is ignored.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+class SearchCheckpoint:
+    """
+    Verdict journal of one subset search.
+
+    An existing file is loaded if its inputs match; otherwise it is replaced
+    with a warning and the search starts fresh.
+
+    Args:
+        path: JSON Lines file holding the checkpoint.
+        kind: "necessity" or "sufficiency".
+        effect: Target outcome.
+        causes: Ordered causes; bit i of a subset mask refers to causes[i].
+        legal_laws: Legal constraints used in the prompts.
+        safety_laws: Safety/physics constraints used in the prompts.
+        strategy: Search strategy of the run.
+    """
+
+    def __init__(self, path: str, kind: str, effect: str, causes: List[str], legal_laws: str, safety_laws: str,
+                 strategy: str = "levelwise"):
+        self.path = path
+        self.inputs = {
+            "kind": kind,
+            "effect": effect,
+            "causes": list(causes),
+            "legal_laws": legal_laws,
+            "safety_laws": safety_laws,
+        }
+        self.verdicts: Dict[int, bool] = {}
+        self.progress: Dict[str, Any] = {"level": 0, "found": []}
+        self._lock = threading.Lock()
+
+        resumed = False
+        if os.path.exists(path):
+            state = load_checkpoint(path)
+            if all(state.get(key) == value for key, value in self.inputs.items()):
+                self.verdicts = state["verdicts"]
+                self.progress = state["progress"]
+                resumed = True
+                logger.info(f"Resuming {kind} search from {path} with {len(self.verdicts)} recorded verdicts")
+            else:
+                logger.warning(f"Checkpoint {path} belongs to a different search, starting fresh")
+
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self._file = open(path, "a" if resumed else "w", encoding="utf-8")
+        if not resumed:
+            self._append({**self.inputs, "strategy": strategy, "created": time.time()})
+
+    def _append(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def lookup(self, mask: int) -> Optional[bool]:
+        """Return the recorded verdict of a subset, if any."""
+        with self._lock:
+            return self.verdicts.get(mask)
+
+    def record(self, mask: int, verdict: bool):
+        """Record a new verdict and append it to the file immediately."""
+        with self._lock:
+            self.verdicts[mask] = verdict
+            self._append({"mask": mask, "verdict": verdict})
+
+    def update_progress(self, level: int, found: List[int]):
+        """Record the completed level and the minimal sets found so far."""
+        with self._lock:
+            self.progress = {"level": level, "found": list(found)}
+            self._append(self.progress)
+
+    def close(self):
+        """Close the underlying file."""
+        with self._lock:
+            self._file.close()
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    """
+    Read a checkpoint file.
+
+    Returns:
+        The search inputs plus "verdicts" (mask -> verdict) and the last "progress" record.
+
+    Raises:
+        ValueError: If the file is not a search checkpoint.
+    """
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()
+
+    try:
+        state = json.loads(lines[0]) if lines else {}
+    except json.JSONDecodeError:
+        state = {}
+    if "kind" not in state:
+        raise ValueError(f"{path} is not a search checkpoint")
+
+    state["verdicts"] = {}
+    state["progress"] = {"level": 0, "found": []}
+    for line in lines[1:]:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # Partially written line of an interrupted run
+            continue
+        if "mask" in record:
+            state["verdicts"][record["mask"]] = record["verdict"]
+        elif "level" in record:
+            state["progress"] = record
+    return state
@@ -0,0 +1,39 @@
+# concurrency.py
+
+"""
+Helpers for running independent LLM calls concurrently.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_bounded(fn: Callable[[T], R], items: Iterable[T], max_workers: int = 1) -> List[R]:
+    """
+    Apply fn to every item with at most max_workers calls in flight.
+
+    Results are returned in the order of the input items. With max_workers <= 1
+    the items are processed serially in the calling thread. The first exception
+    raised by fn is propagated to the caller. Every call runs in a copy of the
+    caller's context, so context variables (e.g. the active metrics stage) are
+    visible in the worker threads.
+
+    Args:
+        fn: Function to apply.
+        items: Inputs, each passed to fn separately.
+        max_workers: Concurrency limit.
+
+    Returns:
+        List of fn results, aligned with items.
+    """
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+
+    contexts = [contextvars.copy_context() for _ in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(lambda pair: pair[0].run(fn, pair[1]), zip(contexts, items)))
@@ -6,8 +6,14 @@ Traffic and Physics laws for traffic scene reasoning.
 - TRAFFIC_LAWS: human/motor vehicle traffic regulations
 - PHYSICS_LAWS: vehicle dynamics and physical constraints
 - Utility functions to fetch lists and prompt-ready formats
+- A TF-IDF relevance selector to include only the laws relevant to an effect
 """
 
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
 # ----------------------------------------------------------------------
 # Traffic laws
 # ----------------------------------------------------------------------
@@ -101,3 +107,95 @@ def get_all_laws_list():
 def format_all_laws_for_prompt():
     """Return prompt-ready text of all laws"""
     return "\n".join([f"{k} : {v}" for k, v in _merge_laws().items()])
+
+# ----------------------------------------------------------------------
+# Law relevance selection
+# ----------------------------------------------------------------------
+# Laws scoring below this cosine similarity to the query are dropped
+LAW_MIN_SCORE = 0.05
+# Number of best-scoring laws always kept per group, so no section is empty
+LAW_MIN_PER_GROUP = 2
+
+_STOPWORDS = {
+    "a", "an", "and", "any", "as", "at", "be", "by", "can", "cannot", "case", "do", "does", "except", "for",
+    "from", "has", "have", "if", "in", "incase", "is", "it", "its", "may", "must", "no", "not", "of", "on",
+    "only", "or", "other", "so", "such", "than", "that", "the", "their", "them", "they", "this", "to",
+    "when", "will", "with", "without", "x",
+}
+
+
+def _tokenize(text):
+    """Lowercase words without stopwords, truncated to 6 characters as a crude stemmer."""
+    words = re.findall(r"[a-z]+", text.lower().replace("_", " "))
+    return [w[:6] for w in words if w not in _STOPWORDS and len(w) > 1]
+
+
+class LawIndex:
+    """
+    TF-IDF index over named laws.
+
+    Every law is indexed by its name and description; queries (an effect and
+    its causes) are scored by cosine similarity.
+    """
+
+    def __init__(self, laws):
+        self.names = list(laws)
+        docs = [Counter(_tokenize(f"{name} {text}")) for name, text in laws.items()]
+        n_docs = len(docs)
+        doc_freq = Counter(term for doc in docs for term in doc)
+        self.idf = {term: math.log((1 + n_docs) / (1 + df)) + 1 for term, df in doc_freq.items()}
+        self.vectors = [self._weigh(doc) for doc in docs]
+
+    def _weigh(self, counts):
+        vector = {term: count * self.idf[term] for term, count in counts.items() if term in self.idf}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {term: w / norm for term, w in vector.items()}
+
+    def scores(self, query):
+        """Return the cosine similarity of every law to the query text, keyed by law name."""
+        q = self._weigh(Counter(_tokenize(query)))
+        return {name: sum(w * vector.get(term, 0.0) for term, w in q.items())
+                for name, vector in zip(self.names, self.vectors)}
+
+    def select(self, query, min_score=LAW_MIN_SCORE, min_laws=LAW_MIN_PER_GROUP):
+        """
+        Return the names of the laws relevant to the query, in index order.
+
+        Laws scoring at least min_score are kept, plus the min_laws best-scoring ones.
+        """
+        scores = self.scores(query)
+        best = set(sorted(self.names, key=lambda name: -scores[name])[:min_laws])
+        return [name for name in self.names if scores[name] >= min_score or name in best]
+
+
+@lru_cache(maxsize=None)
+def _law_indexes():
+    return LawIndex(TRAFFIC_LAWS), LawIndex(PHYSICS_LAWS)
+
+
+def select_relevant_laws(effect, causes=None, min_score=LAW_MIN_SCORE, min_laws=LAW_MIN_PER_GROUP):
+    """
+    Pick the traffic and physics laws relevant to an effect and its causes.
+
+    The selection depends only on the effect and the full cause list, so all
+    prompts of one effect share the same law text.
+
+    Returns:
+        (traffic law names, physics law names)
+    """
+    query = " ".join([effect, *(causes or [])])
+    traffic_index, physics_index = _law_indexes()
+    return (traffic_index.select(query, min_score, min_laws),
+            physics_index.select(query, min_score, min_laws))
+
+
+def format_relevant_laws_for_prompt(effect, causes=None, min_score=LAW_MIN_SCORE, min_laws=LAW_MIN_PER_GROUP):
+    """
+    Return prompt-ready text of the laws relevant to an effect and its causes.
+
+    Returns:
+        (traffic law text, physics law text)
+    """
+    traffic, physics = select_relevant_laws(effect, causes, min_score, min_laws)
+    return ("\n".join(f"{k} : {TRAFFIC_LAWS[k]}" for k in traffic),
+            "\n".join(f"{k} : {PHYSICS_LAWS[k]}" for k in physics))
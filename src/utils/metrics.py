@@ -0,0 +1,159 @@
+# metrics.py
+
+"""
+Structured run metrics for the pipeline.
+
+- Per stage: wall time and all LLM calls made while the stage was active
+- Per stage and prompt template: calls, cache hits, retries, latency
+  histogram and prompt/completion/provider-cached tokens (from the API usage field)
+- Optional trace of every stage and LLM call as JSON Lines
+
+The active Metrics object and the current stage live in context variables,
+so concurrent runs (and the worker threads started through
+utils.concurrency.map_bounded) record into the right place.
+"""
+
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+_TOTAL_KEYS = ("calls", "cache_hits", "retries", "prompt_tokens", "completion_tokens", "cached_tokens",
+               "latency_total")
+
+
+def _new_counters() -> Dict[str, Any]:
+    return {
+        "calls": 0,
+        "cache_hits": 0,
+        "retries": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_tokens": 0,
+        "latency_total": 0.0,
+        "latency_max": 0.0,
+        "latency_histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+    }
+
+
+class Metrics:
+    """Collects stage timings and per-template LLM call statistics of one run."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.calls: Dict[tuple, Dict[str, Any]] = {}
+        self.counters: Dict[str, Any] = {}
+        self.info: Dict[str, Any] = {}
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a pipeline stage and attribute the LLM calls made inside it."""
+        token = _current_stage.set(name)
+        start = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start
+            _current_stage.reset(token)
+            with self._lock:
+                entry = self.stages.setdefault(name, {"runs": 0, "duration": 0.0})
+                entry["runs"] += 1
+                entry["duration"] += duration
+                self.events.append({"type": "stage", "stage": name, "start": start, "duration": duration})
+
+    def record_call(self, template: Optional[str], latency: float, usage: Optional[Dict[str, Any]] = None,
+                    cached: bool = False, attempts: int = 1):
+        """Record one call_llm invocation (a cache hit or a backend call)."""
+        stage = _current_stage.get()
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        # Prompt tokens served from the provider's prompt-prefix cache
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+
+        with self._lock:
+            entry = self.calls.setdefault((stage, template), _new_counters())
+            entry["calls"] += 1
+            entry["cache_hits"] += int(cached)
+            entry["retries"] += max(0, attempts - 1)
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["cached_tokens"] += cached_tokens
+            entry["latency_total"] += latency
+            entry["latency_max"] = max(entry["latency_max"], latency)
+            entry["latency_histogram"][bucket] += 1
+            self.events.append({
+                "type": "llm_call", "stage": stage, "template": template, "end": time.time(),
+                "latency": latency, "cached": cached, "attempts": attempts,
+                "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "cached_tokens": cached_tokens,
+            })
+
+    def increment(self, name: str, value: float = 1):
+        """Add to a free-form run counter (e.g. verdicts inferred by a search)."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def annotate(self, name: str, value: Any):
+        """Attach a JSON-serializable value (e.g. the critical path) to the summary."""
+        with self._lock:
+            self.info[name] = value
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the metrics as a JSON-serializable dict."""
+        with self._lock:
+            templates = []
+            totals = _new_counters()
+            for (stage, template), entry in self.calls.items():
+                row = {"stage": stage, "template": template, **entry}
+                row["latency_mean"] = entry["latency_total"] / entry["calls"] if entry["calls"] else 0.0
+                templates.append(row)
+                for key in _TOTAL_KEYS:
+                    totals[key] += entry[key]
+
+            return {
+                "duration": time.time() - self.started,
+                "stages": {name: dict(entry) for name, entry in self.stages.items()},
+                "llm_calls": templates,
+                "totals": {key: totals[key] for key in _TOTAL_KEYS},
+                "counters": dict(self.counters),
+                "info": dict(self.info),
+                "latency_buckets": LATENCY_BUCKETS,
+            }
+
+    def write_trace(self, path: str):
+        """Write every recorded stage and LLM call event as one JSON line."""
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+
+
+_default_metrics = Metrics()
+_current_metrics: contextvars.ContextVar = contextvars.ContextVar("metrics", default=_default_metrics)
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("stage", default=None)
+
+
+def get_metrics() -> Metrics:
+    """Return the Metrics object active in the current context."""
+    return _current_metrics.get()
+
+
+@contextmanager
+def use_metrics(metrics: Metrics):
+    """Make metrics the active Metrics object within the block."""
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
@@ -0,0 +1,144 @@
+# parsing.py
+
+"""
+Robust parsing of JSON answers from LLM responses.
+
+- Markdown code fences and text around the answer are ignored: the first
+  balanced JSON object or array in the response is parsed
+- Answers are validated against a small per-template schema
+- Truncated answers (no balanced end) are reported as such, so the caller can
+  retry with a larger token budget
+- Verdict answers can be read incrementally from a stream: the "result" field
+  is available as soon as it has been generated
+"""
+
+import json
+import re
+from typing import Any, Dict, Optional
+
+# Expected top-level shape per prompt template: a type, required keys with their types
+# and allowed values of the "result" field
+SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "decompose_effect": {"type": dict, "required": {"causes": list}},
+    "merge_duplicates": {"type": dict, "required": {"unique_causes": list}},
+    "check_necessity": {"type": dict, "required": {"evaluations": list}},
+    "convert_to_symbolic_rule": {"type": dict, "required": {"rule": str}},
+    "necessity_set": {"type": dict, "required": {"result": str}, "result": ("yes", "no")},
+    "sufficiency_set": {"type": dict, "required": {"result": str}, "result": ("yes", "no")},
+    "necessity_set_batch": {"type": list},
+    "sufficiency_set_batch": {"type": list},
+    "necessity_set_verdict": {"type": dict, "required": {"result": str}, "result": ("yes", "no")},
+    "sufficiency_set_verdict": {"type": dict, "required": {"result": str}, "result": ("yes", "no")},
+    "necessity_set_verdict_batch": {"type": list},
+    "sufficiency_set_verdict_batch": {"type": list},
+}
+
+# Templates whose answer is decided by the "result" field alone
+VERDICT_TEMPLATES = ("necessity_set", "sufficiency_set", "necessity_set_verdict", "sufficiency_set_verdict")
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*(.*?)```", re.S)
+_RESULT_FIELD = re.compile(r'"result"\s*:\s*"(yes|no)"')
+
+
+class ResponseParseError(ValueError):
+    """
+    Raised when a response does not contain a valid answer.
+
+    Attributes:
+        truncated: True if the response ended inside the JSON value.
+    """
+
+    def __init__(self, message: str, truncated: bool = False):
+        super().__init__(message)
+        self.truncated = truncated
+
+
+def strip_code_fences(text: str) -> str:
+    """Return the content of the first markdown code block, or the text itself."""
+    match = _FENCE.search(text)
+    return match.group(1) if match else text
+
+
+def extract_json(text: str) -> Any:
+    """
+    Parse the first balanced JSON object or array in text.
+
+    Raises:
+        ResponseParseError: If no JSON value is found or it is cut off.
+    """
+    text = strip_code_fences(text)
+    start = next((i for i, ch in enumerate(text) if ch in "{["), None)
+    if start is None:
+        raise ResponseParseError("Response contains no JSON object")
+
+    depth = 0
+    in_string = escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                try:
+                    return json.loads(text[start:i + 1])
+                except json.JSONDecodeError as e:
+                    raise ResponseParseError(f"Invalid JSON in response: {e}")
+    raise ResponseParseError("Response ends inside the JSON value", truncated=True)
+
+
+def validate(template: Optional[str], value: Any) -> Any:
+    """
+    Check a parsed answer against the schema of its template.
+
+    Templates without a schema are accepted as they are.
+
+    Raises:
+        ResponseParseError: If the answer does not match the schema.
+    """
+    schema = SCHEMAS.get(template)
+    if schema is None:
+        return value
+    if not isinstance(value, schema["type"]):
+        raise ResponseParseError(f"Expected a JSON {schema['type'].__name__} for {template}")
+    for key, key_type in schema.get("required", {}).items():
+        if not isinstance(value.get(key), key_type):
+            raise ResponseParseError(f"Field '{key}' of {template} is missing or not a {key_type.__name__}")
+    if "result" in schema and value["result"] not in schema["result"]:
+        raise ResponseParseError(f"Field 'result' of {template} must be one of {schema['result']}")
+    return value
+
+
+def parse_response(text: str, template: Optional[str] = None, partial: bool = True) -> Any:
+    """
+    Extract and validate the JSON answer of a response.
+
+    With partial, a verdict response cut off after its "result" field (e.g. an
+    early-exited stream) is accepted; its "reason" is then None.
+
+    Raises:
+        ResponseParseError: If the response has no valid answer.
+    """
+    try:
+        return validate(template, extract_json(text))
+    except ResponseParseError as e:
+        if partial and e.truncated and template in VERDICT_TEMPLATES:
+            result = verdict_prefix(text)
+            if result is not None:
+                return {"result": result, "reason": None}
+        raise
+
+
+def verdict_prefix(text: str) -> Optional[str]:
+    """Return the "result" value once it is complete in a (partial) verdict response."""
+    match = _RESULT_FIELD.search(text)
+    return match.group(1) if match else None
@@ -0,0 +1,165 @@
+# rate_limit.py
+
+"""
+Rate-limit-aware scheduling of LLM requests.
+
+- RPM/TPM budgets enforced with token buckets that may go into debt, so
+  concurrent callers are served in arrival order
+- Retry-After handling that pauses every caller, not only the one that was throttled
+- Jittered exponential backoff for retryable failures (429, 5xx, timeouts)
+- Queue depth and throttle time metrics
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """
+    Estimate the tokens a request counts against a TPM budget.
+
+    Providers reserve prompt tokens plus max_tokens up front; the prompt
+    is approximated with ~4 characters per token.
+    """
+    return len(prompt) // 4 + max_tokens
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the delay in seconds encoded in a Retry-After header, if any."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class _Bucket:
+    """Token bucket refilled continuously at limit per minute."""
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.rate = limit / 60.0
+        self.level = limit
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount from the bucket and return how long the caller must wait."""
+        self.level = min(self.limit, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= min(amount, self.limit)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+
+class RequestScheduler:
+    """
+    Admission control and retry policy in front of the LLM endpoint.
+
+    Args:
+        requests_per_minute: RPM budget, None for unlimited.
+        tokens_per_minute: TPM budget, None for unlimited.
+        max_attempts: Attempts per request before giving up.
+        backoff_base: First backoff delay in seconds.
+        backoff_max: Upper bound for a single backoff delay.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_attempts: int = 3, backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._rpm = _Bucket(requests_per_minute) if requests_per_minute else None
+        self._tpm = _Bucket(tokens_per_minute) if tokens_per_minute else None
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.throttled_requests = 0
+        self.throttle_time = 0.0
+        self.retries = 0
+        self.rate_limited = 0
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._blocked_until - now)
+            if self._rpm is not None:
+                delay = max(delay, self._rpm.reserve(1, now))
+            if self._tpm is not None:
+                delay = max(delay, self._tpm.reserve(tokens, now))
+
+            self.requests += 1
+            if delay > 0:
+                self.throttled_requests += 1
+                self.throttle_time += delay
+                self.queue_depth += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            return delay
+
+    def _release(self):
+        with self._lock:
+            self.queue_depth -= 1
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Block until a request of the given token estimate fits the budgets.
+
+        Returns:
+            Seconds spent waiting.
+        """
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+            self._release()
+        return delay
+
+    async def aacquire(self, tokens: int) -> float:
+        """Async variant of acquire."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+            self._release()
+        return delay
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Return the delay before retry number attempt (0-based).
+
+        A Retry-After value is honoured as a lower bound and also pauses all
+        other callers until it has passed.
+        """
+        with self._lock:
+            self.retries += 1
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            if retry_after is not None:
+                self.rate_limited += 1
+                delay = max(delay, retry_after)
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            return delay
+
+    def stats(self) -> Dict[str, float]:
+        """Return scheduler metrics."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "throttled_requests": self.throttled_requests,
+                "throttle_time": round(self.throttle_time, 3),
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+            }
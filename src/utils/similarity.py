@@ -0,0 +1,129 @@
+# similarity.py
+
+"""
+Lexical pre-clustering of causes before the LLM merge.
+
+Causes are normalized, split into character shingles and embedded as TF-IDF
+vectors (numpy); pairwise cosine similarity drives two union-find passes:
+
+- pairs above the auto threshold are near-verbatim duplicates and are merged locally
+- pairs above the candidate threshold are possibly equivalent; the clusters
+  they connect form one ambiguous group that is left to the LLM to decide
+
+Shingles ignore negation ("Obstacles ahead" vs "No obstacles ahead" are
+near-identical), so a pair in which only one cause is negated is never
+merged locally, only sent to the LLM as a candidate.
+"""
+
+import re
+from typing import List
+
+import numpy as np
+
+# Cosine similarity from which two causes are merged without asking the LLM
+MERGE_AUTO_THRESHOLD = 0.9
+# Cosine similarity from which two causes are considered possible duplicates
+MERGE_CANDIDATE_THRESHOLD = 0.3
+# Length of the character shingles
+SHINGLE_SIZE = 4
+
+_NEGATION = re.compile(r"\b(?:not|no|without|never|none|nor|cannot)\b|n['’]t\b")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def is_negated(text: str) -> bool:
+    """Return True if the text contains a negation token (not, no, without, never, n't, ...)."""
+    return _NEGATION.search(text.lower()) is not None
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """Return the character shingles of the normalized words (padded with spaces)."""
+    shingled = []
+    for word in normalize(text).split():
+        padded = f" {word} "
+        if len(padded) <= size:
+            shingled.append(padded)
+        else:
+            shingled.extend(padded[i:i + size] for i in range(len(padded) - size + 1))
+    return shingled
+
+
+def cosine_similarity_matrix(texts: List[str], size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Return the pairwise cosine similarity of the TF-IDF shingle vectors of texts."""
+    docs = [shingles(text, size) for text in texts]
+    vocabulary = {term: i for i, term in enumerate(sorted({term for doc in docs for term in doc}))}
+    counts = np.zeros((len(docs), max(1, len(vocabulary))))
+    for row, doc in enumerate(docs):
+        for term in doc:
+            counts[row, vocabulary[term]] += 1
+
+    doc_freq = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(docs)) / (1 + doc_freq)) + 1
+    vectors = counts * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    return vectors @ vectors.T
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 with path halving; the smallest index is the root."""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    def groups(self) -> List[List[int]]:
+        """Return the sets ordered by their smallest element, members in ascending order."""
+        groups = {}
+        for i in range(len(self.parent)):
+            groups.setdefault(self.find(i), []).append(i)
+        return [groups[root] for root in sorted(groups)]
+
+
+def cluster_causes(causes: List[str], auto_threshold: float = MERGE_AUTO_THRESHOLD,
+                   candidate_threshold: float = MERGE_CANDIDATE_THRESHOLD) -> List[List[List[int]]]:
+    """
+    Cluster causes by lexical similarity.
+
+    Args:
+        causes: Cause texts.
+        auto_threshold: Similarity from which causes are merged locally.
+        candidate_threshold: Similarity from which causes may be duplicates.
+
+    Returns:
+        Groups in order of first occurrence. Each group is a list of clusters of
+        cause indices; the causes of one cluster are duplicates, and a group with
+        more than one cluster is ambiguous. Causes of opposite polarity (see
+        is_negated) are never in the same cluster.
+    """
+    if not causes:
+        return []
+    similarity = cosine_similarity_matrix(causes)
+    upper = np.triu(np.ones_like(similarity, dtype=bool), k=1)
+
+    negated = [is_negated(cause) for cause in causes]
+    duplicates = UnionFind(len(causes))
+    for i, j in zip(*np.nonzero((similarity >= auto_threshold) & upper)):
+        if negated[i] == negated[j]:
+            duplicates.union(int(i), int(j))
+    clusters = duplicates.groups()
+
+    cluster_of = {i: c for c, cluster in enumerate(clusters) for i in cluster}
+    candidates = UnionFind(len(clusters))
+    for i, j in zip(*np.nonzero((similarity >= candidate_threshold) & upper)):
+        candidates.union(cluster_of[int(i)], cluster_of[int(j)])
+    return [[clusters[c] for c in group] for group in candidates.groups()]
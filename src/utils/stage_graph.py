@@ -0,0 +1,136 @@
+# stage_graph.py
+
+"""
+Small dependency-graph executor for pipeline stages.
+
+Each stage declares the named values it consumes and produces. Stages whose
+inputs are available run concurrently on a thread pool; after the run the
+critical path (the chain of dependent stages with the largest total
+duration) is available.
+"""
+
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import networkx as nx
+
+from utils.logger import get_logger
+from utils.metrics import get_metrics
+
+logger = get_logger()
+
+
+class StageGraph:
+    """
+    Declarative stage graph.
+
+    Stages are functions called with their inputs as keyword arguments. A stage
+    with one output returns the value itself, a stage with several outputs
+    returns a dict keyed by output name.
+    """
+
+    def __init__(self):
+        self.graph = nx.DiGraph()
+        self.durations: Dict[str, float] = {}
+        self._producers: Dict[str, str] = {}
+
+    def add_stage(self, name: str, fn: Callable[..., Any], inputs: List[str], outputs: List[str]):
+        """
+        Register a stage.
+
+        Args:
+            name: Unique stage name (also used as metrics stage).
+            fn: Function computing the outputs from the inputs.
+            inputs: Names of the values the stage consumes.
+            outputs: Names of the values the stage produces.
+        """
+        for output in outputs:
+            if output in self._producers:
+                raise ValueError(f"Value '{output}' is produced by both '{self._producers[output]}' and '{name}'")
+            self._producers[output] = name
+        self.graph.add_node(name, fn=fn, inputs=list(inputs), outputs=list(outputs))
+
+    def _build_edges(self, initial: Dict[str, Any]):
+        for name, data in self.graph.nodes(data=True):
+            for value in data["inputs"]:
+                if value in self._producers:
+                    self.graph.add_edge(self._producers[value], name)
+                elif value not in initial:
+                    raise ValueError(f"Stage '{name}' needs '{value}', which no stage produces")
+        if not nx.is_directed_acyclic_graph(self.graph):
+            raise ValueError(f"Stage graph has a cycle: {nx.find_cycle(self.graph)}")
+
+    def _run_stage(self, name: str, values: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+        data = self.graph.nodes[name]
+        start = time.perf_counter()
+        with get_metrics().stage(name):
+            result = data["fn"](**{value: values[value] for value in data["inputs"]})
+        duration = time.perf_counter() - start
+        if len(data["outputs"]) == 1:
+            result = {data["outputs"][0]: result}
+        return result, duration
+
+    def run(self, initial: Dict[str, Any], max_workers: int = 1) -> Dict[str, Any]:
+        """
+        Execute all stages, running independent ones concurrently.
+
+        Args:
+            initial: Values available before the first stage.
+            max_workers: Maximum number of stages running at the same time.
+
+        Returns:
+            All initial and produced values.
+
+        Raises:
+            Exception: The first exception raised by a stage; stages already
+                running are allowed to finish, no new stages are started.
+        """
+        self._build_edges(initial)
+        values = dict(initial)
+        remaining = {name: self.graph.in_degree(name) for name in self.graph.nodes}
+        ready = [name for name in nx.topological_sort(self.graph) if remaining[name] == 0]
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            running = {}
+            while ready or running:
+                for name in ready:
+                    ctx = contextvars.copy_context()
+                    running[pool.submit(ctx.run, self._run_stage, name, dict(values))] = name
+                ready = []
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result, duration = future.result()
+                    self.durations[name] = duration
+                    values.update(result)
+                    for successor in self.graph.successors(name):
+                        remaining[successor] -= 1
+                        if remaining[successor] == 0:
+                            ready.append(successor)
+        return values
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """
+        Return the chain of dependent stages with the largest summed duration.
+
+        Only meaningful after run(); the end-to-end latency of a run can not be
+        lower than this duration.
+        """
+        best: Dict[str, Tuple[float, Optional[str]]] = {}
+        for name in nx.topological_sort(self.graph):
+            preds = [(best[p][0], p) for p in self.graph.predecessors(name)]
+            length, pred = max(preds) if preds else (0.0, None)
+            best[name] = (length + self.durations.get(name, 0.0), pred)
+
+        if not best:
+            return [], 0.0
+        end = max(best, key=lambda name: best[name][0])
+        path = []
+        node = end
+        while node is not None:
+            path.append(node)
+            node = best[node][1]
+        return path[::-1], best[end][0]
@@ -0,0 +1,117 @@
+# verdict_store.py
+
+"""
+Persistent store of subset verdicts for incremental re-synthesis.
+
+Every LLM verdict of a subset search is appended to a JSON Lines file
+together with its dependency record: the kind of question, the effect, the
+causes that were present and absent, and a hash of the law texts in the
+prompt. Verdicts are looked up under the closed-world reading of a scenario:
+a cause that is not present is absent, whether or not it was part of the
+cause list at the time. The key is therefore (kind, effect, law hash, present
+causes), and a verdict stays valid when causes are added or removed:
+
+- sufficiency: adding a cause c reuses every subset without c (c absent)
+- necessity: adding a cause c reuses every absent set containing c
+
+Changing a law changes the law hash and invalidates exactly the verdicts
+whose prompts contained it. The minimal sets of every search are recorded as
+well, so a re-run can seed its search with the prior sets that are still
+provably minimal.
+
+Like checkpoints, the file is append-only and a partially written last line
+is ignored.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+StoreKey = Tuple[str, str, str, FrozenSet[str]]
+
+
+def law_hash(legal_laws: str, safety_laws: str) -> str:
+    """Return a short hash of the law texts used in the prompts."""
+    digest = hashlib.sha256()
+    for text in (legal_laws, safety_laws):
+        digest.update(str(text).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class VerdictStore:
+    """
+    Verdicts and minimal sets of all subset searches of one or more effects.
+
+    Args:
+        path: JSON Lines file holding the store; created if missing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.verdicts: Dict[StoreKey, bool] = {}
+        self.minimal_sets: Dict[Tuple[str, str, str], List[List[str]]] = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            self._load()
+            logger.info(f"Loaded {len(self.verdicts)} verdicts from {path}")
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partially written line of an interrupted run
+                    continue
+                if "verdict" in record:
+                    key = (record["kind"], record["effect"], record["laws"], frozenset(record["present"]))
+                    self.verdicts[key] = record["verdict"]
+                elif "minimal" in record:
+                    sets = self.minimal_sets.setdefault((record["kind"], record["effect"], record["laws"]), [])
+                    sets.extend(s for s in record["minimal"] if s not in sets)
+
+    def _append(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def lookup(self, kind: str, effect: str, laws: str, present: Iterable[str]) -> Optional[bool]:
+        """Return the stored verdict of a scenario, if any."""
+        with self._lock:
+            return self.verdicts.get((kind, effect, laws, frozenset(present)))
+
+    def record(self, kind: str, effect: str, laws: str, present: List[str], absent: List[str], verdict: bool):
+        """Store a new verdict with its dependency record."""
+        with self._lock:
+            self.verdicts[(kind, effect, laws, frozenset(present))] = verdict
+            self._append({"kind": kind, "effect": effect, "laws": laws, "present": sorted(present),
+                          "absent": sorted(absent), "verdict": verdict})
+
+    def record_minimal_sets(self, kind: str, effect: str, laws: str, causes: List[str], minimal: List[List[str]]):
+        """Store the minimal sets found by a search over causes."""
+        with self._lock:
+            sets = self.minimal_sets.setdefault((kind, effect, laws), [])
+            sets.extend(s for s in minimal if s not in sets)
+            self._append({"kind": kind, "effect": effect, "laws": laws, "causes": list(causes),
+                          "minimal": minimal, "created": time.time()})
+
+    def prior_minimal_sets(self, kind: str, effect: str, laws: str) -> List[List[str]]:
+        """Return the minimal sets recorded by earlier searches with the same laws."""
+        with self._lock:
+            return list(self.minimal_sets.get((kind, effect, laws), []))
+
+    def close(self):
+        """Close the underlying file."""
+        with self._lock:
+            self._file.close()
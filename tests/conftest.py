@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# The modules import each other relative to src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+@pytest.fixture
+def scripted(monkeypatch):
+    """Route call_llm to an uncached ScriptedBackend built from the given script."""
+    import llm_adapter
+    from llm_backends import ScriptedBackend
+
+    def use(**script):
+        backend = ScriptedBackend(**script)
+        monkeypatch.setattr(llm_adapter, "_backend", backend)
+        monkeypatch.setattr(llm_adapter, "_cache", None)
+        return backend
+    return use
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+import llm_adapter
+from llm_backends import OpenAIBackend, ScriptedBackend
+from utils.metrics import Metrics, use_metrics
+from utils.rate_limit import RequestScheduler
+
+
+def mock_backend(handler):
+    backend = OpenAIBackend("key", "model", scheduler=RequestScheduler(max_attempts=3, backoff_base=0.0))
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    backend.get_async_client = lambda: client
+    return backend
+
+
+def test_acomplete_retries_throttled_requests():
+    statuses = [429, 200]
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        status = statuses.pop(0)
+        if status != 200:
+            return httpx.Response(status, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "answer"}}],
+                                         "usage": {"completion_tokens": 1}})
+
+    result = asyncio.run(mock_backend(handler).acomplete("prompt", 16, 0.0, system="system"))
+    assert result == {"text": "answer", "usage": {"completion_tokens": 1}, "attempts": 2}
+    assert [m["role"] for m in bodies[0]["messages"]] == ["system", "user"]
+
+
+def test_acomplete_gives_up_after_max_attempts():
+    backend = mock_backend(lambda request: httpx.Response(503))
+    with pytest.raises(RuntimeError, match="after 3 retries"):
+        asyncio.run(backend.acomplete("prompt", 16, 0.0))
+
+
+def test_async_client_is_pooled_per_event_loop():
+    backend = OpenAIBackend("key", "model")
+
+    async def clients():
+        return backend.get_async_client(), backend.get_async_client()
+
+    first, again = asyncio.run(clients())
+    assert first is again
+    second, _ = asyncio.run(clients())
+    assert second is not first
+
+
+def test_acall_llm_runs_calls_concurrently_and_caches(monkeypatch, tmp_path):
+    backend = ScriptedBackend(causes=["a", "b"], latency=0.1)
+    monkeypatch.setattr(llm_adapter, "_backend", backend)
+    llm_adapter.configure_cache(str(tmp_path / "cache.sqlite"))
+
+    async def decompose(n):
+        return await asyncio.gather(*(llm_adapter.acall_llm(f"prompt {i}", template="decompose_effect")
+                                      for i in range(n)))
+
+    try:
+        with use_metrics(Metrics()) as metrics:
+            start = time.perf_counter()
+            texts = asyncio.run(decompose(8))
+            assert time.perf_counter() - start < 0.5
+            assert asyncio.run(decompose(8)) == texts
+    finally:
+        llm_adapter.configure_cache(None)
+
+    assert json.loads(texts[0]) == {"causes": ["a", "b"]}
+    assert backend.calls == {"decompose_effect": 8}
+    assert metrics.summary()["totals"]["cache_hits"] == 8
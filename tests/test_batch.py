@@ -0,0 +1,54 @@
+import json
+import time
+
+import batch
+from results import PipelineResult
+
+
+def write_effects(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"effect_id": f"e{i}", "effect": f"effect {i}"}) + "\n")
+
+
+def fake_run_pipeline(effect, **kwargs):
+    time.sleep(0.001)
+    return PipelineResult(effect=effect, causes=[], necessary_sets=[], sufficient_sets=[])
+
+
+def test_effects_are_streamed_through_a_bounded_window(tmp_path, monkeypatch):
+    input_path = tmp_path / "effects.jsonl"
+    write_effects(input_path, 50)
+    read = []
+    started = []
+    iter_effects = batch.iter_effects
+
+    def counting_iter_effects(path):
+        for item in iter_effects(path):
+            read.append(item["effect_id"])
+            yield item
+
+    def run_pipeline(effect, **kwargs):
+        started.append(len(read))
+        return fake_run_pipeline(effect, **kwargs)
+
+    monkeypatch.setattr(batch, "iter_effects", counting_iter_effects)
+    monkeypatch.setattr(batch, "run_pipeline", run_pipeline)
+    counts = batch.run_batch(str(input_path), str(tmp_path / "results.jsonl"), workers=1)
+
+    assert counts["ok"] == 50
+    # One worker with a window of two effects never reads more than three effects ahead
+    assert all(read_so_far - index <= 3 for index, read_so_far in enumerate(started))
+
+
+def test_no_resume_overwrites_the_output(tmp_path, monkeypatch):
+    input_path, output_path = tmp_path / "effects.jsonl", tmp_path / "results.jsonl"
+    write_effects(input_path, 3)
+    monkeypatch.setattr(batch, "run_pipeline", fake_run_pipeline)
+
+    batch.run_batch(str(input_path), str(output_path))
+    assert batch.run_batch(str(input_path), str(output_path))["skipped"] == 3
+    batch.run_batch(str(input_path), str(output_path), resume=False)
+
+    ids = [json.loads(line)["effect_id"] for line in open(output_path, encoding="utf-8")]
+    assert sorted(ids) == ["e0", "e1", "e2"]
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+import pipeline
+
+CAUSES = ["a", "b", "c", "d", "e"]
+SCRIPT = dict(causes=CAUSES, sufficient_sets=[["a", "b"], ["c"]], necessary_sets=[["d"], ["a", "e"]])
+
+
+@pytest.mark.parametrize("kind", ["sufficiency", "necessity"])
+def test_batched_search_matches_single_requests(scripted, kind):
+    prune = pipeline.prune_sufficient_causes if kind == "sufficiency" else pipeline.prune_necessary_causes
+    found = {}
+    for batch_size in (1, 4):
+        backend = scripted(**SCRIPT)
+        found[batch_size] = prune("effect", CAUSES, "laws", "physics", batch_size=batch_size)
+        requests = sum(backend.calls.values())
+        if batch_size == 1:
+            single_requests = requests
+        else:
+            assert backend.calls.get(f"{kind}_set_batch", 0) > 0
+            assert requests < single_requests
+    assert found[1] == found[4]
+
+
+def test_parse_batch_verdicts_drops_malformed_items():
+    response = json.dumps([
+        {"id": 1, "result": "yes", "reason": "r"},
+        {"id": "2", "result": "maybe"},
+        {"id": 9, "result": "no"},
+        "garbage",
+        {"id": 3, "result": "no"},
+    ])
+    assert set(pipeline._parse_batch_verdicts(response, ["1", "2", "3"])) == {"1", "3"}
+    assert pipeline._parse_batch_verdicts('{"results": [{"id": 2, "result": "no"}]}', ["1", "2"]) == {
+        "2": {"id": 2, "result": "no"}}
+    assert pipeline._parse_batch_verdicts("not json", ["1"]) == {}
+
+
+def test_unanswered_scenarios_fall_back_to_single_calls(monkeypatch):
+    # The batched answer skips scenario 2 and garbles scenario 3
+    monkeypatch.setattr(pipeline, "call_llm", lambda *args, **kwargs: json.dumps(
+        [{"id": 1, "result": "yes", "reason": "r1"}, {"id": 3, "result": "perhaps"}]))
+    singles = []
+
+    def single(scenario):
+        singles.append(scenario["causes"])
+        return {"result": "no", "reason": "single"}
+
+    verdicts = pipeline.batched_verdicts("sufficiency_set", "system", "{scenarios}", "{id}: {causes}",
+                                         [{"causes": "x"}, {"causes": "y"}, {"causes": "z"}], single)
+    assert [v["result"] for v in verdicts] == ["yes", "no", "no"]
+    assert singles == ["y", "z"]
@@ -0,0 +1,82 @@
+import pytest
+
+from utils.cache import CacheMissError, ResponseCache, make_cache_key
+
+
+def key(prompt):
+    return make_cache_key("model", prompt, 100, 0.0)
+
+
+@pytest.fixture
+def seeded(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path)
+    cache.put(key("known"), "answer")
+    cache.close()
+    return path
+
+
+def test_readwrite_roundtrip_and_counters(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    assert cache.get(key("prompt")) is None
+    cache.put(key("prompt"), "answer")
+    assert cache.get(key("prompt")) == "answer"
+    assert cache.stats() == {"hits": 1, "misses": 1, "writes": 1, "evictions": 0}
+    cache.close()
+
+
+def test_key_depends_on_every_request_field():
+    keys = {
+        key("prompt"),
+        make_cache_key("other", "prompt", 100, 0.0),
+        make_cache_key("model", "prompt", 200, 0.0),
+        make_cache_key("model", "prompt", 100, 0.5),
+        make_cache_key("model", "prompt", 100, 0.0, system="system"),
+    }
+    assert len(keys) == 5
+
+
+def test_readonly_serves_hits_but_never_writes(seeded):
+    cache = ResponseCache(seeded, mode="readonly")
+    assert cache.get(key("known")) == "answer"
+    assert cache.get(key("unknown")) is None
+    cache.put(key("unknown"), "new")
+    assert cache.get(key("unknown")) is None
+    assert len(cache) == 1
+    assert cache.writes == 0
+    cache.close()
+
+
+def test_replay_raises_on_a_miss(seeded):
+    cache = ResponseCache(seeded, mode="replay")
+    assert cache.get(key("known")) == "answer"
+    with pytest.raises(CacheMissError):
+        cache.get(key("unknown"))
+    cache.put(key("unknown"), "new")
+    assert len(cache) == 1
+    cache.close()
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ResponseCache(str(tmp_path / "cache.sqlite"), mode="append")
+
+
+def test_stale_entries_miss_and_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_age=-1)
+    cache.put(key("prompt"), "answer")
+    assert cache.get(key("prompt")) is None
+    assert cache.evict() == 1
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_eviction_keeps_the_most_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    for prompt in ("a", "b", "c"):
+        cache.put(key(prompt), prompt)
+    cache.get(key("a"))
+    assert cache.evict() == 1
+    assert cache.get(key("a")) == "a"
+    assert len(cache) == 2
+    cache.close()
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+import pipeline
+from utils.checkpoint import SearchCheckpoint, load_checkpoint
+
+CAUSES = ["a", "b", "c", "d", "e"]
+SUFFICIENT = [{"a", "b"}, {"c", "d"}]
+# Absent sets that prevent the effect: {a} and {b, c}
+NECESSARY = [{"a"}, {"b", "c"}]
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Scripted set verdicts; crash_after makes the n-th next call raise."""
+    state = {"calls": [], "crash_after": None}
+
+    def answer(key):
+        if state["crash_after"] is not None and len(state["calls"]) >= state["crash_after"]:
+            raise Crash()
+        state["calls"].append(key)
+
+    def sufficiency_set(effect, absent_causes, present_causes, legal_laws, safety_laws, verdict_only=False):
+        answer(("sufficiency", frozenset(present_causes)))
+        sufficient = any(s <= set(present_causes) for s in SUFFICIENT)
+        return {"result": "yes" if sufficient else "no", "reason": "test"}
+
+    def necessity_set(effect, present_causes, absent_causes, legal_laws, safety_laws, verdict_only=False):
+        answer(("necessity", frozenset(absent_causes)))
+        prevented = any(s <= set(absent_causes) for s in NECESSARY)
+        return {"result": "no" if prevented else "yes", "reason": "test"}
+
+    monkeypatch.setattr(pipeline, "sufficiency_set", sufficiency_set)
+    monkeypatch.setattr(pipeline, "necessity_set", necessity_set)
+    return state
+
+
+def run(kind, checkpoint, strategy):
+    prune = pipeline.prune_sufficient_causes if kind == "sufficiency" else pipeline.prune_necessary_causes
+    return prune("effect", CAUSES, "laws", "physics", strategy=strategy, checkpoint_path=checkpoint)
+
+
+@pytest.mark.parametrize("strategy", ["levelwise", "boundary"])
+@pytest.mark.parametrize("kind, expected", [("sufficiency", SUFFICIENT), ("necessity", NECESSARY)])
+def test_crashed_search_resumes_without_repeating_calls(tmp_path, llm, kind, expected, strategy):
+    checkpoint = str(tmp_path / f"{kind}.json")
+    llm["crash_after"] = 6
+    with pytest.raises(Crash):
+        run(kind, checkpoint, strategy)
+    assert len(load_checkpoint(checkpoint)["verdicts"]) == 6
+
+    llm["crash_after"] = None
+    found = pipeline.resume_search(checkpoint)
+
+    assert sorted(map(set, found), key=sorted) == expected
+    # The six verdicts of the crashed run are not requested again
+    assert len(llm["calls"]) == len(set(llm["calls"]))
+    assert load_checkpoint(checkpoint)["strategy"] == strategy
+
+
+def test_finished_search_is_replayed_from_checkpoint(tmp_path, llm):
+    checkpoint = str(tmp_path / "sufficiency.json")
+    first = run("sufficiency", checkpoint, "levelwise")
+    calls = len(llm["calls"])
+    assert run("sufficiency", checkpoint, "levelwise") == first
+    assert len(llm["calls"]) == calls
+
+
+def test_checkpoint_of_another_search_is_replaced(tmp_path):
+    path = str(tmp_path / "search.json")
+    checkpoint = SearchCheckpoint(path, "sufficiency", "effect", CAUSES, "laws", "physics")
+    checkpoint.record(3, True)
+    checkpoint.close()
+
+    checkpoint = SearchCheckpoint(path, "sufficiency", "effect", CAUSES, "other laws", "physics")
+    assert checkpoint.lookup(3) is None
+    checkpoint.close()
+    assert load_checkpoint(path)["verdicts"] == {}
+
+
+def test_partially_written_line_is_ignored(tmp_path):
+    path = str(tmp_path / "search.json")
+    checkpoint = SearchCheckpoint(path, "necessity", "effect", CAUSES, "laws", "physics")
+    checkpoint.record(1, False)
+    checkpoint.update_progress(1, [])
+    checkpoint.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"mask": 2, "verdict": True})[:-4])
+
+    checkpoint = SearchCheckpoint(path, "necessity", "effect", CAUSES, "laws", "physics")
+    assert checkpoint.verdicts == {1: False}
+    assert checkpoint.progress["level"] == 1
+    checkpoint.close()
+
+
+def test_non_checkpoint_file_is_rejected(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text("[]\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_checkpoint(str(path))
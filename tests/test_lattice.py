@@ -0,0 +1,96 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from lattice import (SupersetIndex, boundary_minimal_sets, indices_to_mask, lattice_order, levelwise_minimal_sets,
+                     mask_to_indices, minimal_masks, minimal_transversals)
+
+
+def random_family(n, seed):
+    rng = random.Random(seed)
+    masks = [indices_to_mask(rng.sample(range(n), rng.randint(1, min(4, n)))) for _ in range(rng.randint(0, 4))]
+    return [m for m in masks if not any(o != m and o & m == o for o in masks)]
+
+
+def brute_force(n, family):
+    positive = [m for m in range(1, 1 << n) if any(f & m == f for f in family)]
+    return sorted(m for m in positive if not any(o != m and o & m == o for o in positive))
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_boundary_and_levelwise_match_brute_force(seed):
+    n = 3 + seed % 6
+    family = random_family(n, seed)
+    expected = brute_force(n, family)
+
+    def query(mask):
+        return any(f & mask == f for f in family)
+
+    boundary, boundary_stats = boundary_minimal_sets(n, query)
+    levelwise, _ = levelwise_minimal_sets(n, lambda masks: [query(m) for m in masks])
+
+    assert sorted(boundary) == expected
+    assert sorted(levelwise) == expected
+    assert boundary_stats["complete"]
+    assert boundary_stats["issued"] + boundary_stats["inferred"] == (1 << n) - 1
+
+
+def test_boundary_search_queries_each_set_once_and_skips_the_lattice():
+    n = 12
+    family = [indices_to_mask([0, 1]), indices_to_mask([5, 7, 9])]
+    asked = []
+
+    def query(mask):
+        asked.append(mask)
+        return any(f & mask == f for f in family)
+
+    found, stats = boundary_minimal_sets(n, query)
+    assert sorted(found) == sorted(family)
+    assert len(asked) == len(set(asked)) == stats["issued"]
+    assert stats["issued"] < 100
+
+
+def test_boundary_search_starts_from_seeds():
+    family = [indices_to_mask([0, 1]), indices_to_mask([2, 3])]
+    found, stats = boundary_minimal_sets(4, lambda m: any(f & m == f for f in family), seeds=[family[0]])
+    assert sorted(found) == sorted(family)
+    assert stats["seeded"] == 1
+
+
+def test_minimal_transversals_hit_every_set():
+    n = 5
+    family = [indices_to_mask([0, 1]), indices_to_mask([1, 2, 3]), indices_to_mask([4])]
+    transversals = minimal_transversals(family, n)
+    hitting = [m for m in range(1 << n) if all(m & f for f in family)]
+    expected = [m for m in hitting if not any(o != m and o & m == o for o in hitting)]
+    assert sorted(transversals) == sorted(expected)
+
+
+def test_mask_roundtrip():
+    for r in range(4):
+        for indices in combinations(range(6), r):
+            assert mask_to_indices(indices_to_mask(indices)) == indices
+
+
+def test_lattice_order_matches_combinations():
+    n = 5
+    expected = [indices_to_mask(c) for r in range(1, n + 1) for c in combinations(range(n), r)]
+    assert sorted(range(1, 1 << n), key=lattice_order) == expected
+
+
+def test_minimal_masks_drop_supersets_and_duplicates():
+    masks = [0b0111, 0b0011, 0b0011, 0b1000, 0b1100]
+    assert minimal_masks(masks) == [0b1000, 0b0011]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_superset_index_matches_a_linear_scan(seed):
+    n = 10
+    rng = random.Random(seed)
+    index = SupersetIndex(n)
+    found = [indices_to_mask(rng.sample(range(n), rng.randint(1, 3))) for _ in range(6)]
+    for mask in found:
+        index.add(mask)
+    for mask in range(1 << n):
+        assert index.contains_subset_of(mask) == any(f & mask == f for f in found)
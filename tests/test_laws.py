@@ -0,0 +1,61 @@
+import pytest
+
+from utils.laws import (PHYSICS_LAWS, TRAFFIC_LAWS, LawIndex, format_all_laws_for_prompt,
+                        format_relevant_laws_for_prompt, select_relevant_laws)
+
+LAWS = {
+    "traffic_light": "Follow traffic light signals",
+    "safe_distance": "Keep a sufficient distance from the vehicle ahead",
+    "no_stopping": "Stopping on motorways is prohibited",
+}
+
+
+def test_index_ranks_the_matching_law_first():
+    scores = LawIndex(LAWS).scores("Stop at the red traffic light")
+    assert max(scores, key=scores.get) == "traffic_light"
+
+
+def test_select_keeps_min_laws_and_index_order():
+    index = LawIndex(LAWS)
+    assert index.select("unrelated words", min_score=1.0, min_laws=0) == []
+    assert len(index.select("unrelated words", min_score=1.0, min_laws=2)) == 2
+    assert index.select("distance and traffic light", min_score=0.1, min_laws=0) == ["traffic_light", "safe_distance"]
+
+
+def test_relevant_laws_are_a_smaller_subset_of_all_laws():
+    traffic, physics = select_relevant_laws("Stop in time behind a braking vehicle",
+                                            ["Emergency braking", "Wet road surface"])
+    assert "emergency_stopping" in traffic
+    assert "hydroplaning_risk" in physics
+    assert set(traffic) < set(TRAFFIC_LAWS) and set(physics) < set(PHYSICS_LAWS)
+
+    legal, safety = format_relevant_laws_for_prompt("Stop in time behind a braking vehicle",
+                                                    ["Emergency braking", "Wet road surface"])
+    assert legal.splitlines() == [f"{name} : {TRAFFIC_LAWS[name]}" for name in traffic]
+    assert len(legal) + len(safety) < len(format_all_laws_for_prompt())
+
+
+@pytest.mark.parametrize("mode", ["relevant", "compare"])
+def test_pipeline_sends_the_selected_laws(scripted, mode):
+    from pipeline import run_pipeline
+
+    scripted(causes=["Emergency braking", "Wet road surface"], sufficient_sets=[["Emergency braking"]],
+             necessary_sets=[["Emergency braking"]])
+    result = run_pipeline("Stop in time behind a braking vehicle", law_selection=mode)
+    selection = result.metrics["info"]["law_selection"]
+    assert 0 < selection["selected_chars"] < selection["full_chars"]
+    assert "emergency_stopping" in selection["traffic_laws"]
+    counters = result.metrics["counters"]
+    if mode == "compare":
+        assert counters["law_selection_agreements"] == 2
+        assert counters.get("law_selection_disagreements", 0) == 0
+    else:
+        assert "law_selection_agreements" not in counters
+
+
+def test_unknown_law_selection_mode_is_rejected(scripted):
+    from pipeline import run_pipeline
+
+    scripted(causes=["a"])
+    with pytest.raises(ValueError, match="law selection"):
+        run_pipeline("effect", law_selection="some")
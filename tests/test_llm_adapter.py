@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import llm_adapter
+from llm_backends import RoutedBackend, ScriptedBackend
+
+
+class StreamingBackend:
+    """Cuts streamed verdict answers off after "result" and answers other calls in full."""
+
+    model = "stream-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, prompt, max_tokens, temperature, timeout=None, template=None, system=None,
+                 stream_until=None, **kwargs):
+        self.calls += 1
+        if stream_until is None:
+            return {"text": '{"result": "yes", "reason": "The vehicle stops"}',
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 12}}
+        return {"text": '{"result": "yes", "reason": "The veh', "early_exit": True,
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5}}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    yield llm_adapter.configure_cache(str(tmp_path / "cache.sqlite"))
+    llm_adapter.configure_cache(None)
+
+
+def test_early_exited_verdicts_are_cached(cache):
+    backend = StreamingBackend()
+    previous = llm_adapter.set_backend(backend)
+    try:
+        first = llm_adapter.call_llm_json("Is it sufficient?", template="sufficiency_set", stream=True)
+        second = llm_adapter.call_llm_json("Is it sufficient?", template="sufficiency_set", stream=True)
+    finally:
+        llm_adapter.set_backend(previous)
+
+    assert backend.calls == 1
+    assert first["result"] == second["result"] == "yes"
+    key = llm_adapter.make_cache_key("stream-model", "Is it sufficient?", 512, 0.0, None, early_exit=True)
+    assert json.loads(cache.get(key)) == {"result": "yes"}
+
+
+def test_early_exited_verdicts_are_not_served_as_full_answers(cache):
+    backend = StreamingBackend()
+    previous = llm_adapter.set_backend(backend)
+    try:
+        streamed = llm_adapter.call_llm_json("Is it sufficient?", template="sufficiency_set", stream=True)
+        full = llm_adapter.call_llm_json("Is it sufficient?", template="sufficiency_set", stream=False)
+        streamed_again = llm_adapter.call_llm_json("Is it sufficient?", template="sufficiency_set", stream=True)
+    finally:
+        llm_adapter.set_backend(previous)
+
+    assert streamed["reason"] is None
+    assert full["reason"] == "The vehicle stops"
+    # A streamed request prefers the full answer once it is cached
+    assert streamed_again["reason"] == "The vehicle stops"
+    assert backend.calls == 2
+
+
+@pytest.mark.parametrize("routed", [False, True])
+def test_configure_http_with_scripted_backend(routed):
+    backend = ScriptedBackend(causes=["a"])
+    if routed:
+        backend = RoutedBackend(backend, {"necessity_set": ScriptedBackend(causes=["b"])})
+    previous = llm_adapter.set_backend(backend)
+    try:
+        llm_adapter.configure_http(max_connections=4, timeout=5.0)
+    finally:
+        llm_adapter.set_backend(previous)
+    assert getattr(backend, "default", backend).timeout == 5.0
+
+
+def test_max_tokens_for_reports_the_limit_reduction(monkeypatch):
+    from utils.metrics import Metrics, use_metrics
+
+    monkeypatch.setattr(llm_adapter, "LLM_TOKEN_BUDGETS", True)
+    with use_metrics(Metrics()) as metrics:
+        budget = llm_adapter.max_tokens_for("necessity_set_verdict", 15000)
+    assert budget == llm_adapter.TOKEN_BUDGETS["necessity_set_verdict"][0]
+    assert metrics.summary()["counters"] == {"max_tokens_limit_reduction": 15000 - budget}
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from llm_backends import OpenAIBackend, ScriptedBackend
+from utils.rate_limit import RequestScheduler
+
+
+class FakeResponse:
+    def __init__(self, status_code, lines=()):
+        self.status_code = status_code
+        self.headers = {}
+        self.lines = list(lines)
+        self.closed = False
+
+    def iter_lines(self, chunk_size=None, decode_unicode=False):
+        return iter(self.lines)
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def post(self, url, json=None, timeout=None, stream=False):
+        return self.responses.pop(0)
+
+
+def stream_lines(text):
+    chunk = {"choices": [{"delta": {"content": text}}]}
+    return [f"data: {json.dumps(chunk)}", "data: [DONE]"]
+
+
+def test_streamed_retry_releases_connections(monkeypatch):
+    responses = [FakeResponse(429), FakeResponse(503), FakeResponse(200, stream_lines('{"result": "yes"}'))]
+    backend = OpenAIBackend("key", "model", scheduler=RequestScheduler(max_attempts=3, backoff_base=0.0))
+    monkeypatch.setattr(backend, "get_session", lambda: FakeSession(responses))
+
+    result = backend.complete("prompt", 16, 0.0, stream_until=lambda text: False)
+
+    assert result["text"] == '{"result": "yes"}'
+    assert result["attempts"] == 3
+    assert all(response.closed for response in responses)
+
+
+def test_scripted_backend_rejects_prompts_without_template():
+    backend = ScriptedBackend(causes=["a"])
+    with pytest.raises(ValueError, match="without one"):
+        backend.complete("prompt", 16, 0.0)
+
+
+def test_retries_give_up_after_max_attempts(monkeypatch):
+    responses = [FakeResponse(429), FakeResponse(500)]
+    backend = OpenAIBackend("key", "model", scheduler=RequestScheduler(max_attempts=2, backoff_base=0.0))
+    monkeypatch.setattr(backend, "get_session", lambda: FakeSession(responses))
+
+    with pytest.raises(RuntimeError, match="after 2 retries"):
+        backend.complete("prompt", 16, 0.0)
+    assert backend.scheduler.stats()["retries"] == 2
+
+
+def test_scripted_backend_rejects_unknown_templates():
+    with pytest.raises(ValueError, match="no script"):
+        ScriptedBackend(causes=["a"]).complete("prompt", 16, 0.0, template="summarize")
+
+
+@pytest.mark.parametrize("strategy", ["levelwise", "boundary"])
+def test_scripted_pipeline_recovers_the_script(tmp_path, scripted, strategy):
+    from pipeline import run_pipeline
+
+    script = {"causes": ["c0", "c1", "c2", "c3", "c4", "c1"], "sufficient_sets": [["c0", "c2"], ["c3"]],
+              "necessary_sets": [["c4"], ["c1", "c2"]]}
+    path = tmp_path / "script.json"
+    path.write_text(json.dumps(script), encoding="utf-8")
+    backend = scripted(**json.loads(path.read_text(encoding="utf-8")))
+    assert ScriptedBackend.from_file(str(path)).causes == backend.causes
+
+    result = run_pipeline("effect", strategy=strategy, legal_laws="laws", safety_laws="physics")
+    assert [cause.text for cause in result.causes] == ["c0", "c1", "c2", "c3", "c4"]
+    assert [result.cause_texts(s) for s in result.sufficient_sets] == [["c3"], ["c0", "c2"]]
+    assert [result.cause_texts(s) for s in result.necessary_sets] == [["c4"], ["c1", "c2"]]
+    assert result.necessary_causes == ["c4"]
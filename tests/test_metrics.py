@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from utils.concurrency import map_bounded
+from utils.metrics import LATENCY_BUCKETS, Metrics, get_metrics, use_metrics
+
+
+def test_calls_are_attributed_to_the_active_stage_in_worker_threads():
+    metrics = Metrics()
+    with use_metrics(metrics):
+        with metrics.stage("search"):
+            map_bounded(lambda _: get_metrics().record_call("verdict", 0.02, {"completion_tokens": 3}),
+                        range(8), max_workers=4)
+        get_metrics().record_call("other", 0.5, cached=True)
+
+    summary = metrics.summary()
+    rows = {(row["stage"], row["template"]): row for row in summary["llm_calls"]}
+    assert rows[("search", "verdict")]["calls"] == 8
+    assert rows[("search", "verdict")]["completion_tokens"] == 24
+    assert rows[(None, "other")]["cache_hits"] == 1
+    assert summary["totals"]["calls"] == 9
+    assert summary["stages"]["search"]["runs"] == 1
+
+
+def test_usage_retries_and_latency_histogram():
+    metrics = Metrics()
+    usage = {"prompt_tokens": 100, "completion_tokens": 7, "prompt_tokens_details": {"cached_tokens": 64}}
+    metrics.record_call("t", 0.07, usage, attempts=3)
+    metrics.record_call("t", 100.0)
+
+    row = metrics.summary()["llm_calls"][0]
+    assert (row["prompt_tokens"], row["completion_tokens"], row["cached_tokens"]) == (100, 7, 64)
+    assert row["retries"] == 2
+    assert row["latency_max"] == 100.0
+    assert row["latency_mean"] == pytest.approx(50.035)
+    assert row["latency_histogram"][LATENCY_BUCKETS.index(0.1)] == 1
+    assert row["latency_histogram"][-1] == 1
+
+
+def test_counters_annotations_and_trace(tmp_path):
+    metrics = Metrics()
+    with metrics.stage("convert"):
+        metrics.record_call("t", 0.01)
+    metrics.increment("found", 2)
+    metrics.increment("found")
+    metrics.annotate("critical_path", ["convert"])
+
+    summary = metrics.summary()
+    assert summary["counters"] == {"found": 3}
+    assert summary["info"] == {"critical_path": ["convert"]}
+    json.dumps(summary)
+
+    path = tmp_path / "trace.jsonl"
+    metrics.write_trace(str(path))
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [event["type"] for event in events] == ["llm_call", "stage"]
+    assert events[0]["stage"] == "convert"
+
+
+def test_run_pipeline_reports_stages_and_templates(scripted, tmp_path):
+    from pipeline import run_pipeline
+
+    backend = scripted(causes=["a", "b", "c"], sufficient_sets=[["a"]], necessary_sets=[["b"]])
+    trace = tmp_path / "trace.jsonl"
+    result = run_pipeline("effect", legal_laws="laws", safety_laws="physics", trace_path=str(trace))
+
+    summary = result.metrics
+    templates = {row["template"] for row in summary["llm_calls"]}
+    assert {"decompose_effect", "merge_duplicates", "check_necessity"} <= templates
+    assert summary["totals"]["calls"] == sum(backend.calls.values())
+    assert {"decompose_effect", "prune_necessary_causes", "prune_sufficient_causes"} <= set(summary["stages"])
+    assert len(trace.read_text().splitlines()) >= summary["totals"]["calls"]
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+import pipeline
+from utils.concurrency import map_bounded
+
+CAUSES = ["a", "b", "c", "d", "e", "f"]
+SUFFICIENT = [{"a", "b"}, {"c", "d", "e"}, {"f"}]
+
+
+class InFlight:
+    """Records how many calls overlap."""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(0.005)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+def test_map_bounded_keeps_order_and_bounds_concurrency():
+    flight = InFlight()
+
+    def square(x):
+        with flight:
+            return x * x
+
+    assert map_bounded(square, range(20), max_workers=4) == [x * x for x in range(20)]
+    assert 1 < flight.peak <= 4
+
+
+def test_map_bounded_is_serial_with_one_worker():
+    threads = set()
+    map_bounded(lambda _: threads.add(threading.get_ident()), range(5), max_workers=1)
+    assert threads == {threading.get_ident()}
+
+
+def test_map_bounded_propagates_errors():
+    def fail(x):
+        if x == 3:
+            raise ValueError(x)
+        return x
+
+    with pytest.raises(ValueError):
+        map_bounded(fail, range(6), max_workers=3)
+
+
+@pytest.fixture
+def sufficiency_calls(monkeypatch):
+    calls = []
+    flight = InFlight()
+
+    def sufficiency_set(effect, absent_causes, present_causes, legal_laws, safety_laws, verdict_only=False):
+        with flight:
+            calls.append(frozenset(present_causes))
+        sufficient = any(s <= set(present_causes) for s in SUFFICIENT)
+        return {"result": "yes" if sufficient else "no", "reason": "test"}
+
+    monkeypatch.setattr(pipeline, "sufficiency_set", sufficiency_set)
+    return calls, flight
+
+
+def test_concurrent_sufficiency_search_matches_serial(sufficiency_calls):
+    calls, flight = sufficiency_calls
+    serial = pipeline.prune_sufficient_causes("effect", CAUSES, "laws", "physics", max_workers=1)
+    serial_calls = sorted(calls, key=sorted)
+    assert flight.peak == 1
+    del calls[:]
+
+    parallel = pipeline.prune_sufficient_causes("effect", CAUSES, "laws", "physics", max_workers=8)
+    assert parallel == serial
+    assert sorted(map(set, parallel), key=sorted) == sorted(SUFFICIENT, key=sorted)
+    # The same subsets are asked, each once, several at a time
+    assert sorted(calls, key=sorted) == serial_calls
+    assert len(set(calls)) == len(calls)
+    assert flight.peak > 1
+
+
+# Absent sets that prevent the effect
+NECESSARY = [{"a"}, {"b", "c"}, {"d", "e", "f"}]
+
+
+def test_concurrent_necessity_search_matches_serial(monkeypatch):
+    calls = []
+    flight = InFlight()
+
+    def necessity_set(effect, present_causes, absent_causes, legal_laws, safety_laws, verdict_only=False):
+        with flight:
+            calls.append(frozenset(absent_causes))
+        prevented = any(s <= set(absent_causes) for s in NECESSARY)
+        return {"result": "no" if prevented else "yes", "reason": "test"}
+
+    monkeypatch.setattr(pipeline, "necessity_set", necessity_set)
+    serial = pipeline.prune_necessary_causes("effect", CAUSES, "laws", "physics", max_workers=1)
+    serial_calls = sorted(calls, key=sorted)
+    del calls[:]
+
+    parallel = pipeline.prune_necessary_causes("effect", CAUSES, "laws", "physics", max_workers=8)
+    assert parallel == serial
+    assert sorted(map(set, parallel), key=sorted) == sorted(NECESSARY, key=sorted)
+    assert sorted(calls, key=sorted) == serial_calls
+    assert len(set(calls)) == len(calls)
+    assert flight.peak > 1
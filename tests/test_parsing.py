@@ -0,0 +1,46 @@
+import pytest
+
+from utils.parsing import ResponseParseError, extract_json, parse_response, verdict_prefix
+
+
+@pytest.mark.parametrize("text", [
+    '{"result": "yes", "reason": "r"}',
+    'Sure, here it is:\n```json\n{"result": "yes", "reason": "r"}\n```',
+    'Answer: {"result": "yes", "reason": "r"} Hope this helps {"x": 1}',
+])
+def test_first_balanced_object_is_parsed(text):
+    assert parse_response(text, "sufficiency_set") == {"result": "yes", "reason": "r"}
+
+
+def test_braces_inside_strings_are_ignored():
+    assert extract_json('{"reason": "a } b \\" { c", "result": "no"}') == {"reason": 'a } b " { c', "result": "no"}
+
+
+def test_truncated_answers_are_reported():
+    with pytest.raises(ResponseParseError) as error:
+        extract_json('{"causes": ["a", "b"')
+    assert error.value.truncated
+    with pytest.raises(ResponseParseError) as error:
+        extract_json("no json here")
+    assert not error.value.truncated
+
+
+@pytest.mark.parametrize("text", ['{"result": "maybe"}', '{"reason": "r"}', '["yes"]'])
+def test_schema_violations_are_rejected(text):
+    with pytest.raises(ResponseParseError):
+        parse_response(text, "necessity_set")
+
+
+def test_cut_off_verdict_is_accepted_only_when_partial():
+    text = '{"result": "no", "reason": "The vehicle cannot st'
+    assert parse_response(text, "necessity_set") == {"result": "no", "reason": None}
+    with pytest.raises(ResponseParseError):
+        parse_response(text, "necessity_set", partial=False)
+    # Non-verdict templates need the whole answer
+    with pytest.raises(ResponseParseError):
+        parse_response('{"rule": "∀x', "convert_to_symbolic_rule")
+
+
+def test_verdict_prefix_waits_for_the_complete_value():
+    assert verdict_prefix('{"result": "ye') is None
+    assert verdict_prefix('{"result" : "yes"') == "yes"
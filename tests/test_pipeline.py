@@ -0,0 +1,87 @@
+import threading
+import time
+
+import httpx
+import pytest
+import requests
+
+import pipeline
+
+
+@pytest.mark.parametrize("error", [
+    requests.HTTPError("400 Client Error"),
+    requests.Timeout("read timed out"),
+    httpx.ReadTimeout("read timed out"),
+    ValueError("unparsable answer"),
+])
+def test_failed_rule_conversion_keeps_other_rules(monkeypatch, error):
+    def convert_to_symbolic_rule(cause):
+        if cause == "b":
+            raise error
+        return {"rule": f"∀x {cause}(x)"}
+
+    monkeypatch.setattr(pipeline, "convert_to_symbolic_rule", convert_to_symbolic_rule)
+    rules = pipeline.convert_causes_to_rules(["a", "b", "c"], max_workers=2)
+    assert rules == [{"rule": "∀x a(x)"}, None, {"rule": "∀x c(x)"}]
+
+
+
+def test_rules_keep_the_cause_order_under_concurrency(monkeypatch):
+    threads = set()
+
+    def convert_to_symbolic_rule(cause):
+        threads.add(threading.get_ident())
+        # Later causes finish first
+        time.sleep(0.01 * (5 - int(cause)))
+        return {"rule": f"∀x c{cause}(x)"}
+
+    monkeypatch.setattr(pipeline, "convert_to_symbolic_rule", convert_to_symbolic_rule)
+    rules = pipeline.convert_causes_to_rules([str(i) for i in range(5)], max_workers=5)
+    assert [rule["rule"] for rule in rules] == [f"∀x c{i}(x)" for i in range(5)]
+    assert len(threads) > 1
+
+class ReasonBackend:
+    """Cuts streamed answers and answers with less than 1000 tokens off after "result"."""
+
+    model = "reason-model"
+
+    def __init__(self):
+        self.requests = []
+
+    def complete(self, prompt, max_tokens, temperature, timeout=None, template=None, system=None,
+                 stream_until=None, **kwargs):
+        self.requests.append({"max_tokens": max_tokens, "streamed": stream_until is not None})
+        usage = {"prompt_tokens": 10, "completion_tokens": 10}
+        if stream_until is not None:
+            return {"text": '{"result": "yes", "rea', "early_exit": True, "usage": usage}
+        if max_tokens < 1000:
+            return {"text": '{"result": "yes", "reason": "The vehicle', "usage": usage}
+        return {"text": '{"result": "yes", "reason": "The vehicle keeps its lane"}', "usage": usage}
+
+
+@pytest.fixture
+def reason_backend(monkeypatch):
+    import llm_adapter
+    backend = ReasonBackend()
+    monkeypatch.setattr(llm_adapter, "_backend", backend)
+    monkeypatch.setattr(llm_adapter, "_cache", None)
+    return backend
+
+
+def test_explained_sets_get_full_unstreamed_answers(monkeypatch, reason_backend):
+    import llm_adapter
+    monkeypatch.setattr(llm_adapter, "LLM_STREAM_VERDICTS", True)
+
+    reasons = pipeline.explain_sufficient_sets("effect", ["a", "b"], [["a"]], "laws", "physics")
+
+    assert reasons == ["The vehicle keeps its lane"]
+    assert reason_backend.requests == [{"max_tokens": 15000, "streamed": False}]
+
+
+def test_verdict_cut_off_by_the_budget_is_retried_with_more_tokens(reason_backend):
+    import llm_adapter
+
+    answer = llm_adapter.call_llm_json("prompt", max_tokens=512, template="sufficiency_set", stream=False)
+
+    assert answer["reason"] == "The vehicle keeps its lane"
+    assert [request["max_tokens"] for request in reason_backend.requests] == [512, 1024]
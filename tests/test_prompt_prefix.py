@@ -0,0 +1,51 @@
+import pipeline
+from llm_backends import OpenAIBackend
+from utils.cache import make_cache_key
+
+CAUSES = ["Emergency braking", "Wet road", "Lane keeping"]
+
+
+def test_system_message_is_sent_first():
+    payload = OpenAIBackend("key", "model")._payload("user part", 16, 0.0, system="static part")
+    assert [m["role"] for m in payload["messages"]] == ["system", "user"]
+    assert payload["messages"][0]["content"] == "static part"
+
+
+def test_system_message_is_part_of_the_cache_key():
+    assert make_cache_key("m", "prompt", 16, 0.0) != make_cache_key("m", "prompt", 16, 0.0, system="laws")
+    assert make_cache_key("m", "prompt", 16, 0.0, system="a") != make_cache_key("m", "prompt", 16, 0.0, system="b")
+
+
+def test_subset_prompts_share_one_static_prefix(scripted):
+    backend = scripted(causes=CAUSES, sufficient_sets=[["Emergency braking"]], necessary_sets=[["Lane keeping"]])
+    sent = []
+    respond = backend._respond
+
+    def record(prompt, template, system):
+        sent.append((template, system, prompt))
+        return respond(prompt, template, system)
+
+    backend._respond = record
+    pipeline.prune_sufficient_causes("Stop safely", CAUSES, "LEGAL LAW TEXT", "SAFETY LAW TEXT")
+    pipeline.prune_necessary_causes("Stop safely", CAUSES, "LEGAL LAW TEXT", "SAFETY LAW TEXT")
+
+    for template in ("sufficiency_set", "necessity_set"):
+        calls = [(system, prompt) for t, system, prompt in sent if t == template]
+        assert len(calls) > 1
+        systems = {system for system, _ in calls}
+        assert len(systems) == 1
+        system = systems.pop()
+        assert "LEGAL LAW TEXT" in system and "SAFETY LAW TEXT" in system and "Stop safely" in system
+        # Only the scenario varies per call
+        assert all("LAW TEXT" not in prompt for _, prompt in calls)
+        assert len({prompt for _, prompt in calls}) == len(calls)
+
+
+def test_repeated_prefix_is_reported_as_cached(scripted):
+    from pipeline import run_pipeline
+
+    scripted(causes=CAUSES, sufficient_sets=[["Emergency braking"]], necessary_sets=[["Lane keeping"]])
+    result = run_pipeline("Stop safely", legal_laws="laws", safety_laws="physics")
+    rows = {row["template"]: row for row in result.metrics["llm_calls"]}
+    assert rows["sufficiency_set"]["cached_tokens"] > 0
+    assert rows["decompose_effect"]["cached_tokens"] == 0
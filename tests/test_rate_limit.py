@@ -0,0 +1,69 @@
+import email.utils
+import time
+
+import pytest
+
+from utils import rate_limit
+from utils.rate_limit import RequestScheduler, estimate_tokens, parse_retry_after
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the waits instead of sleeping."""
+    waited = []
+    monkeypatch.setattr(rate_limit.time, "sleep", waited.append)
+    return waited
+
+
+def test_estimate_tokens_counts_prompt_and_completion():
+    assert estimate_tokens("x" * 400, 50) == 150
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), ("", None), ("2.5", 2.5), ("-3", 0.0), ("soon", None)])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    value = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 < parse_retry_after(value) <= 30
+
+
+def test_requests_per_minute_throttles_after_the_burst(sleeps):
+    scheduler = RequestScheduler(requests_per_minute=3)
+    for _ in range(3):
+        assert scheduler.acquire(10) == 0.0
+    delay = scheduler.acquire(10)
+    assert 19 < delay <= 20
+    assert sleeps == [delay]
+    stats = scheduler.stats()
+    assert stats["throttled_requests"] == 1
+    assert stats["max_queue_depth"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_tokens_per_minute_throttles_large_requests(sleeps):
+    scheduler = RequestScheduler(tokens_per_minute=1000)
+    assert scheduler.acquire(800) == 0.0
+    # 600 tokens short of the budget at 1000 per minute
+    assert 35 < scheduler.acquire(800) <= 36
+
+
+def test_unlimited_scheduler_never_waits(sleeps):
+    scheduler = RequestScheduler()
+    assert all(scheduler.acquire(10 ** 6) == 0.0 for _ in range(100))
+    assert sleeps == []
+
+
+def test_retry_after_pauses_every_caller(sleeps):
+    scheduler = RequestScheduler(backoff_base=0.0)
+    assert scheduler.backoff(0, retry_after=5.0) == 5.0
+    assert 4 < scheduler.acquire(10) <= 5
+    assert scheduler.stats()["rate_limited"] == 1
+
+
+def test_backoff_is_bounded():
+    scheduler = RequestScheduler(backoff_base=1.0, backoff_max=4.0)
+    delays = [scheduler.backoff(attempt) for attempt in range(10)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert scheduler.stats()["retries"] == 10
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from results import PipelineResult, build_result, read_jsonl, to_dataframes, write_jsonl
+
+CAUSES = ["Wet road", "Emergency braking", "Lane keeping"]
+RULES = [{"rule": "∀x wet(x)"}, None, {"rule": "∀x lane(x)"}]
+NECESSITY = {"evaluations": [
+    {"cause": "Wet road", "result": "not necessary", "reason": "other roads"},
+    {"cause": "Emergency braking", "result": "necessary", "reason": "only way to stop"},
+]}
+
+
+def make_result(**kwargs):
+    return build_result("Stop safely", CAUSES, RULES, NECESSITY,
+                        necessary_sets=[["Emergency braking"]],
+                        sufficient_sets=[["Lane keeping", "Emergency braking"]], **kwargs)
+
+
+def test_build_result_maps_causes_to_ids():
+    result = make_result()
+    assert result.necessary_sets == [(1,)]
+    assert result.sufficient_sets == [(1, 2)]
+    assert result.cause_texts(result.sufficient_sets[0]) == ["Emergency braking", "Lane keeping"]
+    assert result.rules == ["∀x wet(x)", None, "∀x lane(x)"]
+    assert result.necessary_causes == ["Emergency braking"]
+    # No verdict was returned for the last cause
+    assert [cause.necessary for cause in result.causes] == [False, True, None]
+    assert result.causes[0].necessity_reason == "other roads"
+
+
+def test_jsonl_roundtrip(tmp_path):
+    results = [make_result(effect_id="e1", metrics={"totals": {"calls": 4}}),
+               make_result(effect_id="e2", complete=False, necessary_reasons=["because"])]
+    path = str(tmp_path / "results.jsonl")
+    assert write_jsonl(results, path) == 2
+    assert list(read_jsonl(path)) == results
+    assert write_jsonl(results[:1], path, append=True) == 1
+    assert len(list(read_jsonl(path))) == 3
+
+
+def test_read_jsonl_skips_failed_and_torn_lines(tmp_path):
+    path = tmp_path / "batch.jsonl"
+    ok = {**make_result(effect_id="e1").to_dict(), "status": "ok"}
+    lines = [json.dumps(ok), json.dumps({"effect_id": "e2", "status": "error", "error": "boom"}), json.dumps(ok)[:40]]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    assert [result.effect_id for result in read_jsonl(str(path))] == ["e1"]
+
+
+def test_from_dict_ignores_unknown_keys():
+    record = {**make_result().to_dict(), "status": "ok", "duration": 1.0}
+    assert PipelineResult.from_dict(record) == make_result()
+
+
+def test_dataframes_have_one_row_per_effect_cause_and_set():
+    pytest.importorskip("pandas")
+    frames = to_dataframes([make_result(effect_id="e1", metrics={"totals": {"calls": 4}})])
+    assert frames["effects"].loc[0, "llm_calls"] == 4
+    assert len(frames["causes"]) == 3
+    sets = frames["sets"]
+    assert list(sets["kind"]) == ["necessary", "sufficient"]
+    assert list(sets["size"]) == [1, 2]
+
+
+def test_write_parquet(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    from results import write_parquet
+
+    paths = write_parquet([make_result(effect_id="e1")], str(tmp_path / "tables"))
+    assert set(paths) == {"effects", "causes", "sets"}
+    assert len(pd.read_parquet(paths["causes"])) == 3
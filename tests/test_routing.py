@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import llm_adapter
+from llm_backends import OpenAIBackend, RoutedBackend, ScriptedBackend
+
+
+@pytest.fixture
+def restore_backend():
+    previous = llm_adapter.get_backend()
+    yield
+    llm_adapter.set_backend(previous)
+
+
+def test_templates_are_routed_to_their_endpoint(tmp_path, restore_backend):
+    script = tmp_path / "local.json"
+    script.write_text(json.dumps({"causes": ["local"], "model": "local-model"}), encoding="utf-8")
+    llm_adapter.set_backend(ScriptedBackend(causes=["remote"]))
+    backend = llm_adapter.configure_routes({
+        "endpoints": {"local": {"backend": "scripted", "script_path": str(script)}},
+        "routes": {"decompose_effect": "local", "merge_duplicates": "default"},
+    })
+
+    assert isinstance(backend, RoutedBackend)
+    assert backend.model_for("decompose_effect") == "local-model"
+    assert backend.model_for("check_necessity") == "scripted"
+    answer = json.loads(llm_adapter.call_llm("prompt", template="decompose_effect"))
+    assert answer == {"causes": ["local"]}
+
+    # None removes the routing again
+    assert llm_adapter.configure_routes(None) is backend.default
+
+
+def test_openai_endpoints_read_their_key_from_the_environment(monkeypatch, restore_backend):
+    monkeypatch.setenv("LOCAL_KEY", "secret")
+    backend = llm_adapter.configure_routes({
+        "endpoints": {"local": {"base_url": "http://localhost:8080/v1", "model": "small", "api_key_env": "LOCAL_KEY",
+                                "requests_per_minute": 30}},
+        "routes": {"necessity_set": "local"},
+    })
+    local = backend.backend_for("necessity_set")
+    assert isinstance(local, OpenAIBackend)
+    assert (local.model, local.base_url, local.api_key) == ("small", "http://localhost:8080/v1", "secret")
+
+
+@pytest.mark.parametrize("config, message", [
+    ({"routes": {"necessity_set": "missing"}}, "unknown endpoint"),
+    ({"endpoints": {"local": {"base_url": "http://localhost"}}}, "needs a model"),
+    ({"endpoints": {"local": {"backend": "grpc"}}}, "Unknown backend"),
+])
+def test_invalid_routes_are_rejected(config, message, restore_backend):
+    with pytest.raises(ValueError, match=message):
+        llm_adapter.configure_routes(config)
+
+
+def test_routes_load_from_inline_json_or_file(tmp_path):
+    config = {"routes": {"necessity_set": "default"}}
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps(config), encoding="utf-8")
+    assert llm_adapter.load_routes(json.dumps(config)) == config
+    assert llm_adapter.load_routes(str(path)) == config
+    assert llm_adapter.load_routes("") is None
@@ -0,0 +1,52 @@
+import pytest
+
+import pipeline
+from lattice import SearchLimits
+
+CAUSES = ["a", "b", "c", "d", "e"]
+# {a, b} and {c, d} are the minimal sufficient sets
+SUFFICIENT = [{"a", "b"}, {"c", "d"}]
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+
+    def sufficiency_set(effect, absent_causes, present_causes, legal_laws, safety_laws, verdict_only=False):
+        calls.append(frozenset(present_causes))
+        sufficient = any(s <= set(present_causes) for s in SUFFICIENT)
+        return {"result": "yes" if sufficient else "no", "reason": "test"}
+
+    monkeypatch.setattr(pipeline, "sufficiency_set", sufficiency_set)
+    return calls
+
+
+@pytest.mark.parametrize("strategy", ["levelwise", "boundary"])
+def test_budgeted_search_resumed_from_checkpoint_progresses(tmp_path, llm_calls, strategy):
+    checkpoint = str(tmp_path / "sufficiency.json")
+    runs = []
+    for _ in range(10):
+        before = len(llm_calls)
+        search = pipeline.sufficiency_search("effect", CAUSES, "laws", "physics", strategy=strategy,
+                                             checkpoint_path=checkpoint, limits=SearchLimits(max_calls=8))
+        found = search.run()
+        runs.append(len(llm_calls) - before)
+        if search.complete:
+            break
+
+    assert search.complete
+    assert sorted(map(set, found), key=sorted) == SUFFICIENT
+    assert all(0 < calls <= 8 for calls in runs)
+    # Every subset reaches the LLM at most once over all runs
+    assert len(llm_calls) == len(set(llm_calls))
+
+
+def test_budget_counts_llm_calls_only(tmp_path, llm_calls):
+    checkpoint = str(tmp_path / "sufficiency.json")
+    pipeline.sufficiency_search("effect", CAUSES, "laws", "physics", checkpoint_path=checkpoint).run()
+    limits = SearchLimits(max_calls=1)
+    search = pipeline.sufficiency_search("effect", CAUSES, "laws", "physics", checkpoint_path=checkpoint,
+                                         limits=limits)
+    search.run()
+    assert search.complete
+    assert limits.calls == 0
@@ -0,0 +1,62 @@
+import pytest
+
+import pipeline
+from lattice import indices_to_mask, levelwise_minimal_sets
+
+CAUSES = ["a", "b", "c", "d", "e"]
+# Absent sets that prevent the effect; {d} is individually necessary
+NECESSARY = [{"d"}, {"a", "e"}]
+
+
+@pytest.fixture
+def absent_sets(monkeypatch):
+    calls = []
+
+    def necessity_set(effect, present_causes, absent_causes, legal_laws, safety_laws, verdict_only=False):
+        calls.append(frozenset(absent_causes))
+        prevented = any(s <= set(absent_causes) for s in NECESSARY)
+        return {"result": "no" if prevented else "yes", "reason": "test"}
+
+    monkeypatch.setattr(pipeline, "necessity_set", necessity_set)
+    return calls
+
+
+def test_levelwise_seeds_are_yielded_without_queries():
+    family = [indices_to_mask([1]), indices_to_mask([0, 2])]
+    asked = []
+
+    def evaluate(masks):
+        asked.extend(masks)
+        return [any(f & m == f for f in family) for m in masks]
+
+    found, _ = levelwise_minimal_sets(3, evaluate, seeds=[family[0]])
+    assert sorted(found) == sorted(family)
+    assert not any(mask & family[0] for mask in asked)
+
+
+@pytest.mark.parametrize("strategy", ["levelwise", "boundary"])
+def test_seeded_causes_and_their_supersets_are_never_asked(absent_sets, strategy):
+    unseeded = pipeline.prune_necessary_causes("effect", CAUSES, "laws", "physics", strategy=strategy)
+    unseeded_calls = len(absent_sets)
+    del absent_sets[:]
+
+    seeded = pipeline.prune_necessary_causes("effect", CAUSES, "laws", "physics", strategy=strategy,
+                                             seed_causes=["d", "unknown cause"])
+    assert sorted(map(sorted, seeded)) == sorted(map(sorted, unseeded)) == [["a", "e"], ["d"]]
+    assert all("d" not in absent for absent in absent_sets)
+    assert len(absent_sets) < unseeded_calls
+
+
+def test_pipeline_seeds_necessity_from_check_necessity(scripted):
+    from pipeline import run_pipeline
+
+    results = {}
+    for seed in (False, True):
+        backend = scripted(causes=CAUSES, sufficient_sets=[["a", "b"]], necessary_sets=[["d"], ["a", "e"]])
+        result = run_pipeline("effect", legal_laws="laws", safety_laws="physics", seed_necessity=seed)
+        results[seed] = ([result.cause_texts(s) for s in result.necessary_sets], backend.calls["necessity_set"],
+                         result.metrics["counters"].get("necessity_seeded_sets", 0))
+
+    assert results[True][0] == results[False][0] == [["d"], ["a", "e"]]
+    assert results[True][1] < results[False][1]
+    assert (results[False][2], results[True][2]) == (0, 1)
@@ -0,0 +1,29 @@
+import pytest
+
+from utils.similarity import cluster_causes, is_negated
+
+
+@pytest.mark.parametrize("cause, negated", [
+    ("Obstacles ahead in the lane", False),
+    ("No obstacles ahead in the lane", True),
+    ("Speed is not above the speed limit", True),
+    ("The vehicle doesn't brake", True),
+    ("Lane change without signaling", True),
+    ("Another vehicle is nearby", False),
+])
+def test_is_negated(cause, negated):
+    assert is_negated(cause) == negated
+
+
+@pytest.mark.parametrize("pair", [
+    ["Speed is above the speed limit", "Speed is not above the speed limit"],
+    ["No obstacles ahead in the lane", "Obstacles ahead in the lane"],
+])
+def test_negated_pairs_are_not_auto_merged(pair):
+    # Both pairs are above the auto threshold, so they end up as one ambiguous group for the LLM
+    assert cluster_causes(pair) == [[[0], [1]]]
+
+
+def test_verbatim_duplicates_are_auto_merged():
+    causes = ["Speed is above the speed limit", "speed is above the speed limit.", "No obstacles ahead"]
+    assert cluster_causes(causes) == [[[0, 1]], [[2]]]
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from utils.stage_graph import StageGraph
+
+
+def diamond(log=None, delay=0.0):
+    """a -> (b, c) -> d, where b and c are independent."""
+    def stage(name, fn):
+        def run(**kwargs):
+            if log is not None:
+                log.append((name, threading.get_ident()))
+            time.sleep(delay)
+            return fn(**kwargs)
+        return run
+
+    graph = StageGraph()
+    graph.add_stage("d", stage("d", lambda b, c: b + c), inputs=["b", "c"], outputs=["d"])
+    graph.add_stage("b", stage("b", lambda a: a * 2), inputs=["a"], outputs=["b"])
+    graph.add_stage("c", stage("c", lambda a: {"c": a + 1, "c_extra": a}), inputs=["a"], outputs=["c", "c_extra"])
+    graph.add_stage("a", stage("a", lambda x: x), inputs=["x"], outputs=["a"])
+    return graph
+
+
+def test_stages_run_in_dependency_order():
+    log = []
+    values = diamond(log).run({"x": 3})
+    assert values == {"x": 3, "a": 3, "b": 6, "c": 4, "c_extra": 3, "d": 10}
+    order = [name for name, _ in log]
+    assert order[0] == "a" and order[-1] == "d"
+
+
+def test_independent_stages_run_concurrently():
+    log = []
+    graph = diamond(log, delay=0.1)
+    start = time.perf_counter()
+    graph.run({"x": 1}, max_workers=2)
+    # a, {b, c}, d: three rounds of 100ms instead of four
+    assert time.perf_counter() - start < 0.35
+    threads = dict(log)
+    assert threads["b"] != threads["c"]
+
+
+def test_critical_path_follows_the_slowest_chain():
+    graph = diamond()
+    graph.run({"x": 1})
+    graph.durations.update(a=1.0, b=3.0, c=2.0, d=1.0)
+    assert graph.critical_path() == (["a", "b", "d"], 5.0)
+
+
+def test_duplicate_producers_are_rejected():
+    graph = StageGraph()
+    graph.add_stage("one", lambda: 1, inputs=[], outputs=["v"])
+    with pytest.raises(ValueError, match="produced by both"):
+        graph.add_stage("two", lambda: 2, inputs=[], outputs=["v"])
+
+
+def test_missing_inputs_and_cycles_are_rejected():
+    graph = StageGraph()
+    graph.add_stage("one", lambda missing: 1, inputs=["missing"], outputs=["v"])
+    with pytest.raises(ValueError, match="no stage produces"):
+        graph.run({})
+
+    graph = StageGraph()
+    graph.add_stage("one", lambda w: 1, inputs=["w"], outputs=["v"])
+    graph.add_stage("two", lambda v: 2, inputs=["v"], outputs=["w"])
+    with pytest.raises(ValueError, match="cycle"):
+        graph.run({})
+
+
+def test_stage_errors_propagate_and_stop_the_run():
+    started = []
+    graph = StageGraph()
+
+    def fail():
+        raise RuntimeError("stage failed")
+
+    graph.add_stage("fail", fail, inputs=[], outputs=["v"])
+    graph.add_stage("after", lambda v: started.append(v), inputs=["v"], outputs=["w"])
+    with pytest.raises(RuntimeError, match="stage failed"):
+        graph.run({}, max_workers=2)
+    assert started == []
+
+
+def test_concurrent_pipeline_matches_serial(scripted):
+    from pipeline import run_pipeline
+
+    script = dict(causes=["a", "b", "c", "d"], sufficient_sets=[["a"], ["b", "c"]], necessary_sets=[["d"]])
+    results = []
+    for workers in (1, 4):
+        scripted(**script)
+        result = run_pipeline("effect", max_workers=workers, legal_laws="laws", safety_laws="physics")
+        results.append(([result.cause_texts(s) for s in result.necessary_sets],
+                        [result.cause_texts(s) for s in result.sufficient_sets], result.rules))
+    assert results[0] == results[1]
+    assert results[0][1] == [["a"], ["b", "c"]]
@@ -0,0 +1,64 @@
+import pytest
+
+from lattice import mask_to_indices
+from pipeline import screen_queries, search_minimal_sets
+from symbolic import SymbolicScreen
+
+# a and b contradict each other; only {c} is sufficient
+CAUSES = ["a", "b", "c"]
+RULES = ["∀x EB(x)", "∀x ¬EB(x)", "∀x sd-front(x)"]
+EFFECT_RULE = "∀x sd-front(x)"
+
+
+def is_sufficient(mask):
+    return 2 in mask_to_indices(mask)
+
+
+def test_contradictory_present_causes_are_left_to_the_llm():
+    screen = SymbolicScreen(RULES, EFFECT_RULE)
+    assert screen.decide_sufficiency(0b011) is None
+    assert screen.decide_sufficiency(0b111) is None
+
+
+@pytest.mark.parametrize("strategy", ["levelwise", "boundary"])
+def test_screen_keeps_sufficient_subsets_of_contradictory_sets(strategy):
+    screen = SymbolicScreen(RULES, EFFECT_RULE)
+    query, _ = screen_queries(is_sufficient, None, screen.decide_sufficiency)
+    found = search_minimal_sets(len(CAUSES), query, strategy=strategy)
+    assert [[CAUSES[i] for i in mask_to_indices(mask)] for mask in found] == [["c"]]
+
+
+def run(effect):
+    from pipeline import run_pipeline
+    result = run_pipeline(effect, legal_laws="laws", safety_laws="physics", symbolic_screen=True)
+    return ([result.cause_texts(s) for s in result.necessary_sets],
+            [result.cause_texts(s) for s in result.sufficient_sets], result.metrics["counters"])
+
+
+def test_unrelated_absent_cause_is_not_screened_as_necessary(scripted):
+    # The present causes EB and lane contradict the effect, whatever the absent cause wet says
+    causes = ["Emergency braking", "Lane keeping", "Wet road"]
+    rules = {"Emergency braking": "∀x(EB(x))", "Lane keeping": "∀x(lane(x))", "Wet road": "∀x(wet(x))",
+             "Stop safely": "∀x ¬(EB(x) ∧ lane(x))"}
+    scripted(causes=causes, sufficient_sets=[["Emergency braking"]], necessary_sets=[["Lane keeping"]],
+             rules=rules)
+    necessary, sufficient, _ = run("Stop safely")
+    assert necessary == [["Lane keeping"]]
+    assert sufficient == [["Emergency braking"]]
+
+
+def test_screen_decides_entailed_sufficiency_locally(scripted):
+    causes = ["Emergency braking", "Wet road"]
+    rules = {"Emergency braking": "∀x(EB(x))", "Wet road": "∀x(wet(x))", "Slow down": "∀x(EB(x))"}
+    scripted(causes=causes, sufficient_sets=[["Emergency braking"]], necessary_sets=[], rules=rules)
+    _, sufficient, counters = run("Slow down")
+    assert sufficient == [["Emergency braking"]]
+    assert counters["symbolic_screen_verdicts"] >= 1
+
+
+def test_default_scripted_rules_do_not_entail_the_effect(scripted):
+    causes = ["cause 0", "cause 1", "cause 2"]
+    scripted(causes=causes, sufficient_sets=[["cause 0", "cause 1"]], necessary_sets=[["cause 2"]])
+    necessary, sufficient, _ = run("Reach the goal")
+    assert necessary == [["cause 2"]]
+    assert sufficient == [["cause 0", "cause 1"]]
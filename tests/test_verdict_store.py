@@ -0,0 +1,104 @@
+import pytest
+
+import pipeline
+from utils.verdict_store import VerdictStore, law_hash
+
+SUFFICIENT = [{"a", "b"}, {"c", "d"}]
+NECESSARY = [{"a"}, {"b", "c"}]
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+
+    def sufficiency_set(effect, absent_causes, present_causes, legal_laws, safety_laws, verdict_only=False):
+        calls.append(("sufficiency", legal_laws, frozenset(present_causes)))
+        sufficient = any(s <= set(present_causes) for s in SUFFICIENT)
+        return {"result": "yes" if sufficient else "no", "reason": "test"}
+
+    def necessity_set(effect, present_causes, absent_causes, legal_laws, safety_laws, verdict_only=False):
+        calls.append(("necessity", legal_laws, frozenset(absent_causes)))
+        prevented = any(s <= set(absent_causes) for s in NECESSARY)
+        return {"result": "no" if prevented else "yes", "reason": "test"}
+
+    monkeypatch.setattr(pipeline, "sufficiency_set", sufficiency_set)
+    monkeypatch.setattr(pipeline, "necessity_set", necessity_set)
+    return calls
+
+
+def run(path, kind, causes, laws="laws", strategy="levelwise"):
+    prune = pipeline.prune_sufficient_causes if kind == "sufficiency" else pipeline.prune_necessary_causes
+    store = VerdictStore(path)
+    try:
+        found = prune("effect", causes, laws, "physics", strategy=strategy, store=store)
+    finally:
+        store.close()
+    return sorted(map(set, found), key=sorted)
+
+
+@pytest.mark.parametrize("strategy", ["levelwise", "boundary"])
+@pytest.mark.parametrize("kind, expected", [("sufficiency", SUFFICIENT), ("necessity", NECESSARY)])
+def test_rerun_reuses_all_verdicts(tmp_path, llm_calls, kind, expected, strategy):
+    path = str(tmp_path / "verdicts.jsonl")
+    assert run(path, kind, list("abcde"), strategy=strategy) == expected
+    first = len(llm_calls)
+    assert first > 0
+
+    assert run(path, kind, list("abcde"), strategy=strategy) == expected
+    assert len(llm_calls) == first
+
+
+def test_added_cause_only_asks_scenarios_with_it_present(tmp_path, llm_calls):
+    path = str(tmp_path / "verdicts.jsonl")
+    run(path, "sufficiency", list("abcd"))
+    first = set(llm_calls)
+    del llm_calls[:]
+
+    assert run(path, "sufficiency", list("abcde")) == SUFFICIENT
+    assert llm_calls
+    assert all("e" in present for _, _, present in llm_calls)
+    assert not first & set(llm_calls)
+
+
+def test_added_cause_only_asks_scenarios_with_it_absent_for_necessity(tmp_path, llm_calls):
+    path = str(tmp_path / "verdicts.jsonl")
+    run(path, "necessity", list("abcd"))
+    del llm_calls[:]
+
+    assert run(path, "necessity", list("abcde")) == NECESSARY
+    # Absent sets containing e have the present causes of an absent set of the
+    # smaller run; only {e} itself is new, as the empty absent set is never asked
+    assert llm_calls
+    assert all("e" not in absent or absent == {"e"} for _, _, absent in llm_calls)
+
+
+def test_changed_laws_invalidate_verdicts(tmp_path, llm_calls):
+    path = str(tmp_path / "verdicts.jsonl")
+    run(path, "sufficiency", list("abcde"))
+    first = len(llm_calls)
+
+    assert run(path, "sufficiency", list("abcde"), laws="new laws") == SUFFICIENT
+    assert len(llm_calls) == 2 * first
+    assert {laws for _, laws, _ in llm_calls[first:]} == {"new laws"}
+
+
+def test_store_survives_a_torn_last_line(tmp_path):
+    path = str(tmp_path / "verdicts.jsonl")
+    laws = law_hash("laws", "physics")
+    store = VerdictStore(path)
+    store.record("sufficiency", "effect", laws, ["a", "b"], ["c"], True)
+    store.record_minimal_sets("sufficiency", "effect", laws, ["a", "b", "c"], [["a", "b"]])
+    store.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"kind": "sufficiency", "eff')
+
+    store = VerdictStore(path)
+    assert store.lookup("sufficiency", "effect", laws, ["b", "a"]) is True
+    assert store.lookup("sufficiency", "effect", laws, ["a"]) is None
+    assert store.prior_minimal_sets("sufficiency", "effect", laws) == [["a", "b"]]
+    assert store.prior_minimal_sets("sufficiency", "effect", law_hash("other", "physics")) == []
+    store.close()
+
+
+def test_law_hash_separates_the_texts():
+    assert law_hash("ab", "c") != law_hash("a", "bc")